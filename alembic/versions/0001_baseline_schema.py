@@ -0,0 +1,87 @@
+"""Baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'playlist_sources',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(), nullable=False),
+        sa.Column('content_hash', sa.String(), nullable=True),
+        sa.Column('etag', sa.String(), nullable=True),
+        sa.Column('last_modified', sa.String(), nullable=True),
+        sa.Column('channel_count', sa.Integer(), nullable=True),
+        sa.Column('last_synced_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_playlist_sources_id', 'playlist_sources', ['id'])
+    op.create_index('ix_playlist_sources_url', 'playlist_sources', ['url'], unique=True)
+
+    op.create_table(
+        'channels',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('logo', sa.String(), nullable=True),
+        sa.Column('stream_url', sa.String(), nullable=False),
+        sa.Column('epg_id', sa.String(), nullable=True),
+        sa.Column('attributes', sa.JSON(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('source_id', sa.Integer(), nullable=True),
+        sa.Column('content_hash', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_channels_id', 'channels', ['id'])
+    op.create_index('ix_channels_stream_url', 'channels', ['stream_url'])
+    op.create_index('ix_channels_source_id', 'channels', ['source_id'])
+
+    op.create_table(
+        'epg_programs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('channel_id', sa.String(), nullable=True),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('end_time', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('channel_id', 'start_time', name='uq_epg_programs_channel_start'),
+    )
+    op.create_index('ix_epg_programs_id', 'epg_programs', ['id'])
+    op.create_index('ix_epg_programs_channel_id', 'epg_programs', ['channel_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('epg_programs')
+    op.drop_table('channels')
+    op.drop_table('playlist_sources')
+    op.drop_table('users')
@@ -0,0 +1,34 @@
+"""Composite (channel_id, start_time, end_time) index on epg_programs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_epg_programs_channel_start_end',
+        'epg_programs',
+        ['channel_id', 'start_time', 'end_time'],
+    )
+    # channel_id is the leading column of the new index, so the single-column
+    # index only costs writes
+    op.drop_index('ix_epg_programs_channel_id', table_name='epg_programs')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_epg_programs_channel_id', 'epg_programs', ['channel_id'])
+    op.drop_index('ix_epg_programs_channel_start_end', table_name='epg_programs')
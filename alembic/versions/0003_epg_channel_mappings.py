@@ -0,0 +1,44 @@
+"""XMLTV channels and playlist -> EPG channel mappings
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'epg_channels',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('display_names', sa.JSON(), nullable=False),
+        sa.Column('icon', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'epg_mappings',
+        sa.Column('name_key', sa.String(), nullable=False),
+        sa.Column('epg_id', sa.String(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('method', sa.String(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name_key'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('epg_mappings')
+    op.drop_table('epg_channels')
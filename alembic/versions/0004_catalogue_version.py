@@ -0,0 +1,39 @@
+"""Catalogue version counter and channel listing indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    table = op.create_table(
+        'catalogue_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.bulk_insert(table, [{'id': 1, 'version': 1}])
+    op.create_index('ix_channels_name_id', 'channels', ['name', 'id'])
+    op.create_index('ix_channels_category_name_id', 'channels', ['category', 'name', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_channels_category_name_id', table_name='channels')
+    op.drop_index('ix_channels_name_id', table_name='channels')
+    op.drop_table('catalogue_version')
@@ -0,0 +1,36 @@
+"""Stream health check columns on channels
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('channels', sa.Column('last_checked_at', sa.DateTime(), nullable=True))
+    op.add_column('channels', sa.Column('latency_ms', sa.Integer(), nullable=True))
+    op.add_column(
+        'channels',
+        sa.Column('check_failures', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('channels') as batch_op:
+        batch_op.drop_column('check_failures')
+        batch_op.drop_column('latency_ms')
+        batch_op.drop_column('last_checked_at')
@@ -1,18 +1,206 @@
 """Channel API endpoints"""
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from backend.database import get_db
+import base64
+import hashlib
+import json
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.config import settings
+from backend.database import get_async_db
+from backend.models.channel import Channel
+from backend.services.catalogue import aget_catalogue_version
+from backend.services.channel_search import channel_search
+from backend.services.response_cache import CHANNELS, response_cache
 
 router = APIRouter(prefix="/api/v1/channels", tags=["channels"])
 
+# Fields a client may select with ?fields=
+CHANNEL_FIELDS = {
+    "id": Channel.id,
+    "name": Channel.name,
+    "category": Channel.category,
+    "logo": Channel.logo,
+    "stream_url": Channel.stream_url,
+    "epg_id": Channel.epg_id,
+    "is_active": Channel.is_active,
+    "attributes": Channel.attributes,
+}
+DEFAULT_FIELDS = ("id", "name", "category", "logo", "epg_id", "is_active")
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(DEFAULT_FIELDS)
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in CHANNEL_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+def _encode_cursor(name: str, channel_id: str) -> str:
+    raw = json.dumps([name, channel_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        name, channel_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(name), str(channel_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _query_key(request: Request) -> str:
+    """Canonical form of the request path and query, independent of parameter order"""
+    return json.dumps([request.url.path, sorted(request.query_params.multi_items())])
+
+def _etag(version: int, query_key: str) -> str:
+    """Strong validator: catalogue version plus the exact query"""
+    digest = hashlib.sha1(query_key.encode("utf-8")).hexdigest()
+    return f'"v{version}-{digest[:16]}"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    candidates = request.headers.get("if-none-match", "")
+    return etag in [c.strip() for c in candidates.split(",")] or candidates.strip() == "*"
+
+async def _cached(
+    request: Request, db: AsyncSession, load: Callable[[str], Awaitable[Dict]]
+) -> Response:
+    """
+    Serve a catalogue read through the response cache.
+
+    ``load`` is awaited on a miss and returns ``{"etag", "body"}`` (``body``
+    None for a 404). Hits, including 304s, need no database access at all.
+    A revalidation that misses the cache is checked against the catalogue
+    version first, so a matching ``If-None-Match`` costs one primary-key
+    read rather than the query behind ``load``.
+    """
+    key = _query_key(request)
+    entry = None
+    if request.headers.get("if-none-match"):
+        entry = await response_cache.get(CHANNELS, key)
+        if entry is None:
+            etag = _etag(await aget_catalogue_version(db), key)
+            if _not_modified(request, etag):
+                headers = {"ETag": etag, "Cache-Control": "no-cache"}
+                return Response(status_code=304, headers=headers)
+    if entry is None:
+        entry = await response_cache.get_or_load(
+            CHANNELS, key, settings.cache_channel_ttl, lambda: load(key)
+        )
+    if entry["body"] is None:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    headers = {"ETag": entry["etag"], "Cache-Control": "no-cache"}
+    if _not_modified(request, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(entry["body"], headers=headers)
+
 @router.get("/")
-async def get_channels(db: Session = Depends(get_db)):
-    """Get all channels"""
-    # TODO: Implement
-    return []
+async def get_channels(
+    request: Request,
+    category: Optional[str] = None,
+    active: Optional[bool] = None,
+    ids: Optional[List[str]] = Query(None, description="Restrict to these ids, e.g. favourites"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    List channels a page at a time, ordered by name then id.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` for the following
+    page; it is null on the last one. The ``ETag`` changes whenever the
+    catalogue does, so a matching ``If-None-Match`` gets a bodiless 304.
+    """
+    selected = _parse_fields(fields)
+    after = _decode_cursor(cursor) if cursor else None
+
+    async def load(key: str) -> Dict:
+        # name and id are always read: they form the keyset cursor
+        columns = {"id": Channel.id, "name": Channel.name}
+        columns.update((f, CHANNEL_FIELDS[f]) for f in selected)
+        query = select(*columns.values())
+        if category is not None:
+            query = query.where(Channel.category == category)
+        if active is not None:
+            query = query.where(Channel.is_active == active)
+        if ids:
+            query = query.where(Channel.id.in_(ids))
+        if after:
+            name, channel_id = after
+            query = query.where(or_(
+                Channel.name > name,
+                and_(Channel.name == name, Channel.id > channel_id),
+            ))
+        query = query.order_by(Channel.name, Channel.id).limit(limit + 1)
+
+        version = await aget_catalogue_version(db)
+        rows = (await db.execute(query)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1].name, rows[-1].id)
+        return {
+            "etag": _etag(version, key),
+            "body": {
+                "items": [{f: getattr(row, f) for f in selected} for row in rows],
+                "next_cursor": next_cursor,
+            },
+        }
+
+    return await _cached(request, db, load)
+
+@router.get("/search")
+async def search_channels(
+    q: str = Query(..., min_length=1, max_length=100),
+    category: Optional[str] = None,
+    active: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Ranked channel search by name.
+
+    Every query word must prefix a word of the name ("bbc on" finds
+    "BBC One HD"); when nothing matches that way, similar names are
+    returned instead so typos still find something. Results come from the
+    in-process search index, which is rebuilt when the catalogue changes.
+    """
+    async def load() -> Dict:
+        await channel_search.arefresh(db)
+        results = channel_search.search(q, category=category, active=active)
+        page = results[offset:offset + limit]
+        return {
+            "items": [{**doc._asdict(), "score": score} for doc, score in page],
+            "total": len(results),
+            "next_offset": offset + limit if offset + limit < len(results) else None,
+        }
+
+    key = json.dumps(["search", q.casefold(), category, active, limit, offset])
+    return await response_cache.get_or_load(CHANNELS, key, settings.cache_channel_ttl, load)
 
 @router.get("/{channel_id}")
-async def get_channel(channel_id: str, db: Session = Depends(get_db)):
+async def get_channel(
+    channel_id: str,
+    request: Request,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     """Get single channel"""
-    # TODO: Implement
-    return {}
+    selected = _parse_fields(fields)
+
+    async def load(key: str) -> Dict:
+        version = await aget_catalogue_version(db)
+        row = (await db.execute(
+            select(*(CHANNEL_FIELDS[f] for f in selected)).where(Channel.id == channel_id)
+        )).first()
+        return {
+            "etag": _etag(version, key),
+            "body": dict(zip(selected, row)) if row is not None else None,
+        }
+
+    return await _cached(request, db, load)
@@ -1,13 +1,169 @@
 """EPG API endpoints"""
-from fastapi import APIRouter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.config import settings
+from backend.database import get_async_db, get_db
+from backend.services.epg_index import Programme, aprogramme_details, epg_index
+from backend.services.epg_matching import assign_epg_ids, set_manual_mapping
+from backend.services.response_cache import invalidate_catalogue
 
 router = APIRouter(prefix="/api/v1/epg", tags=["epg"])
 
-@router.get("/{channel_id}")
-async def get_epg(channel_id: str):
-    """Get EPG data for channel"""
-    # TODO: Implement
+# Window used by the batch endpoint when the caller gives no end time
+DEFAULT_BATCH_WINDOW = timedelta(hours=3)
+
+class EPGManualMapping(BaseModel):
+    name: str = Field(..., min_length=1)
+    epg_id: str = Field(..., min_length=1)
+
+class EPGBatch(BaseModel):
+    channel_ids: List[str] = Field(..., min_length=1)
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    limit: int = Field(10, ge=0, le=100)
+
+def _utc(value: datetime) -> datetime:
+    """Guide times are stored as naive UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+async def ensure_index(background_tasks: BackgroundTasks):
+    """Build the index on first use; reload a stale one in the background"""
+    if not epg_index.loaded:
+        await run_in_threadpool(epg_index.refresh)
+    elif epg_index.stale:
+        background_tasks.add_task(epg_index.refresh)
+
+def _guide(current: Optional[Programme], following: List[Programme], details: Dict) -> Dict:
+    def entry(programme: Programme) -> Dict:
+        return programme.as_dict(*details.get(programme.id, (None, None)))
+
     return {
-        "current": {},
-        "upcoming": []
+        "current": entry(current) if current else {},
+        "upcoming": [entry(programme) for programme in following],
     }
+
+async def channel_guide(db: AsyncSession, channel_id: str, upcoming: int) -> Dict:
+    """Current and next ``upcoming`` programmes of a channel, from a loaded index"""
+    lookup = epg_index.now_next(channel_id, upcoming=upcoming)
+    if lookup is None:
+        return {"current": {}, "upcoming": []}
+    current, following = lookup
+    details = await aprogramme_details(db, [*following, *([current] if current else [])])
+    return _guide(current, following, details)
+
+@router.post("/batch")
+async def get_epg_batch(
+    batch: EPGBatch,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get now/next for many channels in one call.
+
+    For each channel, ``current`` is the programme airing at ``start``
+    (default now) and ``upcoming`` lists at most ``limit`` programmes
+    starting before ``end`` (default three hours after ``start``). Every
+    channel requested appears in the response, with empty values when it
+    has no guide data.
+    """
+    if len(batch.channel_ids) > settings.epg_batch_max_channels:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.epg_batch_max_channels} channels per request",
+        )
+    start = _utc(batch.start) if batch.start else datetime.utcnow()
+    end = _utc(batch.end) if batch.end else start + DEFAULT_BATCH_WINDOW
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    await ensure_index(background_tasks)
+    found = {
+        channel_id: (current, following[:batch.limit])
+        for channel_id, (current, following) in epg_index.window(
+            batch.channel_ids, start, end
+        ).items()
+    }
+    details = await aprogramme_details(db, [
+        programme
+        for current, following in found.values()
+        for programme in ([current] if current else []) + following
+    ])
+    programmes = {
+        channel_id: _guide(*found.get(channel_id, (None, [])), details)
+        for channel_id in batch.channel_ids
+    }
+    return {"start": start.isoformat(), "end": end.isoformat(), "channels": programmes}
+
+@router.post("/match")
+def match_channels(
+    background_tasks: BackgroundTasks,
+    rematch: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Assign guide ids to channels that lack a usable one.
+
+    Stored mappings are reused; ``rematch`` discards every automatic mapping
+    and matches again all channels without a valid tvg-id of their own,
+    including ones an earlier match assigned. Matching is CPU-bound, so this
+    stays a threadpool endpoint on a sync session rather than holding up the
+    event loop the async endpoints share.
+    """
+    stats = assign_epg_ids(db, rematch=rematch)
+    db.commit()
+    _assigned(stats, background_tasks)
+    return stats
+
+@router.put("/mappings")
+def put_manual_mapping(
+    mapping: EPGManualMapping,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    """
+    Pin channels named like ``name`` to the guide channel ``epg_id``.
+
+    The mapping is stored as manual, so automatic matching and ``rematch``
+    never replace it, and is applied to the matching channels at once.
+    """
+    try:
+        stats = set_manual_mapping(db, mapping.name, mapping.epg_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    _assigned(stats, background_tasks)
+    return stats
+
+def _assigned(stats: Dict[str, int], background_tasks: BackgroundTasks):
+    """Drop cached listings and reload the guide index after channels got new guide ids"""
+    if stats['assigned']:
+        invalidate_catalogue()
+        if epg_index.loaded:
+            background_tasks.add_task(epg_index.refresh, True)
+
+@router.get("/{channel_id}")
+async def get_epg(
+    channel_id: str,
+    background_tasks: BackgroundTasks,
+    upcoming: int = Query(5, ge=0, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get the current programme and the next ``upcoming`` ones for a channel.
+
+    Programmes are looked up in the in-memory EPG index, which a stale copy
+    keeps serving while it is reloaded in the background; only the
+    descriptions of the programmes returned are read from the database, by
+    primary key.
+    """
+    await ensure_index(background_tasks)
+    return await channel_guide(db, channel_id, upcoming)
@@ -1,75 +1,132 @@
 """Playlist import API endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from pydantic import BaseModel, HttpUrl
-from backend.database import get_db
-from backend.services.playlist_service import M3U8Parser
+import os
+import shutil
+import uuid
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from pydantic import BaseModel, Field, HttpUrl
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.config import settings
+from backend.database import get_async_db
+from backend.services.batch_import import DEFAULT_PRIORITY_RULES, PRIORITY_RULES
+from backend.services.import_jobs import import_queue
+from backend.services.playlist_service import CHUNK_SIZE, M3U8Parser, async_sync_from_url
+from backend.services.preview_cache import PreviewCache
 
 router = APIRouter(prefix="/api/v1/playlists", tags=["playlists"])
+preview_cache = PreviewCache()
 
 class PlaylistURL(BaseModel):
     url: HttpUrl
 
-@router.post("/import/url")
-async def import_from_url(
+class BatchSource(BaseModel):
+    url: HttpUrl
+    priority: int = 0
+
+class BatchImport(BaseModel):
+    sources: List[BatchSource] = Field(..., min_length=1)
+    concurrency: Optional[int] = Field(None, ge=1, le=64)
+    rules: List[str] = list(DEFAULT_PRIORITY_RULES)
+
+@router.post("/import/url", status_code=202)
+async def import_from_url(playlist: PlaylistURL):
+    """Queue an import of channels from M3U8 playlist URL"""
+    job = import_queue.submit('url', url=str(playlist.url))
+    return {"job_id": job['id'], "status": job['status']}
+
+@router.post("/import/batch", status_code=202)
+async def import_batch(batch: BatchImport):
+    """Queue a concurrent import of several playlists, deduplicated across sources"""
+    unknown = [rule for rule in batch.rules if rule not in PRIORITY_RULES]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown priority rules: {', '.join(unknown)}. "
+                   f"Available: {', '.join(PRIORITY_RULES)}"
+        )
+    
+    job = import_queue.submit(
+        'batch',
+        sources=[
+            {'url': str(source.url), 'priority': source.priority}
+            for source in batch.sources
+        ],
+        concurrency=batch.concurrency,
+        rules=batch.rules,
+    )
+    return {"job_id": job['id'], "status": job['status']}
+
+@router.post("/sync")
+async def sync_from_url(
     playlist: PlaylistURL,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Import channels from M3U8 playlist URL"""
-    parser = M3U8Parser(db)
-    
+    """Incrementally re-sync a playlist URL, applying only what changed"""
     try:
-        channels = parser.parse_from_url(str(playlist.url))
-        imported = parser.import_channels(channels)
+        result = await async_sync_from_url(db, str(playlist.url))
         
-        return {
-            "message": f"Successfully imported {imported} channels",
-            "total_parsed": len(channels),
-            "imported": imported
-        }
+        if result['unchanged']:
+            message = "Playlist unchanged since last sync"
+        else:
+            message = (
+                f"Synced {result['inserted']} new, {result['updated']} changed, "
+                f"{result['deactivated']} removed channels"
+            )
+        return {"message": message, **result}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
 
-@router.post("/import/file")
-async def import_from_file(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    """Import channels from uploaded M3U8 file"""
+@router.post("/import/file", status_code=202)
+async def import_from_file(file: UploadFile = File(...)):
+    """Queue an import of channels from uploaded M3U8 file"""
     if not file.filename.endswith(('.m3u', '.m3u8')):
         raise HTTPException(
             status_code=400,
             detail="Invalid file type. Only .m3u or .m3u8 files allowed"
         )
     
-    parser = M3U8Parser(db)
+    # Copy the spooled upload somewhere the worker can read it after this
+    # request has finished
+    os.makedirs(settings.import_spool_dir, exist_ok=True)
+    path = os.path.join(settings.import_spool_dir, f"{uuid.uuid4().hex}.m3u8")
+    with open(path, 'wb') as spool:
+        shutil.copyfileobj(file.file, spool, CHUNK_SIZE)
     
-    try:
-        content = await file.read()
-        channels = parser.parse_playlist(content.decode('utf-8'))
-        imported = parser.import_channels(channels)
-        
-        return {
-            "message": f"Successfully imported {imported} channels",
-            "total_parsed": len(channels),
-            "imported": imported
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e)) from e
+    job = import_queue.submit('file', path=path)
+    return {"job_id": job['id'], "status": job['status']}
+
+@router.get("/jobs/{job_id}")
+async def get_import_job(job_id: str):
+    """Progress and result of a queued import"""
+    job = import_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
 
 @router.get("/parse/preview")
 async def preview_playlist(url: str):
     """Preview channels in a playlist without importing"""
+    cached = preview_cache.get(url)
+    if cached is not None:
+        return cached
+
     parser = M3U8Parser(None)  # No DB needed for preview
 
     try:
-        channels = parser.parse_from_url(url)
-        return {
-            "total_channels": len(channels),
-            "channels": channels[:20],
-            "categories": list(
-                {ch.get('category', 'Uncategorized') for ch in channels}
-            ),
+        sample = []
+        categories = set()
+        async for channel in parser.aparse_from_url(url):
+            if len(sample) < 20:
+                sample.append(channel)
+            categories.add(channel.get('category', 'Uncategorized'))
+        preview = {
+            "total_channels": parser.total_parsed,
+            "channels": sample,
+            "categories": list(categories),
         }
+        preview_cache.set(url, preview)
+        return preview
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
\ No newline at end of file
@@ -1,10 +1,64 @@
 """Stream API endpoints"""
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.api.v1.epg import channel_guide, ensure_index
+from backend.config import settings
+from backend.database import get_async_db
+from backend.models.channel import Channel
+from backend.services.response_cache import STREAMS, response_cache
 
 router = APIRouter(prefix="/api/v1/stream", tags=["streams"])
 
+# Extra data a stream lookup can embed with ``include``
+STREAM_INCLUDES = {"epg"}
+
+def _includes(include: Optional[str]) -> set:
+    requested = {part.strip() for part in (include or "").split(",") if part.strip()}
+    unknown = requested - STREAM_INCLUDES
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include: {', '.join(sorted(unknown))}",
+        )
+    return requested
+
 @router.get("/{channel_id}")
-async def get_stream_url(channel_id: str):
-    """Get stream URL for channel"""
-    # TODO: Implement
-    return {"stream_url": f"http://localhost:8002/hls/{channel_id}/playlist.m3u8"}
+async def get_stream_url(
+    channel_id: str,
+    background_tasks: BackgroundTasks,
+    include: Optional[str] = None,
+    upcoming: int = Query(5, ge=0, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get stream URL for channel.
+
+    ``include=epg`` adds the channel's guide under ``epg``, shaped like
+    GET /api/v1/epg/{channel_id} with the same ``upcoming`` parameter, so
+    switching channel takes one request instead of two.
+    """
+    includes = _includes(include)
+
+    async def load():
+        row = (await db.execute(
+            select(Channel.id, Channel.is_active).where(Channel.id == channel_id)
+        )).first()
+        if row is None:
+            return None
+        return {
+            "channel_id": row.id,
+            "stream_url": f"{settings.stream_base_url}/hls/{row.id}/playlist.m3u8",
+            "is_active": bool(row.is_active),
+        }
+
+    stream = await response_cache.get_or_load(STREAMS, channel_id, settings.cache_stream_ttl, load)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    if "epg" in includes:
+        await ensure_index(background_tasks)
+        stream = {**stream, "epg": await channel_guide(db, channel_id, upcoming)}
+    return stream
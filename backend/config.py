@@ -1,12 +1,20 @@
 """Backend configuration"""
-from pydantic_settings import BaseSettings
 import os
+from typing import Optional
+
 import dotenv
+from pydantic_settings import BaseSettings
 
 dotenv.load_dotenv()
 class Settings(BaseSettings):
     # Database
     database_url: str = os.environ.get("DATABASE_URl")
+    # Defaults to database_url with its async driver (asyncpg / aiosqlite)
+    async_database_url: Optional[str] = os.environ.get("ASYNC_DATABASE_URL")
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
     
     # Redis
     redis_url: str = os.environ.get("REDIS_URL")
@@ -19,9 +27,84 @@ class Settings(BaseSettings):
     # Stream
     stream_base_url: str = "http://localhost:8002"
     ffmpeg_path: str = "/usr/bin/ffmpeg"
+    ffprobe_path: str = "/usr/bin/ffprobe"
+    hls_segment_duration: int = 6
+    hls_playlist_size: int = 5
+    hls_output_dir: str = "/tmp/hls"  # ffmpeg scratch space; tmpfs in production
+    hls_segment_retain: int = 3  # segments kept after leaving the playlist
+    hls_memory_limit_mb: int = 1024  # segment buffers across all channels
+    # Bitrate ladder for transcoded channels, "height:kbps,..." tallest first,
+    # e.g. "1080:5000,720:2800,480:1400"; empty: a single rendition
+    abr_ladder: str = ""
+
+    # Stream relay transcoding
+    transcode_preset: str = "veryfast"
+    transcode_crf: int = 23
+    transcode_max_concurrent: int = 0  # 0: one per CPU core
+    remux_max_concurrent: int = 0  # 0: ten per CPU core
+    transcode_queue_size: int = 16
+    transcode_queue_timeout: float = 10.0
+    transcode_start_timeout: float = 20.0
+    transcode_idle_timeout: float = 60.0
+    transcode_max_restarts: int = 3
+    # Remux sources that are already H.264/AAC instead of re-encoding them
+    transcode_passthrough: bool = True
+    probe_timeout: float = 10.0
+    probe_cache_ttl: int = 86400
+    # Accept "lavfi:<filtergraph>" inputs (local test patterns, no network)
+    transcode_allow_test_pattern: bool = False
+    # Channels kept running without viewers so switching to them is instant:
+    # the most-watched ones, and the neighbours in channel list order of
+    # every watched channel. Warm channels only use free slots.
+    relay_warm_top: int = 3
+    relay_warm_adjacent: int = 1  # per side; 0: none
+    relay_warm_half_life: float = 3600.0  # seconds for a tune-in to count half
     
+    # Playlist import
+    import_batch_size: int = 1000
+    preview_cache_dir: str = "/tmp/ladybug_tv/preview-cache"
+    preview_cache_ttl: int = 600
+    import_workers: int = 2
+    import_job_ttl: int = 86400
+    import_spool_dir: str = "/tmp/ladybug_tv/uploads"
+    batch_import_concurrency: int = 8
+
+    # Outbound HTTP
+    http_timeout: float = 30.0
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+
     # EPG
     epg_update_interval: int = 3600
+    epg_source_url: Optional[str] = os.environ.get("EPG_SOURCE_URL")
+    epg_window_past_days: int = 1
+    epg_window_future_days: int = 7
+    epg_batch_size: int = 5000
+    epg_index_ttl: int = 300
+    epg_batch_max_channels: int = 500
+    epg_match_threshold: float = 0.6
+    epg_match_min_length: int = 3
+
+    # Stream health checks
+    health_check_interval: int = 3600
+    health_check_concurrency: int = 100
+    health_check_per_host: int = 20
+    health_check_timeout: float = 10.0
+    health_check_batch_size: int = 1000
+    # Consecutive failed checks before a channel is disabled
+    health_check_failures: int = 3
+    # Connection failures in a row before a host's remaining channels are
+    # failed without a request, for the rest of the run
+    health_host_failure_limit: int = 10
+    health_host_max_backoff: float = 30.0
+
+    # Response cache (Redis, or an in-process LRU without it)
+    cache_channel_ttl: int = 300
+    cache_stream_ttl: int = 60
+    cache_max_entries: int = 10000
+    # TTL cap for channel and stream entries in the in-process LRU, which
+    # other processes' invalidations cannot reach; 0 stops caching them
+    cache_local_ttl: int = 5
     
     class Config:
         env_file = ".envrc"
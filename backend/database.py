@@ -1,13 +1,49 @@
 """Database connection setup"""
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+
 from backend.config import settings
 
-engine = create_engine(settings.database_url)
+# Async drivers for the sync URLs the app is configured with
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str):
+    """The async-driver equivalent of a database URL (asyncpg, aiosqlite)"""
+    parsed = make_url(url)
+    return parsed.set(drivername=_ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))
+
+def _pool_options(url) -> dict:
+    """Pool sizing from settings; SQLite keeps SQLAlchemy's own pool choice"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": True,
+    }
+
+# Sync engine: import workers, EPG ingest, index rebuilds and migrations
+engine = create_engine(settings.database_url, **_pool_options(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine: request handlers, so queries never block the event loop
+_async_url = settings.async_database_url or async_database_url(settings.database_url)
+async_engine = create_async_engine(_async_url, **_pool_options(_async_url))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     """Database dependency"""
     db = SessionLocal()
@@ -15,3 +51,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Async database dependency"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def dialect_insert(db, table):
+    """
+    INSERT construct for the session's dialect.
+
+    PostgreSQL and SQLite get their own insert, which supports
+    ``on_conflict_do_nothing`` / ``on_conflict_do_update``; other dialects
+    fall back to the generic construct.
+    """
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        return postgresql.insert(table)
+    if name == "sqlite":
+        return sqlite.insert(table)
+    return insert(table)
@@ -1,7 +1,11 @@
 """FastAPI backend entry point"""
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.api.v1 import playlists
+
+from backend.api.v1 import channels, epg, playlist, streams
+from backend.services.http_client import close_http_client
+from backend.services.import_jobs import import_queue
+from backend.services.response_cache import response_cache
 
 app = FastAPI(title="Ladybug TV API", version="1.0.0")
 
@@ -13,7 +17,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.include_router(playlists.router)
+app.include_router(channels.router)
+app.include_router(playlist.router)
+app.include_router(epg.router)
+app.include_router(streams.router)
+
+@app.on_event("startup")
+async def startup():
+    import_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    import_queue.stop()
+    await close_http_client()
+
 @app.get("/")
 async def root():
     return {"message": "Ladybug TV API"}
@@ -21,3 +38,7 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
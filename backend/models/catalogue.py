@@ -0,0 +1,13 @@
+"""Catalogue version database model"""
+from sqlalchemy import Column, DateTime, Integer
+
+from backend.database import Base
+
+
+class CatalogueVersion(Base):
+    __tablename__ = "catalogue_version"
+    
+    # Single row (id 1); version is bumped on every channel write
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime)
@@ -1,14 +1,31 @@
 """Channel database model"""
-from sqlalchemy import Column, String, Integer, Boolean
+from sqlalchemy import JSON, Boolean, Column, DateTime, Index, Integer, String
+
 from backend.database import Base
 
+
 class Channel(Base):
     __tablename__ = "channels"
+    __table_args__ = (
+        # Keyset pagination order of the listing API, unfiltered and by category
+        Index("ix_channels_name_id", "name", "id"),
+        Index("ix_channels_category_name_id", "category", "name", "id"),
+    )
     
     id = Column(String, primary_key=True, index=True)
     name = Column(String, nullable=False)
     category = Column(String)
     logo = Column(String)
-    stream_url = Column(String, nullable=False)
+    stream_url = Column(String, nullable=False, index=True)
     epg_id = Column(String)
+    # Full EXTINF attribute map (tvg-chno, catchup, radio, ...)
+    attributes = Column(JSON)
     is_active = Column(Boolean, default=True)
+    # Playlist the channel was last synced from, and a hash of its metadata
+    source_id = Column(Integer, index=True)
+    content_hash = Column(String)
+    # Last stream health check: time to the first segment's bytes (null when
+    # the check failed) and consecutive failed checks
+    last_checked_at = Column(DateTime)
+    latency_ms = Column(Integer)
+    check_failures = Column(Integer, nullable=False, default=0, server_default='0')
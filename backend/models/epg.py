@@ -1,13 +1,42 @@
 """EPG database model"""
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import JSON, Column, DateTime, Float, Index, Integer, String, UniqueConstraint
+
 from backend.database import Base
 
+
 class EPGProgram(Base):
     __tablename__ = "epg_programs"
+    __table_args__ = (
+        # One programme per channel per start time; the ingest upsert key
+        UniqueConstraint("channel_id", "start_time", name="uq_epg_programs_channel_start"),
+        # Serves "what is on between t0 and t1" range scans per channel
+        Index("ix_epg_programs_channel_start_end", "channel_id", "start_time", "end_time"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    channel_id = Column(String, index=True)
+    channel_id = Column(String)
     title = Column(String, nullable=False)
     description = Column(String)
+    category = Column(String)
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=False)
+
+class EPGChannel(Base):
+    __tablename__ = "epg_channels"
+
+    # XMLTV <channel id="...">
+    id = Column(String, primary_key=True)
+    display_names = Column(JSON, nullable=False)
+    icon = Column(String)
+
+class EPGMapping(Base):
+    __tablename__ = "epg_mappings"
+
+    # Normalized playlist channel name the mapping applies to
+    name_key = Column(String, primary_key=True)
+    # Matched XMLTV channel id; NULL records that nothing matched
+    epg_id = Column(String)
+    score = Column(Float)
+    # tvg_id, exact, trigram, none or manual; manual mappings are never recomputed
+    method = Column(String, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
@@ -0,0 +1,18 @@
+"""Playlist source database model"""
+from sqlalchemy import Column, DateTime, Integer, String
+
+from backend.database import Base
+
+
+class PlaylistSource(Base):
+    __tablename__ = "playlist_sources"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, unique=True, index=True, nullable=False)
+    # SHA-256 of the raw playlist body from the last sync
+    content_hash = Column(String)
+    # HTTP validators for conditional re-fetches
+    etag = Column(String)
+    last_modified = Column(String)
+    channel_count = Column(Integer, default=0)
+    last_synced_at = Column(DateTime)
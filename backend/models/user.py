@@ -1,7 +1,9 @@
 """User database model"""
-from sqlalchemy import Column, String, Integer, Boolean
+from sqlalchemy import Boolean, Column, Integer, String
+
 from backend.database import Base
 
+
 class User(Base):
     __tablename__ = "users"
     
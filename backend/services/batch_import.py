@@ -0,0 +1,113 @@
+"""Concurrent multi-playlist import with cross-source deduplication"""
+import asyncio
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from backend.config import settings
+from backend.services.http_client import create_http_client
+from backend.services.playlist_service import M3U8Parser
+
+# Rules applied, in order, to decide which copy of a duplicate channel wins
+PRIORITY_RULES: Dict[str, Callable[[Dict, Dict], int]] = {
+    # Higher source priority wins
+    'priority': lambda source, channel: source.get('priority', 0),
+    # Entries carrying a tvg-id (and so an EPG link) win
+    'tvg_id': lambda source, channel: int(bool(channel.get('tvg_id'))),
+    # Entries with a logo win
+    'logo': lambda source, channel: int(bool(channel.get('logo'))),
+    # Entries with more EXTINF attributes win
+    'attributes': lambda source, channel: len(channel.get('attributes') or {}),
+}
+DEFAULT_PRIORITY_RULES = ('priority', 'tvg_id', 'logo')
+
+
+async def fetch_playlists(
+    sources: Sequence[Dict],
+    concurrency: Optional[int] = None,
+    on_parsed: Optional[Callable[[int], None]] = None,
+) -> List[Dict]:
+    """
+    Fetch and parse several playlists concurrently.
+
+    At most ``concurrency`` downloads run at once over one pooled client. A
+    failing source is reported in its result instead of aborting the batch.
+    ``on_parsed`` is called with the running total of parsed channels.
+
+    Returns one ``{'url', 'channels', 'error'}`` dict per source, in order.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.batch_import_concurrency)
+    parsed = 0
+
+    async def fetch_one(client, source: Dict) -> Dict:
+        nonlocal parsed
+        async with semaphore:
+            parser = M3U8Parser(None)
+            channels = []
+            try:
+                async for channel in parser.aparse_from_url(source['url'], client=client):
+                    channels.append(channel)
+                    parsed += 1
+                    if on_parsed is not None and parsed % 1000 == 0:
+                        on_parsed(parsed)
+                return {'url': source['url'], 'channels': channels, 'error': None}
+            except Exception as e:
+                return {'url': source['url'], 'channels': [], 'error': str(e)}
+
+    async with create_http_client() as client:
+        results = await asyncio.gather(*(fetch_one(client, source) for source in sources))
+    if on_parsed is not None:
+        on_parsed(parsed)
+    return results
+
+
+def merge_channels(
+    sources: Sequence[Dict],
+    results: Sequence[Dict],
+    rules: Sequence[str] = DEFAULT_PRIORITY_RULES,
+) -> Tuple[List[Dict], int]:
+    """
+    Merge per-source channel lists, dropping duplicates across sources.
+
+    Two entries are duplicates when they share a stream URL, or when they
+    come from different sources and share a tvg-id. The copy ranked highest
+    by ``rules`` is kept; remaining ties go to the source listed first.
+
+    Returns the merged channels and the number of duplicates removed.
+    """
+    unknown = [rule for rule in rules if rule not in PRIORITY_RULES]
+    if unknown:
+        raise ValueError(f"Unknown priority rules: {', '.join(unknown)}")
+    scorers = [PRIORITY_RULES[rule] for rule in rules]
+
+    def rank(source_index: int, position: int, channel: Dict) -> tuple:
+        source = sources[source_index]
+        return (*(score(source, channel) for score in scorers), -source_index, -position)
+
+    # Best entry per stream URL
+    by_url: Dict[str, Tuple[tuple, int, Dict]] = {}
+    total = 0
+    for source_index, result in enumerate(results):
+        for position, channel in enumerate(result['channels']):
+            total += 1
+            candidate = (rank(source_index, position, channel), source_index, channel)
+            current = by_url.get(channel['stream_url'])
+            if current is None or candidate[0] > current[0]:
+                by_url[channel['stream_url']] = candidate
+
+    # A tvg-id belongs to the source of its best-ranked entry; other sources'
+    # entries for it are duplicates. Entries within that source are all kept,
+    # since one source may list several qualities of the same channel.
+    tvg_owner: Dict[str, Tuple[tuple, int]] = {}
+    for channel_rank, source_index, channel in by_url.values():
+        tvg_id = channel.get('tvg_id')
+        if tvg_id and (tvg_id not in tvg_owner or channel_rank > tvg_owner[tvg_id][0]):
+            tvg_owner[tvg_id] = (channel_rank, source_index)
+
+    # Keep playlist order: by source, then by position within the source
+    merged = [
+        channel
+        for _, source_index, channel in sorted(
+            by_url.values(), key=lambda c: (c[1], -c[0][-1])
+        )
+        if not channel.get('tvg_id') or tvg_owner[channel['tvg_id']][1] == source_index
+    ]
+    return merged, total - len(merged)
@@ -0,0 +1,40 @@
+"""Channel catalogue version counter"""
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.models.catalogue import CatalogueVersion
+
+_ROW_ID = 1
+
+
+_VERSION_QUERY = select(CatalogueVersion.version).where(CatalogueVersion.id == _ROW_ID)
+
+
+def get_catalogue_version(db: Session) -> int:
+    """Current catalogue version; one primary-key read"""
+    return db.execute(_VERSION_QUERY).scalar_one_or_none() or 0
+
+
+async def aget_catalogue_version(db: AsyncSession) -> int:
+    """Async variant of ``get_catalogue_version`` for request handlers"""
+    return (await db.execute(_VERSION_QUERY)).scalar_one_or_none() or 0
+
+
+def bump_catalogue_version(db: Session) -> None:
+    """
+    Record that the channel catalogue changed, invalidating client ETags.
+
+    Runs in the caller's transaction, so the new version becomes visible
+    together with the channel writes it describes.
+    """
+    result = db.execute(
+        update(CatalogueVersion)
+        .where(CatalogueVersion.id == _ROW_ID)
+        .values(version=CatalogueVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        db.add(CatalogueVersion(id=_ROW_ID, version=1, updated_at=datetime.utcnow()))
+        db.flush()
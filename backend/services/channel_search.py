@@ -0,0 +1,198 @@
+"""In-process channel search index (token prefix + trigram fallback)"""
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal
+from backend.models.channel import Channel
+from backend.services.catalogue import aget_catalogue_version, get_catalogue_version
+from backend.services.epg_matching import trigrams
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Minimum trigram Dice score for a fuzzy (typo-tolerant) hit
+FUZZY_THRESHOLD = 0.3
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Casefolded word tokens of a channel name or query"""
+    return _TOKEN_RE.findall(text.casefold()) if text else []
+
+
+class SearchDoc(NamedTuple):
+    id: str
+    name: str
+    category: Optional[str]
+    logo: Optional[str]
+    is_active: bool
+
+
+class _Snapshot(NamedTuple):
+    docs: List[SearchDoc]
+    keys: List[str]
+    tokens: List[str]
+    token_docs: List[List[int]]
+    grams: List[Set[str]]
+    postings: Dict[str, List[int]]
+
+
+class ChannelSearchIndex:
+    """
+    Channel names indexed for search-as-you-type.
+
+    Name tokens are kept in one sorted list, so every token starting with a
+    query word is a contiguous bisect range; a channel matches when each
+    query word prefixes one of its tokens. Queries with no prefix hit (typos)
+    fall back to trigram similarity over the whole name, read through an
+    inverted index. The index is rebuilt whenever the catalogue version
+    changes, i.e. after every import that wrote channels.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._snapshot = _Snapshot([], [], [], [], [], {})
+        self._lock = threading.Lock()
+
+    def build(self, rows, version: Optional[int] = None):
+        """Build from ``(id, name, category, logo, is_active)`` rows"""
+        docs = [SearchDoc(*row) for row in rows]
+        keys = [' '.join(tokenize(doc.name)) for doc in docs]
+        by_token: Dict[str, List[int]] = {}
+        postings: Dict[str, List[int]] = {}
+        grams = []
+        for position, key in enumerate(keys):
+            for token in set(key.split()):
+                by_token.setdefault(token, []).append(position)
+            doc_grams = trigrams(key.replace(' ', ''))
+            grams.append(doc_grams)
+            for gram in doc_grams:
+                postings.setdefault(gram, []).append(position)
+
+        tokens = sorted(by_token)
+        # One assignment swaps the whole index; searches in flight keep
+        # reading the snapshot they started with
+        self._snapshot = _Snapshot(
+            docs, keys, tokens, [by_token[t] for t in tokens], grams, postings
+        )
+        self.version = version
+
+    def refresh(self, db: Session):
+        """Rebuild if the catalogue changed since the last build"""
+        version = get_catalogue_version(db)
+        if version == self.version:
+            return
+        self._rebuild(db, version)
+
+    async def arefresh(self, db: AsyncSession):
+        """
+        ``refresh`` for request handlers: the version check is one async
+        read, and a rebuild (a full channel scan plus CPU-bound indexing)
+        runs on a worker thread with its own session.
+        """
+        version = await aget_catalogue_version(db)
+        if version == self.version:
+            return
+        await run_in_threadpool(self._rebuild_in_session, version)
+
+    def _rebuild_in_session(self, version: int):
+        db = SessionLocal()
+        try:
+            self._rebuild(db, version)
+        finally:
+            db.close()
+
+    def _rebuild(self, db: Session, version: int):
+        with self._lock:
+            if version == self.version:
+                return
+            started = time.monotonic()
+            self.build(db.execute(select(
+                Channel.id, Channel.name, Channel.category, Channel.logo, Channel.is_active,
+            )), version)
+            logger.info(
+                "Channel search index built: %d channels in %.2fs",
+                len(self._snapshot.docs), time.monotonic() - started,
+            )
+
+    @staticmethod
+    def _prefix_docs(snapshot: _Snapshot, word: str) -> Set[int]:
+        lo = bisect_left(snapshot.tokens, word)
+        hi = bisect_left(snapshot.tokens, word + '\U0010ffff', lo)
+        found: Set[int] = set()
+        for docs in snapshot.token_docs[lo:hi]:
+            found.update(docs)
+        return found
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        active: Optional[bool] = None,
+    ) -> List[Tuple[SearchDoc, float]]:
+        """
+        All matching channels, best first, with a relevance score.
+
+        Ranking: exact name, then name starting with the query, then names
+        whose tokens start with every query word (shorter names first), then
+        fuzzy trigram hits by similarity.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        phrase = ' '.join(words)
+        snapshot = self._snapshot
+
+        # Longest word first: usually the narrowest prefix range, so the
+        # intersection shrinks early
+        candidates: Optional[Set[int]] = None
+        for word in sorted(words, key=len, reverse=True):
+            found = self._prefix_docs(snapshot, word)
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                break
+
+        scored: List[Tuple[float, int]] = []
+        if candidates:
+            for position in candidates:
+                key = snapshot.keys[position]
+                if key == phrase:
+                    score = 3.0
+                elif key.startswith(phrase):
+                    score = 2.0 + len(phrase) / len(key)
+                else:
+                    score = 1.0 + len(phrase) / len(key)
+                scored.append((score, position))
+        else:
+            query_grams = trigrams(phrase.replace(' ', ''))
+            shared: Dict[int, int] = {}
+            for gram in query_grams:
+                for position in snapshot.postings.get(gram, ()):
+                    shared[position] = shared.get(position, 0) + 1
+            for position, common in shared.items():
+                score = 2.0 * common / (len(query_grams) + len(snapshot.grams[position]))
+                if score >= FUZZY_THRESHOLD:
+                    scored.append((score, position))
+
+        results = []
+        scored.sort(key=lambda item: (-item[0], snapshot.docs[item[1]].name))
+        for score, position in scored:
+            doc = snapshot.docs[position]
+            if category is not None and doc.category != category:
+                continue
+            if active is not None and bool(doc.is_active) != active:
+                continue
+            results.append((doc, round(score, 3)))
+        return results
+
+
+channel_search = ChannelSearchIndex()
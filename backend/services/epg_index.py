@@ -0,0 +1,206 @@
+"""In-memory per-channel EPG index for now/next lookups"""
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.models.channel import Channel
+from backend.models.epg import EPGProgram
+
+logger = logging.getLogger(__name__)
+
+# Programme ids per query when reading details for index lookups
+_DETAILS_CHUNK = 1000
+
+
+class Programme(NamedTuple):
+    """
+    A programme held by the index; times are naive UTC.
+
+    Descriptions and categories stay in the database, see
+    ``aprogramme_details``.
+    """
+    id: int
+    title: str
+    start_time: datetime
+    end_time: datetime
+
+    def as_dict(self, description: Optional[str] = None, category: Optional[str] = None) -> Dict:
+        return {
+            'title': self.title,
+            'description': description,
+            'category': category,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat(),
+        }
+
+
+class ChannelSchedule:
+    """
+    One channel's programmes sorted by start time.
+
+    ``starts`` and ``ends`` are parallel to ``programmes`` so lookups can
+    bisect plain datetime lists.
+    """
+
+    __slots__ = ('starts', 'ends', 'programmes')
+
+    def __init__(self, programmes: List[Programme]):
+        programmes.sort(key=lambda p: p.start_time)
+        self.programmes = programmes
+        self.starts = [p.start_time for p in programmes]
+        self.ends = [p.end_time for p in programmes]
+
+    def now_next(self, at: datetime, upcoming: int) -> Tuple[Optional[Programme], List[Programme]]:
+        """The programme airing at ``at`` and the next ``upcoming`` after it"""
+        i = bisect_right(self.starts, at)
+        current = None
+        if i and self.ends[i - 1] > at:
+            current = self.programmes[i - 1]
+        return current, self.programmes[i:i + upcoming]
+
+    def window(self, start: datetime, end: datetime) -> Tuple[Optional[Programme], List[Programme]]:
+        """The programme airing at ``start`` and those starting before ``end``"""
+        i = bisect_right(self.starts, start)
+        current = None
+        if i and self.ends[i - 1] > start:
+            current = self.programmes[i - 1]
+        return current, self.programmes[i:bisect_left(self.starts, end, lo=i)]
+
+
+class EPGIndex:
+    """
+    Per-channel schedules for the whole retention window, held in memory.
+
+    Only ids, titles and times are held, so every API worker's copy stays
+    small; lookups are bisects over sorted lists and never touch the
+    database.
+    A process that runs an ingest rebuilds its loaded index straight after;
+    other processes (the API, when ingest runs in a worker) reload once it
+    is older than ``settings.epg_index_ttl`` seconds.
+    """
+
+    def __init__(self):
+        self._schedules: Dict[str, ChannelSchedule] = {}
+        # Catalogue channel id -> XMLTV channel id, for channels whose id
+        # differs from their guide id
+        self._aliases: Dict[str, str] = {}
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._built_at is not None
+
+    @property
+    def stale(self) -> bool:
+        return (
+            self._built_at is None
+            or time.monotonic() - self._built_at > settings.epg_index_ttl
+        )
+
+    def build(self, rows: Iterable[Tuple], aliases: Optional[Dict[str, str]] = None):
+        """
+        Replace the index from ``(channel_id, id, title, start_time,
+        end_time)`` rows. The swap is a single assignment, so
+        concurrent readers see either the old or the new index.
+        """
+        grouped: Dict[str, List[Programme]] = {}
+        for channel_id, *fields in rows:
+            grouped.setdefault(channel_id, []).append(Programme(*fields))
+        self._schedules = {
+            channel_id: ChannelSchedule(programmes)
+            for channel_id, programmes in grouped.items()
+        }
+        self._aliases = aliases or {}
+        self._built_at = time.monotonic()
+
+    def load(self, db) -> int:
+        """Rebuild from the database; returns the number of programmes indexed"""
+        started = time.monotonic()
+        rows = db.query(
+            EPGProgram.channel_id, EPGProgram.id, EPGProgram.title,
+            EPGProgram.start_time, EPGProgram.end_time,
+        ).yield_per(settings.epg_batch_size)
+        aliases = {
+            channel_id: epg_id
+            for channel_id, epg_id in db.query(Channel.id, Channel.epg_id).filter(
+                Channel.epg_id.isnot(None), Channel.epg_id != Channel.id
+            )
+        }
+        self.build(rows, aliases)
+        count = sum(len(s.programmes) for s in self._schedules.values())
+        logger.info(
+            "EPG index built: %d programmes on %d channels in %.2fs",
+            count, len(self._schedules), time.monotonic() - started,
+        )
+        return count
+
+    def refresh(self, force: bool = False):
+        """Reload from the database if stale; concurrent callers share one load"""
+        with self._lock:
+            if not (force or self.stale):
+                return
+            db = SessionLocal()
+            try:
+                self.load(db)
+            finally:
+                db.close()
+
+    def schedule(self, channel_id: str) -> Optional[ChannelSchedule]:
+        """Schedule for a catalogue or XMLTV channel id, if it has guide data"""
+        return self._schedules.get(self._aliases.get(channel_id, channel_id))
+
+    def now_next(
+        self, channel_id: str, at: Optional[datetime] = None, upcoming: int = 5
+    ) -> Optional[Tuple[Optional[Programme], List[Programme]]]:
+        """
+        Current and upcoming programmes for a catalogue or XMLTV channel id,
+        or None when the channel has no guide data.
+        """
+        schedule = self.schedule(channel_id)
+        if schedule is None:
+            return None
+        return schedule.now_next(at or datetime.utcnow(), upcoming)
+
+    def window(
+        self, channel_ids: Iterable[str], start: datetime, end: datetime
+    ) -> Dict[str, Tuple[Optional[Programme], List[Programme]]]:
+        """
+        Programme airing at ``start`` and those starting before ``end`` for
+        each channel with guide data; channels without any are left out.
+        """
+        results = {}
+        for channel_id in channel_ids:
+            schedule = self.schedule(channel_id)
+            if schedule is not None:
+                results[channel_id] = schedule.window(start, end)
+        return results
+
+
+async def aprogramme_details(
+    db, programmes: Iterable[Programme]
+) -> Dict[int, Tuple[Optional[str], Optional[str]]]:
+    """
+    ``(description, category)`` by programme id, read by primary key for
+    just the programmes a lookup returned. Programmes purged since the
+    index was built are left out.
+    """
+    ids = sorted({programme.id for programme in programmes})
+    details = {}
+    for i in range(0, len(ids), _DETAILS_CHUNK):
+        rows = await db.execute(
+            select(EPGProgram.id, EPGProgram.description, EPGProgram.category)
+            .where(EPGProgram.id.in_(ids[i:i + _DETAILS_CHUNK]))
+        )
+        details.update((row.id, (row.description, row.category)) for row in rows)
+    return details
+
+
+epg_index = EPGIndex()
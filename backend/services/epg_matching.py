@@ -0,0 +1,278 @@
+"""Match playlist channels to XMLTV guide channels"""
+import logging
+import math
+import re
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from backend.config import settings
+from backend.database import dialect_insert
+from backend.models.channel import Channel
+from backend.models.epg import EPGChannel, EPGMapping
+from backend.services.catalogue import bump_catalogue_version
+
+logger = logging.getLogger(__name__)
+
+# Country / language prefixes such as "UK: ", "DE | ", "[US] ". Only the
+# codes below count, so a name like "CNN: Breaking News" keeps its "CNN".
+_PREFIX_RE = re.compile(r'^\s*(?:\[\s*([a-z]{2,3})\s*\]|([a-z]{2,3})\s*[:|])\s*')
+_PREFIX_CODES = frozenset((
+    # ISO 3166-1 alpha-2 countries seen in playlists, plus "uk"
+    'ad', 'ae', 'al', 'am', 'ar', 'at', 'au', 'az', 'ba', 'bd', 'be', 'bg', 'bh', 'br',
+    'by', 'ca', 'ch', 'cl', 'cn', 'co', 'cy', 'cz', 'de', 'dk', 'dz', 'ee', 'eg', 'es',
+    'fi', 'fr', 'gb', 'ge', 'gr', 'hk', 'hr', 'hu', 'id', 'ie', 'il', 'in', 'iq', 'ir',
+    'is', 'it', 'jo', 'jp', 'kr', 'kw', 'kz', 'lb', 'lt', 'lu', 'lv', 'ly', 'ma', 'md',
+    'me', 'mk', 'mt', 'mx', 'my', 'ng', 'nl', 'no', 'nz', 'om', 'pe', 'ph', 'pk', 'pl',
+    'ps', 'pt', 'qa', 'ro', 'rs', 'ru', 'sa', 'se', 'sg', 'si', 'sk', 'sy', 'th', 'tn',
+    'tr', 'tw', 'ua', 'uk', 'us', 'uy', 've', 'vn', 'ye', 'za',
+    # ISO 3166-1 alpha-3 / ISO 639-2 codes and common variants
+    'ara', 'aus', 'aut', 'bel', 'bra', 'can', 'che', 'chn', 'cze', 'deu', 'dnk', 'eng',
+    'esp', 'fra', 'fre', 'gbr', 'ger', 'gre', 'hun', 'ind', 'irl', 'ita', 'jpn', 'kor',
+    'lat', 'mex', 'nld', 'nor', 'pol', 'por', 'prt', 'rom', 'rou', 'rus', 'spa', 'srb',
+    'swe', 'tur', 'ukr', 'usa',
+))
+# Quality and variant markers that do not change which guide applies
+_QUALITY_RE = re.compile(
+    r'\b(?:hd|fhd|uhd|sd|hq|lq|[48]k|hevc|h26[45]|\d{3,4}[pi]|\d{2}fps|backup|raw)\b'
+)
+_NON_ALNUM_RE = re.compile(r'[\W_]+')
+# XMLTV ids are often "Name.cc"; the country suffix is not part of the name
+_ID_SUFFIX_RE = re.compile(r'\.[a-z]{2,3}$')
+_DIGITS_RE = re.compile(r'\d+')
+# epg_mappings columns an upsert overwrites
+_MAPPING_COLUMNS = ('epg_id', 'score', 'method', 'updated_at')
+
+
+def _strip_prefix(match: re.Match) -> str:
+    code = match.group(1) or match.group(2)
+    return '' if code in _PREFIX_CODES else match.group(0)
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """
+    Reduce a channel name to a comparison key: casefolded, without country
+    prefixes, quality suffixes, punctuation or spaces.
+
+    >>> normalize_name('UK: BBC One HD')
+    'bbcone'
+    """
+    if not name:
+        return ''
+    name = _PREFIX_RE.sub(_strip_prefix, name.casefold())
+    name = _NON_ALNUM_RE.sub(' ', name)
+    name = _QUALITY_RE.sub(' ', name)
+    return ''.join(name.split())
+
+
+def trigrams(key: str) -> Set[str]:
+    """Character trigrams of a normalized key, padded so short keys still have some"""
+    padded = f' {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def digit_tokens(key: str) -> Tuple[int, ...]:
+    """
+    The numbers in a normalized key. Names that differ only in a number
+    ("Sky Sports 1" and "Sky Sports 10") are near-identical by trigrams but
+    are different channels.
+    """
+    return tuple(int(digits) for digits in _DIGITS_RE.findall(key))
+
+
+class Match(NamedTuple):
+    epg_id: Optional[str]
+    score: float
+    method: str
+
+
+class EPGMatcher:
+    """
+    Lookup structures over the XMLTV channel list.
+
+    Every display name (and the id, minus its country suffix) is indexed by
+    its normalized key for exact hits, and by its trigrams in an inverted
+    index, so a fuzzy lookup only scores guide channels that share one of
+    the name's rarer trigrams instead of comparing against all of them.
+    A fuzzy hit must also carry exactly the name's numbers.
+    """
+
+    def __init__(self, channels: Iterable[Tuple[str, Sequence[str]]]):
+        self.ids: Dict[str, str] = {}
+        self.exact: Dict[str, str] = {}
+        self.entries: List[Tuple[str, str, FrozenSet[str], Tuple[int, ...]]] = []
+        self.postings: Dict[str, List[int]] = {}
+
+        for epg_id, display_names in channels:
+            self.ids.setdefault(epg_id.casefold(), epg_id)
+            keys = {normalize_name(name) for name in display_names}
+            keys.add(normalize_name(_ID_SUFFIX_RE.sub('', epg_id.casefold())))
+            for key in keys:
+                if not key or key in self.exact:
+                    continue
+                self.exact[key] = epg_id
+                grams = frozenset(trigrams(key))
+                position = len(self.entries)
+                self.entries.append((epg_id, key, grams, digit_tokens(key)))
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(position)
+
+    def match(self, name: Optional[str], tvg_id: Optional[str] = None) -> Match:
+        """Best guide channel for a playlist entry, or a Match with epg_id None"""
+        if tvg_id and tvg_id.casefold() in self.ids:
+            return Match(self.ids[tvg_id.casefold()], 1.0, 'tvg_id')
+
+        key = normalize_name(name)
+        if key in self.exact:
+            return Match(self.exact[key], 1.0, 'exact')
+        if len(key) < settings.epg_match_min_length:
+            return Match(None, 0.0, 'none')
+
+        threshold = settings.epg_match_threshold
+        grams = trigrams(key)
+        digits = digit_tokens(key)
+        # Prefix filter: a candidate reaching the Dice threshold shares at
+        # least ``overlap`` trigrams with the name, so it must contain one
+        # of the ``len(grams) - overlap + 1`` rarest ones. Only those
+        # postings are read, which keeps common trigrams ("new", "spo")
+        # from pulling in most of the guide.
+        overlap = math.ceil(threshold * len(grams) / (2 - threshold))
+        probes = sorted(grams, key=lambda g: len(self.postings.get(g, ())))
+        candidates = set()
+        for gram in probes[:max(1, len(grams) - overlap + 1)]:
+            candidates.update(self.postings.get(gram, ()))
+
+        best, best_score = None, 0.0
+        for position in candidates:
+            epg_id, candidate, candidate_grams, candidate_digits = self.entries[position]
+            if candidate_digits != digits:
+                continue
+            # Dice coefficient over trigram sets
+            score = 2.0 * len(grams & candidate_grams) / (len(grams) + len(candidate_grams))
+            if score > best_score or (
+                score == best_score and best is not None
+                and abs(len(candidate) - len(key)) < abs(len(best[1]) - len(key))
+            ):
+                best, best_score = (epg_id, candidate), score
+
+        if best is None or best_score < threshold:
+            return Match(None, round(best_score, 3), 'none')
+        return Match(best[0], round(best_score, 3), 'trigram')
+
+
+def assign_epg_ids(db: Session, rematch: bool = False) -> Dict[str, int]:
+    """
+    Point channels without a usable guide id at the best XMLTV channel.
+
+    A channel needs matching when its ``epg_id`` is not a known XMLTV id.
+    Results are stored in ``epg_mappings`` keyed by normalized name, so
+    channels seen by earlier imports reuse their mapping instead of being
+    matched again; misses are stored too. ``rematch`` discards the automatic
+    mappings and matches again every channel without a valid tvg-id of its
+    own, including those assigned by an earlier match. Manual mappings
+    (``set_manual_mapping``) always win. Channels are updated in one
+    executemany UPDATE; the caller commits.
+
+    Returns assigned/reused/matched/unmatched counts.
+    """
+    stats = {'assigned': 0, 'reused': 0, 'matched': 0, 'unmatched': 0}
+    guide = db.execute(select(EPGChannel.id, EPGChannel.display_names)).all()
+    if not guide:
+        return stats
+    known = {row.id for row in guide}
+
+    if rematch:
+        db.execute(delete(EPGMapping).where(EPGMapping.method != 'manual'))
+    mappings = {row.name_key: row for row in db.execute(
+        select(EPGMapping.name_key, EPGMapping.epg_id, EPGMapping.method)
+    )}
+    manual = {key: row.epg_id for key, row in mappings.items() if row.method == 'manual'}
+
+    pending = []
+    for row in db.execute(select(Channel.id, Channel.name, Channel.epg_id, Channel.attributes)):
+        # The playlist's own tvg-id; an epg_id that differs was assigned here
+        tvg_id = row.attributes.get('tvg-id') if row.attributes is not None else row.epg_id
+        key = normalize_name(row.name)
+        if (
+            row.epg_id not in known
+            or (rematch and row.epg_id != tvg_id and tvg_id not in known)
+            or (key in manual and manual[key] != row.epg_id)
+        ):
+            pending.append((row, key, tvg_id))
+    if not pending:
+        return stats
+
+    matcher = None
+    new_mappings: Dict[str, Dict] = {}
+    updates = []
+    now = datetime.utcnow()
+    for channel, key, tvg_id in pending:
+        mapping = mappings.get(key) if key else None
+        if mapping is not None and (mapping.epg_id is None or mapping.epg_id in known):
+            epg_id = mapping.epg_id
+            stats['reused'] += 1
+        elif key in new_mappings:
+            epg_id = new_mappings[key]['epg_id']
+            stats['reused'] += 1
+        else:
+            if matcher is None:
+                matcher = EPGMatcher((row.id, row.display_names) for row in guide)
+            match = matcher.match(channel.name, tvg_id)
+            epg_id = match.epg_id
+            stats['matched' if epg_id else 'unmatched'] += 1
+            # A tvg-id hit is specific to this entry, not to its name
+            if key and match.method != 'tvg_id':
+                new_mappings[key] = {
+                    'name_key': key, 'epg_id': epg_id, 'score': match.score,
+                    'method': match.method, 'updated_at': now,
+                }
+        # A miss leaves (or puts back) the playlist's own tvg-id
+        epg_id = epg_id or tvg_id
+        if epg_id != channel.epg_id:
+            updates.append({'id': channel.id, 'epg_id': epg_id})
+
+    if new_mappings:
+        stmt = dialect_insert(db, EPGMapping.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name_key'],
+            set_={column: stmt.excluded[column] for column in _MAPPING_COLUMNS},
+            where=EPGMapping.__table__.c.method != 'manual',
+        )
+        db.execute(stmt, list(new_mappings.values()))
+    if updates:
+        db.execute(update(Channel), updates)
+        bump_catalogue_version(db)
+    stats['assigned'] = len(updates)
+    logger.info("EPG id assignment: %s", stats)
+    return stats
+
+
+def forget_misses(db: Session) -> int:
+    """Drop cached misses so the next assignment retries them (new guide data)"""
+    return db.execute(delete(EPGMapping).where(EPGMapping.epg_id.is_(None))).rowcount
+
+
+def set_manual_mapping(db: Session, name: str, epg_id: str) -> Dict[str, int]:
+    """
+    Pin every channel whose name normalizes like ``name`` to the XMLTV
+    channel ``epg_id``, overriding automatic matches and tvg-ids, and apply
+    it at once. Raises ValueError for an empty name or an unknown guide id;
+    the caller commits.
+
+    Returns the assignment counts of ``assign_epg_ids``.
+    """
+    key = normalize_name(name)
+    if not key:
+        raise ValueError("Channel name is empty once normalized")
+    if db.get(EPGChannel, epg_id) is None:
+        raise ValueError(f"Unknown guide channel '{epg_id}'")
+    stmt = dialect_insert(db, EPGMapping.__table__)
+    row = {'name_key': key, 'epg_id': epg_id, 'score': 1.0, 'method': 'manual',
+           'updated_at': datetime.utcnow()}
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=['name_key'],
+        set_={column: stmt.excluded[column] for column in _MAPPING_COLUMNS},
+    ), [row])
+    return assign_epg_ids(db)
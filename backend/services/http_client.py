@@ -0,0 +1,73 @@
+"""Shared, pooled async HTTP client for upstream fetches"""
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from backend.config import settings
+
+# httpx decodes brotli bodies only when a brotli binding is importable
+_BROTLI_AVAILABLE = any(
+    importlib.util.find_spec(module) is not None for module in ('brotli', 'brotlicffi')
+)
+ACCEPT_ENCODING = 'gzip, deflate, br' if _BROTLI_AVAILABLE else 'gzip, deflate'
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Build a pooled AsyncClient with the configured limits"""
+    return httpx.AsyncClient(
+        timeout=settings.http_timeout,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+        ),
+        headers={'Accept-Encoding': ACCEPT_ENCODING},
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide AsyncClient, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client; called on application shutdown"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@asynccontextmanager
+async def fetch(
+    url: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> AsyncIterator[httpx.Response]:
+    """
+    Stream a GET response from the shared client.
+
+    When validators from a previous fetch are given the request is
+    conditional; callers should treat ``status_code == 304`` as "no change".
+    Any other non-2xx status raises ``httpx.HTTPStatusError``. Code running
+    outside the API event loop (worker threads) passes its own ``client``.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    client = client or get_http_client()
+    async with client.stream('GET', url, headers=headers) as response:
+        if response.status_code != 304:
+            response.raise_for_status()
+        yield response
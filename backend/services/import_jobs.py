@@ -0,0 +1,323 @@
+"""Background job queue for playlist imports"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import IO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.services.batch_import import DEFAULT_PRIORITY_RULES, fetch_playlists, merge_channels
+from backend.services.http_client import create_http_client, fetch
+from backend.services.playlist_service import (
+    CHUNK_SIZE,
+    SPOOL_MAX_SIZE,
+    ChannelWriter,
+    M3U8Parser,
+    iter_text_lines,
+)
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress writes to the job store
+PROGRESS_INTERVAL = 0.5
+
+_KEY_PREFIX = "ladybug:import-jobs"
+
+
+class MemoryJobStore:
+    """
+    In-process job store and queue, used when Redis is not configured.
+
+    Like the Redis store, a job expires ``settings.import_job_ttl`` seconds
+    after it was last saved, so finished jobs do not pile up.
+    """
+
+    def __init__(self):
+        # Job id -> (expiry, job), least recently saved first
+        self._jobs: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+
+    def save(self, job: Dict):
+        with self._lock:
+            now = time.monotonic()
+            self._jobs[job['id']] = (now + settings.import_job_ttl, json.loads(json.dumps(job)))
+            self._jobs.move_to_end(job['id'])
+            while self._jobs and next(iter(self._jobs.values()))[0] <= now:
+                self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            expires, job = self._jobs.get(job_id, (0.0, None))
+            if job is None or expires <= time.monotonic():
+                return None
+            return json.loads(json.dumps(job))
+
+    def push(self, job_id: str):
+        self._queue.put(job_id)
+
+    def pop(self, timeout: float) -> Optional[str]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class RedisJobStore:
+    """
+    Redis-backed job store and queue.
+
+    Jobs are JSON strings that expire after ``settings.import_job_ttl``; the
+    queue is a list, so any API process with workers can pick jobs up.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def save(self, job: Dict):
+        self.client.set(
+            f"{_KEY_PREFIX}:{job['id']}", json.dumps(job), ex=settings.import_job_ttl
+        )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        raw = self.client.get(f"{_KEY_PREFIX}:{job_id}")
+        return json.loads(raw) if raw else None
+
+    def push(self, job_id: str):
+        self.client.lpush(f"{_KEY_PREFIX}:queue", job_id)
+
+    def pop(self, timeout: float) -> Optional[str]:
+        item = self.client.brpop(f"{_KEY_PREFIX}:queue", timeout=max(1, int(timeout)))
+        if item is None:
+            return None
+        _, job_id = item
+        return job_id.decode() if isinstance(job_id, bytes) else job_id
+
+
+def create_job_store():
+    """Use Redis when it is configured and reachable, otherwise stay in-process"""
+    if settings.redis_url:
+        try:
+            import redis
+
+            client = redis.Redis.from_url(settings.redis_url)
+            client.ping()
+            return RedisJobStore(client)
+        except Exception as e:
+            logger.warning("Redis unavailable for import jobs, using in-process queue: %s", e)
+    return MemoryJobStore()
+
+
+class JobProgress:
+    """Progress counters for a running job, persisted at most every PROGRESS_INTERVAL"""
+
+    def __init__(self, store, job: Dict):
+        self.store = store
+        self.job = job
+        self.bytes_read = 0
+        self.channels_parsed = 0
+        self.channels_written = 0
+        self._last_saved = 0.0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            'bytes_read': self.bytes_read,
+            'channels_parsed': self.channels_parsed,
+            'channels_written': self.channels_written,
+        }
+
+    def save(self, force: bool = False):
+        now = time.monotonic()
+        if force or now - self._last_saved >= PROGRESS_INTERVAL:
+            self.job['progress'] = self.as_dict()
+            self.store.save(self.job)
+            self._last_saved = now
+
+    def count_bytes(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
+class ImportJobQueue:
+    """
+    Queue playlist imports and run them on a pool of worker threads.
+
+    Each worker owns its DB session for the duration of a job, so several
+    imports can run at once without occupying API request handlers.
+    """
+
+    def __init__(self, store=None, workers: Optional[int] = None):
+        self.store = store
+        self.workers = workers or settings.import_workers
+        self._threads = []
+        self._stopping = threading.Event()
+        self._runners: Dict[str, Callable] = {
+            'url': self._run_url_import,
+            'file': self._run_file_import,
+            'batch': self._run_batch_import,
+        }
+
+    def start(self):
+        """Start the worker threads"""
+        if self.store is None:
+            self.store = create_job_store()
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"import-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Ask the workers to exit after their current job"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def submit(self, kind: str, **params) -> Dict:
+        """Record a queued job and hand it to the workers"""
+        if kind not in self._runners:
+            raise ValueError(f"Unknown import job kind: {kind}")
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'params': params,
+            'status': 'queued',
+            'created_at': datetime.utcnow().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'progress': {'bytes_read': 0, 'channels_parsed': 0, 'channels_written': 0},
+            'result': None,
+            'error': None,
+        }
+        self.store.save(job)
+        self.store.push(job['id'])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Current state of a job, or None if unknown or expired"""
+        return self.store.get(job_id)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job_id = self.store.pop(timeout=1)
+            if job_id is None:
+                continue
+            job = self.store.get(job_id)
+            if job is None:
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict):
+        job['status'] = 'running'
+        job['started_at'] = datetime.utcnow().isoformat()
+        self.store.save(job)
+        progress = JobProgress(self.store, job)
+
+        db = SessionLocal()
+        try:
+            result = self._runners[job['kind']](db, job['params'], progress)
+            job['status'] = 'completed'
+            job['result'] = result
+        except Exception as e:
+            logger.exception("Import job %s failed", job['id'])
+            db.rollback()
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        finally:
+            db.close()
+            job['finished_at'] = datetime.utcnow().isoformat()
+            progress.save(force=True)
+
+    def _import(self, db, chunks: Iterable[bytes], progress: JobProgress) -> Dict:
+        """Parse and write a playlist body, updating progress as it goes"""
+        parser = M3U8Parser(db)
+        writer = ChannelWriter(db)
+        lines = iter_text_lines(chunks)
+        for channel in parser.iter_playlist(lines):
+            writer.add(channel)
+            progress.channels_parsed = parser.total_parsed
+            progress.channels_written = writer.written
+            progress.save()
+        result = writer.finish()
+        progress.channels_written = writer.written
+        return {'total_parsed': parser.total_parsed, **result}
+
+    def _run_url_import(self, db, params: Dict, progress: JobProgress) -> Dict:
+        """Download the playlist into a spool, then parse and write it"""
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+            try:
+                # Worker threads have no event loop of their own; the download
+                # gets a private loop and HTTP client, as batch imports do
+                asyncio.run(_download(params['url'], spool, progress))
+            except Exception as e:
+                raise Exception(f"Failed to fetch playlist: {str(e)}")
+            spool.seek(0)
+            return self._import(db, iter(lambda: spool.read(CHUNK_SIZE), b''), progress)
+
+    def _run_file_import(self, db, params: Dict, progress: JobProgress) -> Dict:
+        path = params['path']
+        try:
+            with open(path, 'rb') as f:
+                chunks = progress.count_bytes(iter(lambda: f.read(CHUNK_SIZE), b''))
+                return self._import(db, chunks, progress)
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _run_batch_import(self, db, params: Dict, progress: JobProgress) -> Dict:
+        """Fetch several playlists concurrently, deduplicate, then write once"""
+        sources = params['sources']
+
+        def on_parsed(count: int):
+            progress.channels_parsed = count
+            progress.save()
+
+        # Worker threads have no event loop of their own; the fan-out gets a
+        # private loop and HTTP client for the duration of the job
+        results = asyncio.run(fetch_playlists(sources, params.get('concurrency'), on_parsed))
+        merged, duplicates = merge_channels(
+            sources, results, params.get('rules') or DEFAULT_PRIORITY_RULES
+        )
+
+        writer = ChannelWriter(db)
+        for channel in merged:
+            writer.add(channel)
+            progress.channels_written = writer.written
+            progress.save()
+        result = writer.finish()
+        progress.channels_written = writer.written
+
+        return {
+            'sources': [
+                {'url': r['url'], 'parsed': len(r['channels']), 'error': r['error']}
+                for r in results
+            ],
+            'total_parsed': sum(len(r['channels']) for r in results),
+            'duplicates_removed': duplicates,
+            **result,
+        }
+
+
+async def _download(url: str, spool: IO[bytes], progress: JobProgress):
+    """Stream a playlist body into ``spool``, counting bytes as they arrive"""
+    async with create_http_client() as client:
+        async with fetch(url, client=client) as response:
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                spool.write(chunk)
+                progress.bytes_read += len(chunk)
+                progress.save()
+
+
+import_queue = ImportJobQueue()
@@ -1,122 +1,525 @@
 """M3U8 playlist parsing and channel import service"""
-import re
-import requests
-from typing import List, Dict, Optional
+import codecs
+import hashlib
+import json
+import tempfile
+from datetime import datetime
+from typing import IO, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+
+from backend.config import settings
+from backend.database import SessionLocal, dialect_insert
 from backend.models.channel import Channel
+from backend.models.playlist import PlaylistSource
+from backend.services.catalogue import bump_catalogue_version
+from backend.services.epg_matching import assign_epg_ids
+from backend.services.http_client import fetch
+from backend.services.response_cache import invalidate_catalogue
+
+# Bytes pulled from a file or response body per read
+CHUNK_SIZE = 64 * 1024
+
+# EXTINF attributes copied to top-level channel keys
+_PROMOTED_ATTRIBUTES = (
+    ('tvg-id', 'tvg_id'),
+    ('tvg-name', 'tvg_name'),
+    ('tvg-logo', 'logo'),
+    ('group-title', 'category'),
+)
+
+
+def iter_text_lines(
+    chunks: Iterable[Union[bytes, str]], encoding: str = 'utf-8-sig'
+) -> Iterator[str]:
+    """
+    Turn a stream of byte (or text) chunks into lines without buffering the
+    whole body. Multi-byte characters split across chunks are handled by an
+    incremental decoder; a leading BOM is dropped.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    tail = ''
+    for chunk in chunks:
+        text = decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        if not text:
+            continue
+        lines = (tail + text).splitlines(keepends=True)
+        # The last piece may be an incomplete line; carry it into the next chunk
+        tail = lines.pop() if not lines[-1].endswith(('\n', '\r')) else ''
+        yield from lines
+    tail += decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+async def aiter_text_lines(
+    chunks: AsyncIterable[Union[bytes, str]], encoding: str = 'utf-8-sig'
+) -> AsyncIterator[str]:
+    """Async counterpart of iter_text_lines for response bodies and uploads"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    tail = ''
+    async for chunk in chunks:
+        text = decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        if not text:
+            continue
+        lines = (tail + text).splitlines(keepends=True)
+        tail = lines.pop() if not lines[-1].endswith(('\n', '\r')) else ''
+        for line in lines:
+            yield line
+    tail += decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
 
 class M3U8Parser:
     """Parse M3U8 playlists and extract channel information"""
-    
+
     def __init__(self, db: Session):
         self.db = db
-    
+        # Number of channels yielded by the most recent parse
+        self.total_parsed = 0
+
     def parse_playlist(self, content: str) -> List[Dict]:
         """
         Parse M3U8 playlist content and extract channels
-        
+
         Format:
-        #EXTINF:-1 tvg-id="channel1" tvg-name="Channel Name" tvg-logo="logo.png" group-title="Category",Channel Display Name
+        #EXTINF:-1 tvg-id="ch1" tvg-name="Name" tvg-logo="logo.png" group-title="News",Name HD
         http://stream-url.com/playlist.m3u8
         """
-        channels = []
-        lines = content.strip().split('\n')
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Look for EXTINF lines
-            if line.startswith('#EXTINF'):
-                # Parse metadata from EXTINF line
-                metadata = self._parse_extinf(line)
-                
-                # Next line should be the stream URL
-                if i + 1 < len(lines):
-                    stream_url = lines[i + 1].strip()
-                    if stream_url and not stream_url.startswith('#'):
-                        metadata['stream_url'] = stream_url
-                        channels.append(metadata)
-                
-                i += 2
-            else:
-                i += 1
-        
-        return channels
-    
+        return list(self.iter_playlist(content.splitlines()))
+
+    def iter_playlist(self, lines: Iterable[str]) -> Iterator[Dict]:
+        """
+        Lazily parse playlist lines, yielding one channel at a time.
+
+        Only the metadata of the entry currently being read is held in
+        memory, so the input can be a file object or a streamed body of any
+        size.
+        """
+        self.total_parsed = 0
+        pending = None
+        for line in lines:
+            channel, pending = self._feed_line(line, pending)
+            if channel is not None:
+                self.total_parsed += 1
+                yield channel
+
+    async def aiter_playlist(self, lines: AsyncIterable[str]) -> AsyncIterator[Dict]:
+        """Async counterpart of iter_playlist for streamed HTTP bodies"""
+        self.total_parsed = 0
+        pending = None
+        async for line in lines:
+            channel, pending = self._feed_line(line, pending)
+            if channel is not None:
+                self.total_parsed += 1
+                yield channel
+
+    def _feed_line(self, line: str, pending: Optional[Dict]):
+        """
+        Advance the parser by one line.
+
+        Returns a (channel, pending) pair: channel is a completed record or
+        None, pending is the EXTINF metadata still waiting for its URL.
+        Directives between an EXTINF and its URL (#EXTGRP, #EXTVLCOPT, ...)
+        are skipped.
+        """
+        line = line.strip()
+        if not line:
+            return None, pending
+        if line.startswith('#EXTINF'):
+            return None, self._parse_extinf(line)
+        if line.startswith('#'):
+            return None, pending
+        if pending is None:
+            return None, None
+        pending['stream_url'] = line
+        return pending, None
+
     def _parse_extinf(self, line: str) -> Dict:
-        """Extract metadata from EXTINF line"""
+        """
+        Extract metadata from EXTINF line in a single scan.
+
+        Every key="value" attribute is kept in ``attributes``; the common ones
+        are also promoted to top-level keys. The display name is whatever
+        follows the first comma outside a quoted value, or tvg-name when that
+        is blank.
+
+        Splitting on quotes puts the quoted values at odd indices, so a comma
+        inside group-title="News, UK" is never taken for the name separator.
+        """
         metadata = {}
-        
-        # Extract tvg-id
-        tvg_id_match = re.search(r'tvg-id="([^"]*)"', line)
-        if tvg_id_match:
-            metadata['tvg_id'] = tvg_id_match.group(1)
-        
-        # Extract tvg-name
-        tvg_name_match = re.search(r'tvg-name="([^"]*)"', line)
-        if tvg_name_match:
-            metadata['tvg_name'] = tvg_name_match.group(1)
-        
-        # Extract tvg-logo
-        tvg_logo_match = re.search(r'tvg-logo="([^"]*)"', line)
-        if tvg_logo_match:
-            metadata['logo'] = tvg_logo_match.group(1)
-        
-        # Extract group-title (category)
-        group_match = re.search(r'group-title="([^"]*)"', line)
-        if group_match:
-            metadata['category'] = group_match.group(1)
-        
-        # Extract channel name (after the last comma)
-        name_match = re.search(r',(.+)$', line)
-        if name_match:
-            metadata['name'] = name_match.group(1).strip()
-        
+        attributes = {}
+        parts = line.split('"')
+        last = len(parts) - 1
+        name = ''
+
+        for i in range(0, len(parts), 2):
+            text = parts[i]
+            comma = text.find(',')
+            if comma != -1:
+                name = text[comma + 1:]
+                if i < last:
+                    name += '"' + '"'.join(parts[i + 1:])
+                break
+            if i < last and text.endswith('='):
+                key = text[:-1].rpartition(' ')[2]
+                if key:
+                    attributes[key] = parts[i + 1]
+
+        name = name.strip() or attributes.get('tvg-name', '').strip()
+        if name:
+            metadata['name'] = name
+        for attribute, field in _PROMOTED_ATTRIBUTES:
+            if attribute in attributes:
+                metadata[field] = attributes[attribute]
+        metadata['attributes'] = attributes
+
         return metadata
-    
-    def parse_from_url(self, url: str) -> List[Dict]:
-        """Fetch and parse M3U8 playlist from URL"""
+
+    async def aparse_from_url(
+        self, url: str, client: Optional[httpx.AsyncClient] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Fetch and parse M3U8 playlist from URL on the shared async client.
+
+        The (possibly gzip/brotli encoded) body is decoded and fed to the
+        parser chunk by chunk without blocking the event loop.
+        """
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            return self.parse_playlist(response.text)
+            async with fetch(url, client=client) as response:
+                chunks = response.aiter_bytes(CHUNK_SIZE)
+                async for channel in self.aiter_playlist(aiter_text_lines(chunks)):
+                    yield channel
         except Exception as e:
             raise Exception(f"Failed to fetch playlist: {str(e)}")
-    
-    def parse_from_file(self, file_path: str) -> List[Dict]:
+
+    def parse_from_file(self, file_path: str) -> Iterator[Dict]:
         """Parse M3U8 playlist from file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return self.parse_playlist(content)
+            with open(file_path, 'rb') as f:
+                yield from self.parse_from_stream(f)
         except Exception as e:
             raise Exception(f"Failed to read playlist file: {str(e)}")
-    
-    def import_channels(self, channels: List[Dict]) -> int:
-        """Import parsed channels into database"""
-        imported = 0
-        
+
+    def parse_from_stream(self, fileobj: IO) -> Iterator[Dict]:
+        """Parse M3U8 playlist from an open binary or text file object"""
+        chunks = iter(lambda: fileobj.read(CHUNK_SIZE), b'')
+        if 'b' not in getattr(fileobj, 'mode', 'b'):
+            chunks = iter(lambda: fileobj.read(CHUNK_SIZE), '')
+        return self.iter_playlist(iter_text_lines(chunks))
+
+    def bulk_import_channels(
+        self,
+        channels: Iterable[Dict],
+        batch_size: Optional[int] = None,
+        update_existing: bool = True,
+        source_id: Optional[int] = None,
+        deactivate_missing: bool = False,
+    ) -> Dict[str, int]:
+        """
+        Import parsed channels with set-based reads and batched writes.
+
+        Existing channels are loaded with a single query keyed by stream_url;
+        new rows are inserted and changed rows updated in multi-row
+        statements of ``batch_size``. A row counts as changed when its
+        metadata hash differs or it was inactive. Rows that are unchanged, or
+        repeat a stream_url already seen in this import, are skipped.
+
+        With ``source_id`` the channels are attributed to that playlist
+        source; ``deactivate_missing`` additionally marks the source's
+        channels that no longer appear as inactive.
+
+        Returns inserted/updated/skipped/deactivated counts.
+        """
+        writer = ChannelWriter(self.db, batch_size, update_existing, source_id)
         for channel_data in channels:
-            # Check if channel already exists
-            existing = self.db.query(Channel).filter(
-                Channel.stream_url == channel_data.get('stream_url')
-            ).first()
-            
-            if not existing:
-                channel = Channel(
-                    id=channel_data.get('tvg_id') or f"ch-{imported}",
-                    name=channel_data.get('name', 'Unknown'),
-                    category=channel_data.get('category', 'Uncategorized'),
-                    logo=channel_data.get('logo'),
-                    stream_url=channel_data['stream_url'],
-                    epg_id=channel_data.get('tvg_id'),
-                    is_active=True
+            writer.add(channel_data)
+        return writer.finish(deactivate_missing)
+
+    def sync_from_stream(self, source_url: str, fileobj: IO) -> Dict:
+        """Incrementally re-sync a playlist source from a seekable binary file"""
+        return self._sync_source(self._get_source(source_url), fileobj)
+
+    def _get_source(self, url: str) -> PlaylistSource:
+        """Load the playlist source row for a URL, creating it on first sync"""
+        source = self.db.execute(
+            select(PlaylistSource).where(PlaylistSource.url == url)
+        ).scalar_one_or_none()
+        if source is None:
+            source = PlaylistSource(url=url)
+            self.db.add(source)
+            self.db.flush()
+        return source
+
+    def _sync_source(self, source: PlaylistSource, fileobj: IO) -> Dict:
+        """
+        Apply a playlist body to its source.
+
+        If the whole-playlist hash matches the previous sync nothing else is
+        done. Otherwise only the diff is applied: new channels are inserted,
+        channels whose metadata hash changed are updated, and channels that
+        vanished from the playlist are marked inactive.
+        """
+        content_hash = _file_hash(fileobj)
+        fileobj.seek(0)
+        if source.content_hash == content_hash:
+            return self._mark_unchanged(source)
+
+        result = self.bulk_import_channels(
+            self.parse_from_stream(fileobj),
+            source_id=source.id,
+            deactivate_missing=True,
+        )
+        source.content_hash = content_hash
+        source.channel_count = self.total_parsed
+        source.last_synced_at = datetime.utcnow()
+        self.db.commit()
+        return {'unchanged': False, 'total_parsed': self.total_parsed, **result}
+
+    def _mark_unchanged(self, source: PlaylistSource) -> Dict:
+        """Record a no-op sync and report it"""
+        source.last_synced_at = datetime.utcnow()
+        self.db.commit()
+        return _unchanged_result(source)
+
+
+async def async_sync_from_url(db: AsyncSession, url: str) -> Dict:
+    """
+    Incrementally re-sync a playlist source from a request handler.
+
+    The request is conditional on the ETag / Last-Modified validators
+    stored by the previous sync; a 304 is recorded over ``db`` without
+    downloading the body. A changed body is spooled, then parsed and
+    written on a worker thread with its own sync session: the diff and bulk
+    writes are CPU-bound and would otherwise stall the event loop.
+    """
+    source = (await db.execute(
+        select(PlaylistSource).where(PlaylistSource.url == url)
+    )).scalar_one_or_none()
+    etag = source.etag if source else None
+    last_modified = source.last_modified if source else None
+    try:
+        async with fetch(url, etag, last_modified) as response:
+            if response.status_code == 304 and source is not None:
+                source.last_synced_at = datetime.utcnow()
+                await db.commit()
+                return _unchanged_result(source)
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    spool.write(chunk)
+                spool.seek(0)
+                return await run_in_threadpool(
+                    _sync_spooled, url, spool,
+                    response.headers.get('etag'), response.headers.get('last-modified'),
                 )
-                self.db.add(channel)
-                imported += 1
-        
+    except Exception as e:
+        raise Exception(f"Failed to sync playlist: {str(e)}")
+
+
+def _sync_spooled(url: str, fileobj: IO, etag: Optional[str], last_modified: Optional[str]) -> Dict:
+    db = SessionLocal()
+    try:
+        parser = M3U8Parser(db)
+        source = parser._get_source(url)
+        source.etag = etag
+        source.last_modified = last_modified
+        return parser._sync_source(source, fileobj)
+    finally:
+        db.close()
+
+
+def _unchanged_result(source: PlaylistSource) -> Dict:
+    return {'unchanged': True, 'total_parsed': source.channel_count or 0,
+            'inserted': 0, 'updated': 0, 'skipped': 0, 'deactivated': 0}
+
+
+class ChannelWriter:
+    """
+    Accumulates parsed channels and writes them in batches.
+
+    Existing channels are loaded once, keyed by stream_url, and each added
+    record is classified as insert, update or skip against that snapshot.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        batch_size: Optional[int] = None,
+        update_existing: bool = True,
+        source_id: Optional[int] = None,
+    ):
+        self.db = db
+        self.batch_size = batch_size or settings.import_batch_size
+        self.update_existing = update_existing
+        self.source_id = source_id
+        self.result = {'inserted': 0, 'updated': 0, 'skipped': 0, 'deactivated': 0}
+
+        self.existing = {
+            row.stream_url: row
+            for row in db.execute(select(*_EXISTING_COLUMNS))
+        }
+        self.ids_in_use = {row.id for row in self.existing.values()}
+        self.seen = set()
+        self.inserts: List[Dict] = []
+        self.updates: List[Dict] = []
+
+    @property
+    def written(self) -> int:
+        """Channels inserted or updated so far"""
+        return self.result['inserted'] + self.result['updated']
+
+    def add(self, channel_data: Dict):
+        """Classify one parsed channel and flush full batches"""
+        stream_url = channel_data['stream_url']
+        if stream_url in self.seen:
+            self.result['skipped'] += 1
+            return
+        self.seen.add(stream_url)
+
+        row = _channel_row(channel_data)
+        if self.source_id is not None:
+            row['source_id'] = self.source_id
+        current = self.existing.get(stream_url)
+        if current is not None and _disabled_by_health_check(current):
+            # Stays off until the health checker sees the stream again
+            row['is_active'] = False
+        if current is None:
+            row['id'] = _channel_id(channel_data, self.ids_in_use)
+            self.ids_in_use.add(row['id'])
+            self.inserts.append(row)
+        elif not self.update_existing or _row_matches(current, row):
+            self.result['skipped'] += 1
+            return
+        else:
+            row['id'] = current.id
+            self.updates.append(row)
+
+        if len(self.inserts) >= self.batch_size:
+            self.result['inserted'] += self._flush_inserts()
+        if len(self.updates) >= self.batch_size:
+            self.result['updated'] += self._flush_updates()
+
+    def finish(self, deactivate_missing: bool = False) -> Dict[str, int]:
+        """
+        Flush what is left, optionally deactivate vanished channels, assign
+        guide ids to written channels that lack a usable one, commit.
+        """
+        self.result['inserted'] += self._flush_inserts()
+        self.result['updated'] += self._flush_updates()
+
+        if deactivate_missing and self.source_id is not None:
+            for row in self.existing.values():
+                if (row.source_id == self.source_id
+                        and (row.is_active or _disabled_by_health_check(row))
+                        and row.stream_url not in self.seen):
+                    # check_failures reset: the health checker leaves it off
+                    self.updates.append({'id': row.id, 'is_active': False, 'check_failures': 0})
+                    if len(self.updates) >= self.batch_size:
+                        self.result['deactivated'] += self._flush_updates()
+            self.result['deactivated'] += self._flush_updates()
+
+        if self.written:
+            assign_epg_ids(self.db)
+        changed = self.written or self.result['deactivated']
+        if changed:
+            bump_catalogue_version(self.db)
         self.db.commit()
-        return imported
+        if changed:
+            invalidate_catalogue()
+        return self.result
+
+    def _flush_inserts(self) -> int:
+        """
+        Write pending new channels as one multi-row INSERT.
+
+        Rows whose id was inserted by a concurrent import in the meantime
+        are ignored and counted as skipped.
+        """
+        if not self.inserts:
+            return 0
+        stmt = dialect_insert(self.db, Channel.__table__)
+        if hasattr(stmt, 'on_conflict_do_nothing'):
+            stmt = stmt.on_conflict_do_nothing(index_elements=['id'])
+        result = self.db.execute(stmt.returning(Channel.__table__.c.id), self.inserts)
+        count = len(result.all())
+        self.result['skipped'] += len(self.inserts) - count
+        self.inserts.clear()
+        return count
+
+    def _flush_updates(self) -> int:
+        """Write pending changed channels as one executemany UPDATE by primary key"""
+        count = len(self.updates)
+        if self.updates:
+            self.db.execute(update(Channel), self.updates)
+            self.updates.clear()
+        return count
+
+
+# Largest playlist body kept in memory while hashing before spilling to disk
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Columns loaded once per import to decide insert / update / skip
+_EXISTING_COLUMNS = (
+    Channel.id, Channel.stream_url, Channel.source_id,
+    Channel.content_hash, Channel.is_active, Channel.check_failures,
+)
+
+
+def _channel_row(channel_data: Dict) -> Dict:
+    """Map a parsed playlist record to Channel column values"""
+    row = {
+        'name': channel_data.get('name', 'Unknown'),
+        'category': channel_data.get('category', 'Uncategorized'),
+        'logo': channel_data.get('logo'),
+        'stream_url': channel_data['stream_url'],
+        'epg_id': channel_data.get('tvg_id'),
+        'attributes': channel_data.get('attributes'),
+    }
+    row['content_hash'] = _metadata_hash(row)
+    row['is_active'] = True
+    return row
+
+
+def _metadata_hash(row: Dict) -> str:
+    """Stable hash of a channel's metadata, used to detect changed entries"""
+    payload = json.dumps(row, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _file_hash(fileobj: IO) -> str:
+    """SHA-256 of a binary file object, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _row_matches(current, row: Dict) -> bool:
+    """True when an existing channel already holds the parsed values"""
+    return (
+        current.content_hash == row['content_hash']
+        and bool(current.is_active) == row['is_active']
+        and ('source_id' not in row or current.source_id == row['source_id'])
+    )
+
+
+def _disabled_by_health_check(current) -> bool:
+    """True for a channel the stream health checker turned off as dead"""
+    return not current.is_active and (current.check_failures or 0) >= settings.health_check_failures
 
 
+def _channel_id(channel_data: Dict, ids_in_use: set) -> str:
+    """
+    Pick a primary key for a new channel: its tvg-id when that is free,
+    otherwise a stable id derived from the stream URL.
+    """
+    tvg_id = channel_data.get('tvg_id')
+    if tvg_id and tvg_id not in ids_in_use:
+        return tvg_id
+    digest = hashlib.sha1(channel_data['stream_url'].encode('utf-8')).hexdigest()
+    return f"ch-{digest[:12]}"
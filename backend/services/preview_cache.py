@@ -0,0 +1,51 @@
+"""On-disk TTL cache for playlist previews"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Optional
+
+from backend.config import settings
+
+
+class PreviewCache:
+    """
+    Store preview responses as JSON files keyed by a hash of the URL.
+
+    Entries older than ``ttl`` seconds are treated as missing; writes go
+    through a temporary file and an atomic rename so concurrent readers
+    never see a partial entry.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[int] = None):
+        self.directory = directory or settings.preview_cache_dir
+        self.ttl = settings.preview_cache_ttl if ttl is None else ttl
+
+    def _path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, url: str) -> Optional[dict]:
+        """Return the cached preview for a URL, or None if missing or expired"""
+        path = self._path(url)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, url: str, payload: dict):
+        """Cache a preview for a URL"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self._path(url))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
@@ -0,0 +1,250 @@
+"""Response cache for read endpoints: Redis with an in-process LRU fallback"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "ladybug:cache"
+
+# Namespaces; invalidation drops a whole namespace at once
+CHANNELS = "channels"
+STREAMS = "streams"
+# Stream relay: ffprobe codec summaries per stream URL
+PROBES = "probes"
+
+# Namespaces invalidated by other processes too: the EPG worker, the
+# health checker and imports on other API workers all change channels
+_SHARED_NAMESPACES = (CHANNELS, STREAMS)
+
+
+class MemoryCacheBackend:
+    """
+    Per-process LRU, used when Redis is not configured or unreachable.
+
+    Invalidations from other processes cannot reach it, so entries in the
+    shared namespaces live at most ``settings.cache_local_ttl`` seconds
+    (0 stops caching them). Entry keys carry the namespace's generation,
+    like the Redis backend's, so a value loaded across an invalidation in
+    this process is written where it is never read.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        # (namespace, generation, key) -> (expiry, value)
+        self._entries: "OrderedDict[Tuple[str, int, str], Tuple[float, str]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, namespace: str, key: str) -> Tuple[Optional[str], Hashable]:
+        """The cached value, or None, and the key a loaded value is set under"""
+        with self._lock:
+            entry_key = (namespace, self._generations.get(namespace, 0), key)
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                return None, entry_key
+            expires, value = entry
+            if expires < time.time():
+                del self._entries[entry_key]
+                return None, entry_key
+            self._entries.move_to_end(entry_key)
+            return value, entry_key
+
+    async def set(self, entry_key: Tuple[str, int, str], value: str, ttl: int):
+        namespace, generation, _ = entry_key
+        if namespace in _SHARED_NAMESPACES:
+            ttl = min(ttl, settings.cache_local_ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            if generation != self._generations.get(namespace, 0):
+                return
+            self._entries[entry_key] = (time.time() + ttl, value)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: str):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for entry_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[entry_key]
+
+
+class RedisCacheBackend:
+    """
+    One Redis key per entry, written with ``SET ... EX ttl`` so Redis
+    expires each entry on its own.
+
+    Entry keys embed their namespace's generation, a counter kept under its
+    own key. Invalidation is a single INCR: the old entries are no longer
+    read and expire by their TTL. ``get`` resolves the entry key once and a
+    loaded value is set under that same key, so a value loaded across an
+    INCR from any process lands under the old generation and is never read.
+    Reads use the asyncio client; invalidation comes from worker threads and
+    uses a blocking one.
+    """
+
+    def __init__(self, client, sync_client):
+        self.client = client
+        self.sync_client = sync_client
+
+    @staticmethod
+    def _generation_key(namespace: str) -> str:
+        return f"{_KEY_PREFIX}:{namespace}:generation"
+
+    async def _entry_key(self, namespace: str, key: str) -> str:
+        generation = await self.client.get(self._generation_key(namespace))
+        return f"{_KEY_PREFIX}:{namespace}:{int(generation or 0)}:{key}"
+
+    async def get(self, namespace: str, key: str) -> Tuple[Optional[str], Hashable]:
+        """The cached value, or None, and the key a loaded value is set under"""
+        entry_key = await self._entry_key(namespace, key)
+        raw = await self.client.get(entry_key)
+        return (raw.decode() if raw is not None else None), entry_key
+
+    async def set(self, entry_key: str, value: str, ttl: int):
+        await self.client.set(entry_key, value, ex=ttl)
+
+    def invalidate(self, namespace: str):
+        self.sync_client.incr(self._generation_key(namespace))
+
+
+def create_cache_backend():
+    """
+    Use Redis when it is configured and reachable, otherwise an in-process
+    LRU. Without Redis, channel and stream reads can trail writes made by
+    other processes by up to ``settings.cache_local_ttl`` seconds.
+    """
+    if settings.redis_url:
+        try:
+            import redis
+            import redis.asyncio
+
+            sync_client = redis.Redis.from_url(settings.redis_url)
+            sync_client.ping()
+            return RedisCacheBackend(redis.asyncio.Redis.from_url(settings.redis_url), sync_client)
+        except Exception as e:
+            logger.warning(
+                "Redis unavailable for response cache, using in-process LRU "
+                "(channel reads may trail other processes by %ss): %s",
+                settings.cache_local_ttl, e,
+            )
+    return MemoryCacheBackend(settings.cache_max_entries)
+
+
+class ResponseCache:
+    """
+    Read-through cache with per-key request coalescing.
+
+    On a miss, the first caller runs the loader and concurrent callers for
+    the same key await its result, so a burst of misses costs one database
+    query per process. Values must be JSON-serializable. A result loaded
+    while its namespace was invalidated, by this or any other process, is
+    returned but stored under the old generation, where it is never read.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        # Keyed by the backend's entry key, so loads started after an
+        # invalidation do not join one started before it
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = create_cache_backend()
+        return self._backend
+
+    def _count(self, namespace: str, outcome: str):
+        counters = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'coalesced': 0})
+        counters[outcome] += 1
+
+    async def get(self, namespace: str, key: str) -> Any:
+        """Cached value for ``key``, or None on a miss; never loads"""
+        try:
+            raw, _ = await self.backend.get(namespace, key)
+        except Exception as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+        if raw is None:
+            return None
+        self._count(namespace, 'hits')
+        return json.loads(raw)
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        ttl: int,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Cached value for ``key``, calling ``loader`` at most once per miss"""
+        try:
+            raw, entry_key = await self.backend.get(namespace, key)
+        except Exception as e:
+            logger.warning("Response cache read failed: %s", e)
+            raw, entry_key = None, None
+        if raw is not None:
+            self._count(namespace, 'hits')
+            return json.loads(raw)
+
+        flight = (namespace, key, entry_key)
+        pending = self._inflight.get(flight)
+        if pending is not None:
+            self._count(namespace, 'coalesced')
+            return await asyncio.shield(pending)
+
+        self._count(namespace, 'misses')
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight] = future
+        try:
+            value = await loader()
+            future.set_result(value)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve it here so a failure nobody else awaited is not logged as lost
+            future.exception()
+            raise
+        finally:
+            del self._inflight[flight]
+
+        if ttl > 0 and entry_key is not None:
+            try:
+                await self.backend.set(entry_key, json.dumps(value), ttl)
+            except Exception as e:
+                logger.warning("Response cache write failed: %s", e)
+        return value
+
+    def invalidate(self, *namespaces: str):
+        """Drop every cached value in ``namespaces``; safe to call from any thread"""
+        for namespace in namespaces:
+            try:
+                self.backend.invalidate(namespace)
+            except Exception as e:
+                logger.warning("Response cache invalidation failed: %s", e)
+
+    def stats(self) -> Dict:
+        """Hit/miss/coalesced counters per namespace for this process"""
+        return {
+            'backend': type(self.backend).__name__,
+            'namespaces': {ns: dict(counters) for ns, counters in self._stats.items()},
+        }
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_catalogue():
+    """Called after a commit that changed channels"""
+    response_cache.invalidate(CHANNELS, STREAMS)
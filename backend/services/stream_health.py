@@ -0,0 +1,356 @@
+"""Upstream stream health checks: probe channel stream URLs, disable dead channels"""
+import argparse
+import asyncio
+import itertools
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+from sqlalchemy import Boolean, and_, bindparam, case, func, or_, select, update
+
+from backend.config import settings
+from backend.database import AsyncSessionLocal
+from backend.models.channel import Channel
+from backend.services.catalogue import bump_catalogue_version
+from backend.services.response_cache import invalidate_catalogue
+
+logger = logging.getLogger(__name__)
+
+# Largest playlist read; anything bigger is not a live playlist
+_MAX_PLAYLIST_BYTES = 512 * 1024
+# Bytes asked for from the first segment: enough for its container header
+_SEGMENT_HEADER_BYTES = 1024
+# Master playlists nested deeper than this are treated as broken
+_MAX_PLAYLIST_HOPS = 3
+_PLAYLIST_TAG = b'#EXTM3U'
+_LEADING = b'\xef\xbb\xbf \t\r\n'
+
+
+class StreamCheckError(Exception):
+    """A stream did not answer like a playable live stream"""
+
+
+def _may_be_playlist(body: bytes) -> bool:
+    """True while the bytes read so far could still start an M3U playlist"""
+    head = body.lstrip(_LEADING)[:len(_PLAYLIST_TAG)]
+    return _PLAYLIST_TAG.startswith(head)
+
+
+async def _read_playlist(client: httpx.AsyncClient, url: str) -> Tuple[Optional[bytes], str]:
+    """
+    A playlist body and its final URL after redirects. The body is None
+    when the URL serves media instead, which is read no further than its
+    first bytes.
+    """
+    async with client.stream('GET', url) as response:
+        response.raise_for_status()
+        body = b''
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if not _may_be_playlist(body):
+                return None, str(response.url)
+            if len(body) > _MAX_PLAYLIST_BYTES:
+                raise StreamCheckError(f"Playlist larger than {_MAX_PLAYLIST_BYTES} bytes")
+        if not body.strip(_LEADING):
+            raise StreamCheckError("Empty response")
+        return body, str(response.url)
+
+
+async def _read_segment_header(client: httpx.AsyncClient, url: str):
+    """The first bytes of a segment; servers that ignore the range are cut off after them"""
+    headers = {'Range': f'bytes=0-{_SEGMENT_HEADER_BYTES - 1}'}
+    async with client.stream('GET', url, headers=headers) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            if chunk:
+                return
+    raise StreamCheckError("Empty segment")
+
+
+def _first_entries(playlist: str) -> Tuple[Optional[str], Optional[str]]:
+    """The first variant URI of a master playlist, or the first segment URI of a media playlist"""
+    variant = False
+    for line in playlist.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-STREAM-INF'):
+            variant = True
+        elif line and not line.startswith('#'):
+            return (line, None) if variant else (None, line)
+    return None, None
+
+
+async def check_stream(client: httpx.AsyncClient, url: str) -> int:
+    """
+    Milliseconds until a stream's first media bytes arrive.
+
+    Reads the playlist, following a master playlist to its first variant,
+    and then only the header of the first segment. A URL serving media
+    rather than a playlist passes on its first bytes. Raises
+    ``StreamCheckError`` or ``httpx.HTTPError`` when the stream is not
+    playable.
+    """
+    started = time.perf_counter()
+    for _ in range(_MAX_PLAYLIST_HOPS):
+        body, url = await _read_playlist(client, url)
+        if body is None:
+            break
+        variant, segment = _first_entries(body.decode('utf-8', 'replace'))
+        if segment is not None:
+            await _read_segment_header(client, urljoin(url, segment))
+            break
+        if variant is None:
+            raise StreamCheckError("Playlist lists no segments")
+        url = urljoin(url, variant)
+    else:
+        raise StreamCheckError("Too many nested playlists")
+    return round((time.perf_counter() - started) * 1000)
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def _interleave_by_host(rows: List) -> List:
+    """
+    Rows reordered to take turns between hosts, so the per-host limit does
+    not leave workers queued behind one large provider while others idle.
+    """
+    by_host = defaultdict(list)
+    for row in rows:
+        by_host[_host(row.stream_url)].append(row)
+    return [
+        row for group in itertools.zip_longest(*by_host.values())
+        for row in group if row is not None
+    ]
+
+
+class _HostState:
+    """Per-host request slots and connection failure backoff for one run"""
+
+    __slots__ = ('slots', 'failures', 'resume_at')
+
+    def __init__(self, concurrency: int):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.failures = 0
+        self.resume_at = 0.0
+
+
+class StreamHealthChecker:
+    """
+    One pass over the catalogue's stream URLs.
+
+    Checks active channels, and channels this checker disabled earlier so
+    they come back once their stream does. ``concurrency`` checks run at
+    once, at most ``per_host`` of them against one host, over a single
+    pooled HTTP client.
+
+    A connection failure pauses its host with exponential backoff. Once a
+    host has failed ``health_host_failure_limit`` times in a row, its
+    remaining channels fail without a request for the rest of the run.
+
+    A channel is disabled after ``health_check_failures`` failed checks in
+    a row and enabled again by one that passes. Results are written in
+    bulk every ``batch_size`` channels, with ``is_active`` and
+    ``check_failures`` worked out from the row as it is then, so a playlist
+    sync that deactivated a channel during the pass is not undone. A batch
+    that changes ``is_active`` bumps the catalogue version and invalidates
+    cached listings.
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        per_host: Optional[int] = None,
+        timeout: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        session_factory: Callable = AsyncSessionLocal,
+    ):
+        self.concurrency = concurrency or settings.health_check_concurrency
+        self.per_host = per_host or settings.health_check_per_host
+        self.timeout = timeout or settings.health_check_timeout
+        self.batch_size = batch_size or settings.health_check_batch_size
+        self.client = client
+        self.session_factory = session_factory
+        self._hosts: Dict[str, _HostState] = {}
+        self._pending: List[Dict] = []
+        self._pending_changed = 0
+        self._write_lock = asyncio.Lock()
+        self.result = {
+            'checked': 0, 'passed': 0, 'failed': 0,
+            'disabled': 0, 'enabled': 0, 'hosts_down': 0,
+        }
+
+    async def run(self) -> Dict:
+        """Check every channel due a check and record the results"""
+        started = time.perf_counter()
+        async with self.session_factory() as db:
+            rows = (await db.execute(
+                select(
+                    Channel.id, Channel.stream_url, Channel.is_active, Channel.check_failures,
+                ).where(or_(
+                    Channel.is_active.is_(True),
+                    Channel.check_failures >= settings.health_check_failures,
+                ))
+            )).all()
+        pending = iter(_interleave_by_host(rows))
+
+        async def work():
+            for row in pending:
+                await self._record(row, *await self._check(row))
+
+        own_client = self.client is None
+        if own_client:
+            self.client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+            )
+        try:
+            await asyncio.gather(*(work() for _ in range(min(self.concurrency, len(rows)))))
+            await self._flush()
+        finally:
+            if own_client:
+                await self.client.aclose()
+                self.client = None
+
+        self.result['hosts_down'] = sum(
+            host.failures >= settings.health_host_failure_limit for host in self._hosts.values()
+        )
+        self.result['seconds'] = round(time.perf_counter() - started, 1)
+        logger.info("Stream health check: %s", self.result)
+        return self.result
+
+    async def _check(self, row) -> Tuple[Optional[int], Optional[str]]:
+        """Latency in ms, or None and the reason the check failed"""
+        key = _host(row.stream_url)
+        host = self._hosts.get(key)
+        if host is None:
+            host = self._hosts[key] = _HostState(self.per_host)
+        async with host.slots:
+            if host.failures >= settings.health_host_failure_limit:
+                return None, "Host unreachable"
+            delay = host.resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                latency = await asyncio.wait_for(
+                    check_stream(self.client, row.stream_url), self.timeout
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                host.failures += 1
+                backoff = min(0.5 * 2 ** (host.failures - 1), settings.health_host_max_backoff)
+                host.resume_at = time.monotonic() + backoff
+                return None, f"Connection failed: {e}"
+            except asyncio.TimeoutError:
+                return None, f"No media within {self.timeout:.0f}s"
+            except httpx.HTTPStatusError as e:
+                return None, f"HTTP {e.response.status_code} from {e.request.url}"
+            except (httpx.HTTPError, StreamCheckError) as e:
+                return None, str(e) or type(e).__name__
+            host.failures = 0
+            return latency, None
+
+    async def _record(self, row, latency: Optional[int], error: Optional[str]):
+        passed = latency is not None
+        failures = 0 if passed else (row.check_failures or 0) + 1
+        is_active = passed or (bool(row.is_active) and failures < settings.health_check_failures)
+        self.result['checked'] += 1
+        self.result['passed' if passed else 'failed'] += 1
+        if is_active != bool(row.is_active):
+            self.result['enabled' if is_active else 'disabled'] += 1
+            self._pending_changed += 1
+            logger.info(
+                "Channel %s %s%s", row.id, 'enabled' if is_active else 'disabled',
+                '' if passed else f": {error}",
+            )
+        self._pending.append({
+            'channel_id': row.id,
+            'passed': passed,
+            'latency': latency,
+            'checked_at': datetime.utcnow(),
+        })
+        if len(self._pending) >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self):
+        """Write pending results as one executemany UPDATE by primary key"""
+        async with self._write_lock:
+            batch, self._pending = self._pending, []
+            changed, self._pending_changed = self._pending_changed, 0
+            if not batch:
+                return
+            async with self.session_factory() as db:
+                await db.execute(_result_update(settings.health_check_failures), batch)
+                if changed:
+                    await db.run_sync(bump_catalogue_version)
+                await db.commit()
+            if changed:
+                invalidate_catalogue()
+
+
+def _result_update(limit: int):
+    """
+    UPDATE for one check result. The new values derive from the row's
+    current ones rather than those read at the start of the pass: a failed
+    check disables an active channel on its ``limit``th failure in a row; a
+    passed one enables only a channel the checker disabled, and not one a
+    playlist sync has since deactivated, which resets its failures.
+    """
+    channels = Channel.__table__
+    failures = func.coalesce(channels.c.check_failures, 0)
+    passed = bindparam('passed', type_=Boolean)
+    return (
+        update(channels)
+        .where(channels.c.id == bindparam('channel_id'))
+        .values(
+            check_failures=case((passed, 0), else_=failures + 1),
+            is_active=case(
+                (passed, or_(channels.c.is_active, failures >= limit)),
+                else_=and_(channels.c.is_active, failures + 1 < limit),
+            ),
+            latency_ms=bindparam('latency'),
+            last_checked_at=bindparam('checked_at'),
+        )
+    )
+
+
+async def check_all(**options) -> Dict:
+    """Run one health check pass over the catalogue"""
+    return await StreamHealthChecker(**options).run()
+
+
+async def run_forever(interval: float):
+    """A pass every ``interval`` seconds, measured from the start of the last"""
+    while True:
+        started = time.monotonic()
+        try:
+            await check_all()
+        except Exception:
+            logger.exception("Stream health check failed")
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check channel streams and disable dead ones")
+    parser.add_argument('--once', action='store_true', help="run one pass and exit")
+    parser.add_argument('--interval', type=float, default=settings.health_check_interval)
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+    if args.once:
+        print(asyncio.run(check_all()))
+    else:
+        asyncio.run(run_forever(args.interval))
+
+
+if __name__ == '__main__':
+    main()
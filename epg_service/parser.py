@@ -1,10 +1,204 @@
 """XMLTV EPG parser"""
+import gzip
+import io
+import lzma
+import re
 import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import IO, Iterator, NamedTuple, Optional, Tuple, Union
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_XZ_MAGIC = b'\xfd7zXZ\x00'
+
+# YYYYMMDDhhmmss with optional trailing parts and an optional +hhmm offset
+_XMLTV_TIME_RE = re.compile(
+    r'(\d{4})(\d{2})(\d{2})(\d{2})?(\d{2})?(\d{2})?\s*(?:([+-])(\d{2})(\d{2}))?'
+)
+_XMLTV_OFFSET_RE = re.compile(r'([+-])(\d{2})(\d{2})')
+
+
+class XMLTVChannel(NamedTuple):
+    """A <channel> entry"""
+    id: str
+    display_names: Tuple[str, ...]
+    icon: Optional[str]
+
+
+class XMLTVProgramme(NamedTuple):
+    """A <programme> entry; times are naive UTC"""
+    channel: str
+    start: datetime
+    stop: Optional[datetime]
+    title: str
+    description: Optional[str]
+    category: Optional[str]
+
+
+@lru_cache(maxsize=65536)
+def parse_xmltv_time(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an XMLTV timestamp such as '20240101120000 +0100' into naive UTC.
+
+    Returns None for a value that is not a valid time, such as month 13.
+    Guides repeat the same timestamps across channels (and every stop is the
+    next start), so results are memoised.
+    """
+    if not value:
+        return None
+    try:
+        return _parse_xmltv_time(value.strip())
+    except (ValueError, OverflowError):
+        return None
+
+
+def _parse_xmltv_time(value: str) -> Optional[datetime]:
+    if len(value) >= 14 and value[:14].isdigit():
+        dt = datetime(
+            int(value[0:4]), int(value[4:6]), int(value[6:8]),
+            int(value[8:10]), int(value[10:12]), int(value[12:14]),
+        )
+        offset = value[14:].strip()
+        if not offset:
+            return dt
+        match = _XMLTV_OFFSET_RE.fullmatch(offset)
+        if match is None:
+            return dt
+        sign, off_h, off_m = match.groups()
+    else:
+        match = _XMLTV_TIME_RE.match(value)
+        if match is None:
+            return None
+        year, month, day, hour, minute, second, sign, off_h, off_m = match.groups()
+        dt = datetime(
+            int(year), int(month), int(day),
+            int(hour or 0), int(minute or 0), int(second or 0),
+        )
+    if sign:
+        delta = timedelta(hours=int(off_h), minutes=int(off_m))
+        dt = dt - delta if sign == '+' else dt + delta
+    return dt
+
+
+def open_xmltv(source: Union[str, IO[bytes]]) -> IO[bytes]:
+    """
+    Open an XMLTV file or binary stream, transparently decompressing gzip
+    and xz by their magic bytes. Decompression is streamed, never buffered
+    whole.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            head = f.read(len(_XZ_MAGIC))
+        if head.startswith(_GZIP_MAGIC):
+            return gzip.open(source, 'rb')
+        if head.startswith(_XZ_MAGIC):
+            return lzma.open(source, 'rb')
+        return open(source, 'rb')
+
+    if hasattr(source, 'peek'):
+        head = source.peek(len(_XZ_MAGIC))[:len(_XZ_MAGIC)]
+    elif source.seekable():
+        position = source.tell()
+        head = source.read(len(_XZ_MAGIC))
+        source.seek(position)
+    else:
+        source = io.BufferedReader(source)
+        head = source.peek(len(_XZ_MAGIC))[:len(_XZ_MAGIC)]
+    if head.startswith(_GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=source)
+    if head.startswith(_XZ_MAGIC):
+        return lzma.LZMAFile(source)
+    return source
+
 
 class XMLTVParser:
     """Parse XMLTV format EPG data"""
-    
+
+    def __init__(self):
+        # Programmes skipped by the most recent parse: no channel, no title
+        # or a missing / invalid start time
+        self.skipped = 0
+
+    def iterparse(
+        self, source: Union[str, IO[bytes]]
+    ) -> Iterator[Union[XMLTVChannel, XMLTVProgramme]]:
+        """
+        Stream <channel> and <programme> records from an XMLTV document.
+
+        Each element is converted to a compact record and cleared as soon as
+        its end tag is read, and the root is emptied along with it, so memory
+        is bounded by a single programme rather than by the document size.
+        Programmes without a channel, valid start time or title are skipped
+        and counted in ``skipped``.
+        """
+        self.skipped = 0
+        stream = open_xmltv(source)
+        try:
+            context = ET.iterparse(stream, events=('start', 'end'))
+            _, root = next(context)
+            for event, elem in context:
+                if event != 'end':
+                    continue
+                if elem.tag == 'programme':
+                    programme = self._programme(elem)
+                    if programme is not None:
+                        yield programme
+                    else:
+                        self.skipped += 1
+                elif elem.tag == 'channel':
+                    yield self._channel(elem)
+                else:
+                    continue
+                elem.clear()
+                root.clear()
+        finally:
+            # Close only what was opened here, not a stream owned by the caller
+            if stream is not source:
+                stream.close()
+
+    def iter_channels(self, source: Union[str, IO[bytes]]) -> Iterator[XMLTVChannel]:
+        """Stream only the <channel> records"""
+        for record in self.iterparse(source):
+            if isinstance(record, XMLTVChannel):
+                yield record
+
+    def iter_programmes(self, source: Union[str, IO[bytes]]) -> Iterator[XMLTVProgramme]:
+        """Stream only the <programme> records"""
+        for record in self.iterparse(source):
+            if isinstance(record, XMLTVProgramme):
+                yield record
+
     def parse(self, xml_content: str) -> dict:
-        """Parse XMLTV content"""
-        # TODO: Implement XMLTV parsing
-        pass
+        """Parse XMLTV content held in memory (small documents only)"""
+        channels, programmes = [], []
+        for record in self.iterparse(io.BytesIO(xml_content.encode('utf-8'))):
+            if isinstance(record, XMLTVChannel):
+                channels.append(record)
+            else:
+                programmes.append(record)
+        return {'channels': channels, 'programmes': programmes}
+
+    def _channel(self, elem) -> XMLTVChannel:
+        icon = elem.find('icon')
+        return XMLTVChannel(
+            id=elem.get('id', ''),
+            display_names=tuple(
+                (name.text or '').strip() for name in elem.iterfind('display-name')
+            ),
+            icon=icon.get('src') if icon is not None else None,
+        )
+
+    def _programme(self, elem) -> Optional[XMLTVProgramme]:
+        channel = elem.get('channel')
+        start = parse_xmltv_time(elem.get('start'))
+        title = elem.findtext('title')
+        if not channel or start is None or not title:
+            return None
+        return XMLTVProgramme(
+            channel=channel,
+            start=start,
+            stop=parse_xmltv_time(elem.get('stop')),
+            title=title.strip(),
+            description=elem.findtext('desc'),
+            category=elem.findtext('category'),
+        )
@@ -1,6 +1,264 @@
 """Celery tasks for EPG processing"""
+import csv
+import io
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
-def update_epg():
-    """Update EPG data from source"""
-    # TODO: Implement EPG update
-    pass
+import httpx
+from sqlalchemy import delete, or_, text
+
+from backend.config import settings
+from backend.database import SessionLocal, dialect_insert
+from backend.models.epg import EPGChannel, EPGProgram
+from backend.services.epg_index import epg_index
+from backend.services.epg_matching import assign_epg_ids, forget_misses
+from backend.services.response_cache import invalidate_catalogue
+from epg_service.parser import XMLTVChannel, XMLTVParser, XMLTVProgramme
+
+logger = logging.getLogger(__name__)
+
+# Columns refreshed when a programme with the same (channel_id, start_time) exists
+_UPSERT_COLUMNS = ('title', 'description', 'category', 'end_time')
+
+# Temporary table used by the PostgreSQL COPY path
+_STAGING_TABLE = 'epg_programs_staging'
+_STAGING_COLUMNS = (
+    'channel_id', 'title', 'description', 'category', 'start_time', 'end_time'
+)
+
+
+def epg_window(now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """The (start, end) span of programmes to keep, in naive UTC"""
+    now = now or datetime.utcnow()
+    return (
+        now - timedelta(days=settings.epg_window_past_days),
+        now + timedelta(days=settings.epg_window_future_days),
+    )
+
+
+def update_epg(source: Optional[str] = None, batch_size: Optional[int] = None) -> Dict:
+    """
+    Update EPG data from source.
+
+    ``source`` is an XMLTV URL or file path (plain, gzip or xz), defaulting
+    to ``settings.epg_source_url``. Programmes are streamed from the guide,
+    those outside the retention window are dropped, and the rest are
+    upserted on (channel_id, start_time) in batches: COPY through a staging
+    table on PostgreSQL, multi-row INSERT ... ON CONFLICT elsewhere. A
+    programme without a stop time ends when the next one on its channel
+    starts; the last one on a channel, with no successor, is dropped. Expired
+    programmes are then purged with a single DELETE. The guide's <channel>
+    entries are stored and playlist channels without a usable guide id are
+    matched against them. Everything runs in one
+    transaction, so readers never see a half-applied guide.
+    """
+    source = source or settings.epg_source_url
+    if not source:
+        raise ValueError("No EPG source configured (EPG_SOURCE_URL)")
+
+    if source.startswith(('http://', 'https://')):
+        with tempfile.NamedTemporaryFile(suffix='.xmltv') as download:
+            _download(source, download)
+            return ingest_programmes(download.name, batch_size)
+    return ingest_programmes(source, batch_size)
+
+
+def ingest_programmes(path: str, batch_size: Optional[int] = None) -> Dict:
+    """Stream programmes from an XMLTV file into the database"""
+    batch_size = batch_size or settings.epg_batch_size
+    window_start, window_end = epg_window()
+    stats = {
+        'channels': 0, 'upserted': 0, 'outside_window': 0, 'invalid': 0, 'purged': 0,
+        'epg_ids_assigned': 0,
+    }
+
+    db = SessionLocal()
+    try:
+        writer = _CopyWriter(db) if _copy_supported(db) else _InsertWriter(db)
+        # Keyed by the upsert key: a repeated key inside one INSERT ... ON
+        # CONFLICT statement is an error on PostgreSQL
+        batch: Dict[Tuple[str, datetime], Dict] = {}
+        channels: Dict[str, Dict] = {}
+        # Per channel, a programme without a stop time waiting for the next
+        # one to start
+        open_ended: Dict[str, XMLTVProgramme] = {}
+
+        def add(programme: XMLTVProgramme, stop: datetime):
+            if stop <= programme.start:
+                stats['invalid'] += 1
+                return
+            if stop < window_start or programme.start > window_end:
+                stats['outside_window'] += 1
+                return
+            batch[(programme.channel, programme.start)] = {
+                'channel_id': programme.channel,
+                'title': programme.title,
+                'description': programme.description,
+                'category': programme.category,
+                'start_time': programme.start,
+                'end_time': stop,
+            }
+            if len(batch) >= batch_size:
+                writer.write(list(batch.values()))
+                batch.clear()
+
+        parser = XMLTVParser()
+        for record in parser.iterparse(path):
+            if isinstance(record, XMLTVChannel):
+                channels[record.id] = {
+                    'id': record.id,
+                    'display_names': list(record.display_names),
+                    'icon': record.icon,
+                }
+                continue
+            programme = record
+            held = open_ended.get(programme.channel)
+            if held is not None and programme.start > held.start:
+                del open_ended[programme.channel]
+                add(held, programme.start)
+                held = None
+            if programme.stop is not None:
+                add(programme, programme.stop)
+            elif held is not None and programme.start < held.start:
+                # Read after the programme that follows it
+                add(programme, held.start)
+            else:
+                open_ended[programme.channel] = programme
+        writer.write(list(batch.values()))
+        stats['invalid'] += parser.skipped + len(open_ended)
+        stats['upserted'] = writer.finish()
+        stats['channels'] = _upsert_channels(db, list(channels.values()))
+
+        stats['purged'] = db.execute(
+            delete(EPGProgram).where(or_(
+                EPGProgram.end_time < window_start,
+                EPGProgram.start_time > window_end,
+            ))
+        ).rowcount
+
+        # New guide channels may now match playlist entries that missed before
+        forget_misses(db)
+        stats['epg_ids_assigned'] = assign_epg_ids(db)['assigned']
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    logger.info("EPG ingest finished: %s", stats)
+    if stats['epg_ids_assigned']:
+        invalidate_catalogue()
+    # Processes serving lookups rebuild straight away; others pick the new
+    # guide up when their index expires
+    if epg_index.loaded:
+        epg_index.refresh(force=True)
+    return stats
+
+
+def _upsert_channels(db, rows: List[Dict]) -> int:
+    """Store the guide's <channel> entries for EPG id matching"""
+    if not rows:
+        return 0
+    stmt = dialect_insert(db, EPGChannel.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['id'],
+        set_={column: stmt.excluded[column] for column in ('display_names', 'icon')},
+    )
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def _copy_supported(db) -> bool:
+    """COPY is used on PostgreSQL when the driver exposes it (psycopg2 or psycopg 3)"""
+    if db.get_bind().dialect.name != 'postgresql':
+        return False
+    cursor = db.connection().connection.cursor()
+    try:
+        return hasattr(cursor, 'copy_expert') or hasattr(cursor, 'copy')
+    finally:
+        cursor.close()
+
+
+class _InsertWriter:
+    """Multi-row INSERT ... ON CONFLICT (channel_id, start_time) DO UPDATE per batch"""
+
+    def __init__(self, db):
+        self.db = db
+        self.written = 0
+
+    def write(self, rows: List[Dict]):
+        if not rows:
+            return
+        stmt = dialect_insert(self.db, EPGProgram.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['channel_id', 'start_time'],
+            set_={column: stmt.excluded[column] for column in _UPSERT_COLUMNS},
+        )
+        self.db.execute(stmt, rows)
+        self.written += len(rows)
+
+    def finish(self) -> int:
+        return self.written
+
+
+class _CopyWriter:
+    """
+    PostgreSQL fast path: COPY every batch into a temporary staging table,
+    then merge it into epg_programs with one INSERT ... SELECT ... ON CONFLICT.
+    Staged rows are numbered in the order they were copied, so a repeated
+    programme resolves to the last one read, as on the INSERT path.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.db.execute(text(
+            f"CREATE TEMP TABLE {_STAGING_TABLE} (seq bigserial, "
+            "channel_id text, title text, description text, category text, "
+            "start_time timestamp, end_time timestamp) ON COMMIT DROP"
+        ))
+
+    def write(self, rows: List[Dict]):
+        if not rows:
+            return
+        buffer = io.StringIO()
+        csv_writer = csv.writer(buffer)
+        for row in rows:
+            csv_writer.writerow([row[column] for column in _STAGING_COLUMNS])
+        buffer.seek(0)
+
+        sql = f"COPY {_STAGING_TABLE} ({', '.join(_STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+        cursor = self.db.connection().connection.cursor()
+        try:
+            if hasattr(cursor, 'copy_expert'):
+                cursor.copy_expert(sql, buffer)
+            else:
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+        finally:
+            cursor.close()
+
+    def finish(self) -> int:
+        columns = ', '.join(_STAGING_COLUMNS)
+        updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in _UPSERT_COLUMNS)
+        # Batches were deduplicated individually; the same key can still
+        # appear in two batches, so keep the last row copied for each key
+        return self.db.execute(text(
+            f"INSERT INTO {EPGProgram.__tablename__} ({columns}) "
+            f"SELECT DISTINCT ON (channel_id, start_time) {columns} FROM {_STAGING_TABLE} "
+            f"ORDER BY channel_id, start_time, seq DESC "
+            f"ON CONFLICT (channel_id, start_time) DO UPDATE SET {updates}"
+        )).rowcount
+
+
+def _download(url: str, target):
+    """Stream a (possibly compressed) guide to a local file"""
+    with httpx.stream('GET', url, timeout=settings.http_timeout,
+                      follow_redirects=True) as response:
+        response.raise_for_status()
+        # Keep the payload as served; the parser detects gzip/xz itself
+        for chunk in response.iter_raw():
+            target.write(chunk)
+    target.flush()
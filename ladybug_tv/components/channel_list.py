@@ -1,6 +1,17 @@
 """Channel list component"""
 
 import reflex as rx
+from reflex.event import EventSpec
+
+from ladybug_tv.utils.constants import CHANNEL_ROW_HEIGHT_PX, CHANNEL_SCROLL_THROTTLE_MS
+
+CHANNEL_LIST_ID = "channel-list"
+
+# The list's [scrollTop, clientHeight, scrollHeight] in pixels
+_SCROLL_POSITION_JS = (
+    f"(() => {{ const list = document.getElementById('{CHANNEL_LIST_ID}');"
+    " return list ? [list.scrollTop, list.clientHeight, list.scrollHeight] : [0, 0, 0]; })()"
+)
 
 
 def channel_list_item(channel: dict) -> rx.Component:
@@ -20,6 +31,42 @@ def channel_list_item(channel: dict) -> rx.Component:
         ),
         padding="10px",
         border_bottom="1px solid #e0e0e0",
+        # windowed_channel_list places rows by this fixed height
+        height=f"{CHANNEL_ROW_HEIGHT_PX}px",
+        box_sizing="border-box",
+        overflow="hidden",
         cursor="pointer",
         _hover={"background": "#f5f5f5"},
     )
+
+
+def windowed_channel_list(items, offset, on_scroll, render_item, **props) -> rx.Component:
+    """
+    A scrolling channel list that renders only a window of its rows.
+
+    ``items`` are the loaded rows, each ``CHANNEL_ROW_HEIGHT_PX`` tall, and
+    ``offset`` the CSS height of the rows above them that are not loaded: a
+    spacer of that height keeps every scroll position pointing at the same
+    rows as the window moves. ``on_scroll`` receives the list's
+    ``[scrollTop, clientHeight, scrollHeight]``, throttled, and is expected
+    to move the window.
+    """
+    return rx.box(
+        rx.box(height=offset),
+        rx.foreach(items, render_item),
+        id=CHANNEL_LIST_ID,
+        overflow_y="auto",
+        on_scroll=rx.call_script(_SCROLL_POSITION_JS, callback=on_scroll).throttle(
+            CHANNEL_SCROLL_THROTTLE_MS
+        ),
+        **props,
+    )
+
+
+def scroll_channel_list_to_top() -> EventSpec:
+    """Event that scrolls the list back to its first row, e.g. for new search results"""
+    return rx.call_script(
+        f"(() => {{ const list = document.getElementById('{CHANNEL_LIST_ID}');"
+        " if (list) list.scrollTop = 0; })()"
+    )
+
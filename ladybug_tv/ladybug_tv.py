@@ -1,22 +1,68 @@
-import reflex as rx
+import contextlib
+from typing import Any, Optional
+
 import httpx
-from typing import Any, Dict, List
+import reflex as rx
+
+from ladybug_tv.components.channel_list import scroll_channel_list_to_top, windowed_channel_list
+from ladybug_tv.utils.api_client import async_api_client as api_client
+from ladybug_tv.utils.catalogue import PageKey, catalogue, guide
+from ladybug_tv.utils.constants import (
+    CHANNEL_LIST_FIELDS,
+    CHANNEL_PAGE_SIZE,
+    CHANNEL_ROW_HEIGHT_PX,
+    CHANNEL_WINDOW_BUFFER_PAGES,
+    SEARCH_DEBOUNCE_MS,
+)
+
+
+def pages_in_view(position: list) -> tuple[int, int]:
+    """
+    First and last page the channel list should hold for a scroll position
+    ``[scrollTop, clientHeight, ...]``: the pages on screen plus
+    ``CHANNEL_WINDOW_BUFFER_PAGES`` either side.
+    """
+    top, height = max(0.0, float(position[0])), max(0.0, float(position[1]))
+    first_row = int(top // CHANNEL_ROW_HEIGHT_PX)
+    last_row = int((top + height) // CHANNEL_ROW_HEIGHT_PX)
+    return (
+        max(0, first_row // CHANNEL_PAGE_SIZE - CHANNEL_WINDOW_BUFFER_PAGES),
+        last_row // CHANNEL_PAGE_SIZE + CHANNEL_WINDOW_BUFFER_PAGES,
+    )
+
+
+def contiguous_pages(pages: dict[int, Any], first: int, last: int) -> dict[int, Any]:
+    """The loaded pages within [first, last], up to the first one missing"""
+    kept = {}
+    for number in sorted(n for n in pages if first <= n <= last):
+        if kept and number != max(kept) + 1:
+            break
+        kept[number] = pages[number]
+    return kept
 
 
 class LadybugTVState(rx.State):
-    """Main application state"""
+    """
+    Main application state.
+
+    A session holds channel ids, never channel rows or guide entries: those
+    live once per process in the shared ``catalogue`` and ``guide``, and the
+    computed vars below look them up. They are not cached, so the rows
+    are not stored with the session either, and they always show the
+    catalogue's current copy.
+    """
 
     # Current stream
     current_stream_url: str = ""
-    current_channel: dict = {}
-
-    # Channel list
-    channels: list[dict] = []
-    filtered_channels: list[dict] = []
+    current_channel_id: str = ""
+    # Channel whose guide entry the programme views show; set each time
+    # that entry is put in the shared guide, which sends the views afresh
+    guide_channel_id: str = ""
 
-    # EPG data
-    current_program: dict = {}
-    upcoming_programs: list[dict] = []
+    # Channel list: only a window of it, the pages around the scroll
+    # position, is shown in the browser
+    window_first_page: int = 0
+    channel_list_complete: bool = False
 
     # User state
     is_authenticated: bool = False
@@ -25,6 +71,41 @@ class LadybugTVState(rx.State):
     # UI state
     is_loading: bool = False
     sidebar_open: bool = True
+    error_message: str = ""
+
+    # Latest channel asked for; answers for earlier ones are dropped
+    _tuning: str = ""
+
+    # What the channel list shows: the catalogue (""), or search results
+    _list_query: str = ""
+    # Bumped whenever the list is reset, so loads for an older one are dropped
+    _list_generation: int = 0
+    # Start keys of the window's pages and of the page either side of it,
+    # by page number; the first page's is always None
+    _page_keys: dict[int, PageKey] = {}
+    # Channel ids of the loaded pages of the window by page number, and the
+    # range wanted
+    _pages: dict[int, tuple[str, ...]] = {}
+    _wanted_pages: tuple[int, int] = (0, CHANNEL_WINDOW_BUFFER_PAGES)
+    _window_ids: list[str] = []
+
+    # Views of the shared catalogue and guide
+    @rx.var(cache=False)
+    def channel_window(self) -> list[dict]:
+        """Rows of the channels in the window"""
+        return catalogue.channels(self._window_ids)
+
+    @rx.var(cache=False)
+    def current_channel(self) -> dict:
+        return catalogue.channel(self.current_channel_id) or {}
+
+    @rx.var(cache=False)
+    def current_program(self) -> dict:
+        return guide.get(self.guide_channel_id)["current"] or {}
+
+    @rx.var(cache=False)
+    def upcoming_programs(self) -> list[dict]:
+        return guide.get(self.guide_channel_id)["upcoming"]
 
     # Computed vars for safe dictionary access
     @rx.var
@@ -65,6 +146,11 @@ class LadybugTVState(rx.State):
             return f"{start} - {end}"
         return ""
 
+    @rx.var
+    def channel_window_offset(self) -> str:
+        """Height of the rows above the window that are not loaded"""
+        return f"{self.window_first_page * CHANNEL_PAGE_SIZE * CHANNEL_ROW_HEIGHT_PX}px"
+
     @rx.var
     def has_stream(self) -> bool:
         """Return True when a stream URL is ready"""
@@ -74,32 +160,142 @@ class LadybugTVState(rx.State):
         """Toggle sidebar visibility"""
         self.sidebar_open = not self.sidebar_open
 
-    def load_channels(self):
-        """Fetch available channels from API"""
-        self.is_loading = True
-        # Call your FastAPI backend
-        response = httpx.get("http://api:8000/channels")
-        self.channels = response.json()
-        self.filtered_channels = self.channels
-        self.is_loading = False
-
-    def play_channel(self, channel_id: str):
-        """Switch to a different channel"""
-        # Get stream URL from backend
-        response = httpx.get(f"http://api:8000/stream/{channel_id}")
-        self.current_stream_url = response.json()["stream_url"]
-        channel = next((ch for ch in self.channels if ch["id"] == channel_id), None)
-        if channel is None:
-            raise ValueError(f"Channel with id '{channel_id}' not found.")
-        self.current_channel = channel
-        self.load_epg(channel_id)
-
-    def load_epg(self, channel_id: str):
-        """Load EPG data for current channel"""
-        response = httpx.get(f"http://api:8000/epg/{channel_id}")
-        epg_data = response.json()
-        self.current_program = epg_data["current"]
-        self.upcoming_programs = epg_data["upcoming"]
+    # Event handlers that call the backend run in the background: the state
+    # is only locked inside ``async with self``, never while a request is in
+    # flight, so a slow backend holds up neither this viewer's other events
+    # nor anyone else's.
+
+    @rx.event(background=True)
+    async def load_channels(self):
+        """Show the channel list from its first page"""
+        async with self:
+            self.is_loading = True
+            self._reset_channel_list("")
+        try:
+            await self._fill_channel_window()
+        finally:
+            async with self:
+                self.is_loading = False
+
+    @rx.event(background=True)
+    async def channel_list_scrolled(self, position: list):
+        """Move the window to the pages around the list's scroll position"""
+        async with self:
+            self._wanted_pages = pages_in_view(position)
+        await self._fill_channel_window()
+
+    def _reset_channel_list(self, query: str):
+        """Empty the window to show ``query``'s results (the catalogue for "") from the top"""
+        self._list_query = query
+        self._list_generation += 1
+        self._page_keys = {}
+        self._pages = {}
+        self._wanted_pages = (0, CHANNEL_WINDOW_BUFFER_PAGES)
+        self.window_first_page = 0
+        self._window_ids = []
+        self.channel_list_complete = False
+
+    async def _fill_channel_window(self):
+        """
+        Fetch the wanted pages that are not loaded, then rebuild the window
+        from them. Each page's key comes from the one before it, so pages
+        are reached in order from the nearest one whose key is kept; pages
+        on the way are mostly in the shared catalogue already. Requests run
+        outside the state lock; a reset in the meantime discards their
+        results.
+        """
+        async with self:
+            generation, query = self._list_generation, self._list_query
+            first, last = self._wanted_pages
+            keys = dict(self._page_keys)
+            loaded = set(self._pages)
+            complete = self.channel_list_complete
+        fetched = {}
+        try:
+            number = max((n for n in keys if n <= first), default=0)
+            while number <= last and (number == 0 or number in keys):
+                if number in loaded and (number + 1 in keys or complete):
+                    number += 1
+                    continue
+                ids, next_key = await catalogue.page(query, keys.get(number))
+                if number >= first:
+                    fetched[number] = ids
+                if next_key is None:
+                    complete = True
+                    break
+                keys[number + 1] = next_key
+                number += 1
+        finally:
+            async with self:
+                if self._list_generation == generation:
+                    first, last = self._wanted_pages
+                    self._page_keys = {
+                        number: key
+                        for number, key in {**self._page_keys, **keys}.items()
+                        if first - 1 <= number <= last + 1
+                    }
+                    self.channel_list_complete = self.channel_list_complete or complete
+                    self._pages = contiguous_pages({**self._pages, **fetched}, first, last)
+                    self.window_first_page = min(self._pages, default=0)
+                    self._window_ids = [
+                        channel_id
+                        for number in sorted(self._pages)
+                        for channel_id in self._pages[number]
+                    ]
+
+    @rx.event(background=True)
+    async def play_channel(self, channel_id: str):
+        """Switch to a different channel; if that fails, say so instead"""
+        async with self:
+            self._tuning = channel_id
+            self.is_loading = True
+            self.error_message = ""
+        stream, error = None, "Could not load this channel, please try again"
+        try:
+            stream = await self._fetch_stream(channel_id)
+            if stream is None:
+                error = "Channel not found"
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == httpx.codes.NOT_FOUND:
+                error = "Channel not found"
+        except httpx.HTTPError:
+            pass
+        finally:
+            async with self:
+                # Unless the viewer has already switched again
+                if self._tuning == channel_id:
+                    self.is_loading = False
+                    if stream is None:
+                        self.error_message = error
+                    else:
+                        self.current_stream_url = stream["stream_url"]
+                        self.current_channel_id = channel_id
+                        self.guide_channel_id = channel_id
+
+    async def _fetch_stream(self, channel_id: str) -> Optional[dict]:
+        """
+        A channel's stream, with its row and guide put in the shared
+        catalogue and guide; None when there is no such channel.
+        """
+        if catalogue.channel(channel_id) is None:
+            # Not loaded by any session yet, e.g. a favourite
+            found = await api_client.get_channels(ids=[channel_id], fields=CHANNEL_LIST_FIELDS)
+            if not found["items"]:
+                return None
+            catalogue.remember(found["items"])
+        # Stream URL and guide come back in one request
+        stream = await api_client.get_stream_url(channel_id, include_epg=True)
+        guide.put(channel_id, stream["epg"])
+        return stream
+
+    @rx.event(background=True)
+    async def load_epg(self, channel_id: str):
+        """Load EPG data for current channel, unless another session just did"""
+        if not guide.fresh(channel_id):
+            guide.put(channel_id, await api_client.get_epg(channel_id))
+        async with self:
+            if self.current_channel_id == channel_id:
+                self.guide_channel_id = channel_id
 
     def toggle_favorite(self, channel_id: str):
         """Add/remove channel from favorites"""
@@ -108,14 +304,13 @@ class LadybugTVState(rx.State):
         else:
             self.favorites.append(channel_id)
 
-    def search_channels(self, query: str):
-        """Filter channels by search query"""
-        if not query:
-            self.filtered_channels = self.channels
-        else:
-            self.filtered_channels = [
-                ch for ch in self.channels if query.lower() in ch["name"].lower()
-            ]
+    @rx.event(background=True)
+    async def search_channels(self, query: str):
+        """Search channels through the API; an empty query shows the full list"""
+        async with self:
+            self._reset_channel_list(query.strip())
+        yield scroll_channel_list_to_top()
+        await self._fill_channel_window()
 
 
 def channel_list_item(channel: dict) -> rx.Component:
@@ -142,6 +337,10 @@ def channel_list_item(channel: dict) -> rx.Component:
         ),
         padding="10px",
         border_bottom="1px solid #e0e0e0",
+        # The windowed list places rows by this fixed height
+        height=f"{CHANNEL_ROW_HEIGHT_PX}px",
+        box_sizing="border-box",
+        overflow="hidden",
         cursor="pointer",
         on_click=LadybugTVState.play_channel(channel["id"]),
         _hover={"background": "#f5f5f5"},
@@ -165,15 +364,16 @@ def sidebar() -> rx.Component:
             rx.input(
                 placeholder="Search channels...",
                 on_change=LadybugTVState.search_channels,
+                debounce_timeout=SEARCH_DEBOUNCE_MS,
                 width="100%",
             ),
-            rx.box(
-                rx.foreach(
-                    LadybugTVState.filtered_channels,
-                    channel_list_item,
-                ),
-                overflow_y="auto",
+            windowed_channel_list(
+                LadybugTVState.channel_window,
+                LadybugTVState.channel_window_offset,
+                LadybugTVState.channel_list_scrolled,
+                channel_list_item,
                 height="calc(100vh - 150px)",
+                width="100%",
             ),
             spacing="4",
             padding="20px",
@@ -223,6 +423,15 @@ def video_player() -> rx.Component:
 def video_area() -> rx.Component:
     """Main video player area"""
     return rx.vstack(
+        rx.cond(
+            LadybugTVState.error_message,
+            rx.callout(
+                LadybugTVState.error_message,
+                icon="triangle_alert",
+                color_scheme="red",
+                width="100%",
+            ),
+        ),
         # Video player
         rx.box(
             video_player(),
@@ -293,6 +502,14 @@ def index() -> rx.Component:
     )
 
 
+@contextlib.asynccontextmanager
+async def api_client_pool():
+    """Close the shared backend connection pool on shutdown"""
+    yield
+    await api_client.aclose()
+
+
 # Create app
 app = rx.App()
-app.add_page(index)
+app.register_lifespan_task(api_client_pool)
+app.add_page(index, on_load=LadybugTVState.load_channels)
@@ -1,10 +1,12 @@
 """Main TV viewer page"""
 
 import reflex as rx
+
+from ladybug_tv.components.channel_list import channel_list_item
 from ladybug_tv.components.navbar import navbar
 from ladybug_tv.components.video_player import video_player
-from ladybug_tv.components.channel_list import channel_list_item
 from ladybug_tv.state.app_state import IPTVState
+from ladybug_tv.utils.constants import SEARCH_DEBOUNCE_MS
 
 
 def sidebar() -> rx.Component:
@@ -24,6 +26,7 @@ def sidebar() -> rx.Component:
             rx.input(
                 placeholder="Search channels...",
                 on_change=IPTVState.search_channels,
+                debounce_timeout=SEARCH_DEBOUNCE_MS,
                 width="100%",
             ),
             rx.box(
@@ -2,21 +2,18 @@
 
 import reflex as rx
 
+from ladybug_tv.utils.catalogue import catalogue, guide
+
 
 class IPTVState(rx.State):
-    """Main IPTV application state"""
+    """
+    Main IPTV application state. Like ``LadybugTVState`` it holds channel
+    ids only; rows and guide entries come from the shared catalogue.
+    """
 
     # Current stream
     current_stream_url: str = ""
-    current_channel: dict = {}
-
-    # Channel list
-    channels: list[dict] = []
-    filtered_channels: list[dict] = []
-
-    # EPG data
-    current_program: dict = {}
-    upcoming_programs: list[dict] = []
+    current_channel_id: str = ""
 
     # User state
     is_authenticated: bool = False
@@ -26,6 +23,29 @@ class IPTVState(rx.State):
     is_loading: bool = False
     sidebar_open: bool = True
 
+    # Latest search asked for; answers to older ones are dropped
+    _search_query: str = ""
+    # Channels the list shows
+    _filtered_ids: list[str] = []
+
+    # Views of the shared catalogue and guide, not cached so that sessions
+    # never store the rows
+    @rx.var(cache=False)
+    def filtered_channels(self) -> list[dict]:
+        return catalogue.channels(self._filtered_ids)
+
+    @rx.var(cache=False)
+    def current_channel(self) -> dict:
+        return catalogue.channel(self.current_channel_id) or {}
+
+    @rx.var(cache=False)
+    def current_program(self) -> dict:
+        return guide.get(self.current_channel_id)["current"] or {}
+
+    @rx.var(cache=False)
+    def upcoming_programs(self) -> list[dict]:
+        return guide.get(self.current_channel_id)["upcoming"]
+
     def toggle_sidebar(self):
         """Toggle sidebar visibility"""
         self.sidebar_open = not self.sidebar_open
@@ -48,11 +68,12 @@ class IPTVState(rx.State):
         else:
             self.favorites.append(channel_id)
 
-    def search_channels(self, query: str):
-        """Filter channels by search query"""
-        if not query:
-            self.filtered_channels = self.channels
-        else:
-            self.filtered_channels = [
-                ch for ch in self.channels if query.lower() in ch["name"].lower()
-            ]
+    @rx.event(background=True)
+    async def search_channels(self, query: str):
+        """Search channels through the API; an empty query shows the start of the list"""
+        async with self:
+            self._search_query = query
+        ids, _ = await catalogue.page(query.strip(), None)
+        async with self:
+            if self._search_query == query:
+                self._filtered_ids = list(ids)
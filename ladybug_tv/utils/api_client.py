@@ -1,8 +1,71 @@
 """API client for backend communication"""
 
-import httpx
+import asyncio
+import importlib.util
+import random
+from datetime import datetime
 from typing import Optional
 
+import httpx
+
+from ladybug_tv.utils.constants import (
+    API_BASE_URL,
+    API_CONNECT_TIMEOUT,
+    API_MAX_CONNECTIONS,
+    API_RETRIES,
+    API_RETRY_BACKOFF,
+    API_TIMEOUT,
+)
+
+# httpx only speaks HTTP/2 when the h2 package is installed (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Answers from a backend, or the proxy in front of it, that is briefly unavailable
+RETRY_STATUSES = {502, 503, 504}
+
+
+def _channel_params(
+    cursor: Optional[str],
+    limit: int,
+    category: Optional[str],
+    active: Optional[bool],
+    ids: Optional[list[str]],
+    fields: Optional[list[str]],
+) -> dict:
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    if category is not None:
+        params["category"] = category
+    if active is not None:
+        params["active"] = str(active).lower()
+    if ids:
+        params["ids"] = ids
+    if fields:
+        params["fields"] = ",".join(fields)
+    return params
+
+
+def _search_params(query: str, limit: int, offset: int, category: Optional[str]) -> dict:
+    params = {"q": query, "limit": limit, "offset": offset}
+    if category is not None:
+        params["category"] = category
+    return params
+
+
+def _epg_batch_payload(
+    channel_ids: list[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    limit: int,
+) -> dict:
+    payload = {"channel_ids": channel_ids, "limit": limit}
+    if start is not None:
+        payload["start"] = start.isoformat()
+    if end is not None:
+        payload["end"] = end.isoformat()
+    return payload
+
 
 class APIClient:
     """Client for communicating with FastAPI backend"""
@@ -11,17 +74,206 @@ class APIClient:
         self.base_url = base_url
         self.client = httpx.Client(base_url=base_url)
 
-    def get_channels(self) -> list[dict]:
-        """Fetch all channels"""
-        response = self.client.get("/api/v1/channels")
+    def get_channels(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        category: Optional[str] = None,
+        active: Optional[bool] = None,
+        ids: Optional[list[str]] = None,
+        fields: Optional[list[str]] = None,
+    ) -> dict:
+        """
+        Fetch one page of channels as ``{"items": [...], "next_cursor": ...}``.
+
+        Pass ``next_cursor`` back as ``cursor`` to get the following page.
+        """
+        params = _channel_params(cursor, limit, category, active, ids, fields)
+        response = self.client.get("/api/v1/channels/", params=params)
+        response.raise_for_status()
         return response.json()
 
-    def get_stream_url(self, channel_id: str) -> dict:
-        """Get stream URL for channel"""
-        response = self.client.get(f"/api/v1/stream/{channel_id}")
+    def search_channels(
+        self,
+        query: str,
+        limit: int = 50,
+        offset: int = 0,
+        category: Optional[str] = None,
+    ) -> dict:
+        """Ranked channel search as ``{"items", "total", "next_offset"}``"""
+        params = _search_params(query, limit, offset, category)
+        response = self.client.get("/api/v1/channels/search", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def get_stream_url(self, channel_id: str, include_epg: bool = False) -> dict:
+        """
+        Get stream URL for channel.
+
+        With ``include_epg`` the response also carries the channel's guide
+        under ``"epg"`` (``{"current", "upcoming"}``), saving a second request.
+        """
+        params = {"include": "epg"} if include_epg else None
+        response = self.client.get(f"/api/v1/stream/{channel_id}", params=params)
+        response.raise_for_status()
         return response.json()
 
     def get_epg(self, channel_id: str) -> dict:
         """Get EPG data for channel"""
         response = self.client.get(f"/api/v1/epg/{channel_id}")
         return response.json()
+
+    def get_epg_batch(
+        self,
+        channel_ids: list[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 10,
+    ) -> dict[str, dict]:
+        """Get now/next EPG for many channels in one request, keyed by channel id"""
+        payload = _epg_batch_payload(channel_ids, start, end, limit)
+        response = self.client.post("/api/v1/epg/batch", json=payload)
+        response.raise_for_status()
+        return response.json()["channels"]
+
+
+class AsyncAPIClient:
+    """
+    Non-blocking client for the FastAPI backend, for Reflex event handlers.
+
+    Every handler in the process shares one pooled ``httpx.AsyncClient``,
+    so a request reuses an open connection instead of connecting again.
+    With h2 installed and the backend behind TLS, requests are multiplexed
+    over HTTP/2 (negotiated by ALPN; plain http stays on HTTP/1.1).
+
+    Each request has a ``timeout``. Connection errors, timeouts and
+    502/503/504 answers are retried up to ``retries`` times, after a
+    random delay of up to ``backoff * 2 ** attempt`` seconds so that
+    clients do not retry in lockstep. Every request it makes is a read,
+    so retrying is safe.
+    """
+
+    def __init__(
+        self,
+        base_url: str = API_BASE_URL,
+        timeout: float = API_TIMEOUT,
+        retries: int = API_RETRIES,
+        backoff: float = API_RETRY_BACKOFF,
+        max_connections: int = API_MAX_CONNECTIONS,
+    ):
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, API_CONNECT_TIMEOUT))
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared pool, created on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the pool; called on app shutdown"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """A request, retried with backoff; raises ``httpx.HTTPError`` once out of attempts"""
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    # 304 answers a conditional request, it is not a failure
+                    if response.status_code != httpx.codes.NOT_MODIFIED:
+                        response.raise_for_status()
+                    return response
+            await asyncio.sleep(random.uniform(0, self.backoff * 2**attempt))
+
+    async def get_channels(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        category: Optional[str] = None,
+        active: Optional[bool] = None,
+        ids: Optional[list[str]] = None,
+        fields: Optional[list[str]] = None,
+    ) -> dict:
+        """One page of channels, as ``APIClient.get_channels``"""
+        params = _channel_params(cursor, limit, category, active, ids, fields)
+        response = await self._request("GET", "/api/v1/channels/", params=params)
+        return response.json()
+
+    async def get_channels_if_changed(
+        self,
+        etag: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        fields: Optional[list[str]] = None,
+    ) -> tuple[Optional[dict], Optional[str]]:
+        """
+        One page of channels and its ETag. With the ``etag`` of an earlier
+        copy the request is conditional, and the page is None when it has
+        not changed (304, no body sent).
+        """
+        params = _channel_params(cursor, limit, None, None, None, fields)
+        headers = {"If-None-Match": etag} if etag else None
+        response = await self._request("GET", "/api/v1/channels/", params=params, headers=headers)
+        etag = response.headers.get("etag", etag)
+        if response.status_code == 304:
+            return None, etag
+        return response.json(), etag
+
+    async def search_channels(
+        self,
+        query: str,
+        limit: int = 50,
+        offset: int = 0,
+        category: Optional[str] = None,
+    ) -> dict:
+        """Ranked channel search as ``{"items", "total", "next_offset"}``"""
+        params = _search_params(query, limit, offset, category)
+        response = await self._request("GET", "/api/v1/channels/search", params=params)
+        return response.json()
+
+    async def get_stream_url(self, channel_id: str, include_epg: bool = False) -> dict:
+        """Stream URL for a channel, with its guide under ``"epg"`` if ``include_epg``"""
+        params = {"include": "epg"} if include_epg else None
+        response = await self._request("GET", f"/api/v1/stream/{channel_id}", params=params)
+        return response.json()
+
+    async def get_epg(self, channel_id: str) -> dict:
+        """Current and upcoming programmes for a channel"""
+        response = await self._request("GET", f"/api/v1/epg/{channel_id}")
+        return response.json()
+
+    async def get_epg_batch(
+        self,
+        channel_ids: list[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 10,
+    ) -> dict[str, dict]:
+        """Now/next EPG for many channels in one request, keyed by channel id"""
+        payload = _epg_batch_payload(channel_ids, start, end, limit)
+        response = await self._request("POST", "/api/v1/epg/batch", json=payload)
+        return response.json()["channels"]
+
+
+# Shared by every state class, so the whole app uses one connection pool
+async_api_client = AsyncAPIClient(API_BASE_URL)
@@ -0,0 +1,232 @@
+"""Process-wide channel catalogue and guide, shared read-only by every UI session"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional, Union
+
+from ladybug_tv.utils.api_client import AsyncAPIClient, async_api_client
+from ladybug_tv.utils.constants import (
+    CATALOGUE_MAX_LOOSE_ROWS,
+    CATALOGUE_MAX_PAGES,
+    CHANNEL_CACHE_TTL,
+    CHANNEL_LIST_FIELDS,
+    CHANNEL_PAGE_SIZE,
+    EPG_CACHE_TTL,
+)
+
+# A page's start: the keyset cursor when browsing (None for the first
+# page), the result offset when searching
+PageKey = Union[str, int, None]
+
+# The channels API's ETag is "v<catalogue version>-<query digest>"
+_ETAG_VERSION = re.compile(r'^(?:W/)?"v(\d+)-')
+
+
+def etag_version(etag: Optional[str]) -> Optional[int]:
+    """The backend catalogue version an ETag of the channels API was issued for"""
+    match = _ETAG_VERSION.match(etag or "")
+    return int(match.group(1)) if match else None
+
+
+class _Page(NamedTuple):
+    ids: tuple[str, ...]
+    next_key: PageKey
+    etag: Optional[str]
+    fetched_at: float
+
+
+class ChannelCatalogue:
+    """
+    Channel rows and list pages, fetched once per process and shared by
+    every session. Sessions keep only channel ids and the ``version`` they
+    were fetched at, and look rows up here to render them.
+
+    Rows are plain dicts of ``CHANNEL_LIST_FIELDS`` that nobody may modify:
+    a changed channel gets a new dict, so a session still showing the old
+    one keeps a consistent copy. A page is reused for ``ttl`` seconds, then
+    revalidated with its ETag, so an unchanged page costs a bodiless 304.
+    ETags carry the backend's catalogue version, and a page of a newer
+    version drops every cached page so that lists are fetched afresh.
+    Search results have no ETag and simply expire. Concurrent requests for
+    the same page, from any number of sessions, share one fetch.
+
+    Rows listed by a kept page stay. The others, "loose" rows, are kept for
+    sessions still showing them, up to ``max_loose_rows`` of them, dropping
+    the least recently looked up first; so memory follows ``max_pages``
+    rather than every channel the process has ever seen.
+    """
+
+    def __init__(
+        self,
+        api: AsyncAPIClient = async_api_client,
+        ttl: float = CHANNEL_CACHE_TTL,
+        max_pages: int = CATALOGUE_MAX_PAGES,
+        max_loose_rows: int = CATALOGUE_MAX_LOOSE_ROWS,
+    ):
+        self.api = api
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self.max_loose_rows = max_loose_rows
+        self.version = 0
+        self._rows: dict[str, dict] = {}
+        # Kept pages listing each row, and the rows no kept page lists
+        self._refs: dict[str, int] = {}
+        self._loose: OrderedDict[str, None] = OrderedDict()
+        self._pages: OrderedDict[tuple[str, PageKey], _Page] = OrderedDict()
+        self._inflight: dict[tuple[str, PageKey], asyncio.Future] = {}
+
+    def channel(self, channel_id: str) -> Optional[dict]:
+        if channel_id in self._loose:
+            self._loose.move_to_end(channel_id)
+        return self._rows.get(channel_id)
+
+    def channels(self, ids) -> list[dict]:
+        """Rows for ``ids`` in order, skipping any no longer known"""
+        return [row for row in map(self.channel, ids) if row is not None]
+
+    def remember(self, items: list[dict]) -> tuple[str, ...]:
+        """
+        Keep rows from an API response and return their ids. An unchanged
+        row keeps its existing dict, so every page sharing it shares one copy.
+        Rows no kept page lists are loose until a page listing them is kept.
+        """
+        ids = self._add_rows(items)
+        self._trim_loose()
+        return ids
+
+    def _add_rows(self, items: list[dict]) -> tuple[str, ...]:
+        ids = []
+        for item in items:
+            row = {field: item.get(field) for field in CHANNEL_LIST_FIELDS}
+            if self._rows.get(row["id"]) != row:
+                self._rows[row["id"]] = row
+            if row["id"] not in self._refs:
+                self._loose[row["id"]] = None
+                self._loose.move_to_end(row["id"])
+            ids.append(row["id"])
+        return tuple(ids)
+
+    async def page(self, query: str, key: PageKey) -> tuple[tuple[str, ...], PageKey]:
+        """Ids on one page of the list ("") or of ``query``'s results, and the next page's key"""
+        cache_key = (query, key)
+        cached = self._pages.get(cache_key)
+        if cached is not None and time.monotonic() - cached.fetched_at < self.ttl:
+            self._pages.move_to_end(cache_key)
+            return cached.ids, cached.next_key
+        fetch = self._inflight.get(cache_key)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self._fetch(query, key, cached))
+            self._inflight[cache_key] = fetch
+            fetch.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        # One waiter giving up must not cancel the fetch for the others
+        page = await asyncio.shield(fetch)
+        return page.ids, page.next_key
+
+    async def _fetch(self, query: str, key: PageKey, cached: Optional[_Page]) -> _Page:
+        if query:
+            results = await self.api.search_channels(
+                query, limit=CHANNEL_PAGE_SIZE, offset=key or 0
+            )
+            # Trimming waits until the page is kept, so its own rows stay
+            ids = self._add_rows(results["items"])
+            page = _Page(ids, results["next_offset"], None, time.monotonic())
+        else:
+            body, etag = await self._list_page(key, cached.etag if cached else None)
+            if body is None and not all(i in self._rows for i in cached.ids):
+                # Dropped, rows and all, since it was looked up: fetch it whole
+                body, etag = await self._list_page(key, None)
+            if body is None:
+                page = cached._replace(fetched_at=time.monotonic())
+            else:
+                self._advance(etag_version(etag))
+                ids = self._add_rows(body["items"])
+                page = _Page(ids, body["next_cursor"], etag, time.monotonic())
+        self._keep(query, key, page)
+        return page
+
+    async def _list_page(self, key: PageKey, etag: Optional[str]):
+        return await self.api.get_channels_if_changed(
+            etag=etag, cursor=key, limit=CHANNEL_PAGE_SIZE, fields=CHANNEL_LIST_FIELDS
+        )
+
+    def _keep(self, query: str, key: PageKey, page: _Page):
+        """Cache a page, in place of any older copy, and drop the least recently used"""
+        for channel_id in page.ids:
+            self._refs[channel_id] = self._refs.get(channel_id, 0) + 1
+            self._loose.pop(channel_id, None)
+        replaced = self._pages.pop((query, key), None)
+        if replaced is not None:
+            self._release(replaced)
+        self._pages[(query, key)] = page
+        while len(self._pages) > self.max_pages:
+            self._release(self._pages.popitem(last=False)[1])
+        self._trim_loose()
+
+    def _release(self, page: _Page):
+        """Count a page as no longer kept; rows it was the last to list become loose"""
+        for channel_id in page.ids:
+            refs = self._refs.pop(channel_id) - 1
+            if refs:
+                self._refs[channel_id] = refs
+            else:
+                self._loose[channel_id] = None
+
+    def _trim_loose(self):
+        while len(self._loose) > self.max_loose_rows:
+            channel_id, _ = self._loose.popitem(last=False)
+            del self._rows[channel_id]
+
+    def _advance(self, version: Optional[int]):
+        """Forget the cached pages once the backend catalogue has changed"""
+        if version is None or version <= self.version:
+            return
+        if self.version:
+            for page in self._pages.values():
+                self._release(page)
+            self._pages.clear()
+        self.version = version
+
+
+class ProgrammeGuide:
+    """
+    Now/next per channel, as returned with a stream lookup, shared by every
+    session watching the channel. An entry is fresh until its current
+    programme ends or for ``ttl`` seconds, whichever is sooner; stale
+    entries are still returned until they are replaced.
+    """
+
+    def __init__(self, ttl: float = EPG_CACHE_TTL, max_channels: int = 10000):
+        self.ttl = ttl
+        self.max_channels = max_channels
+        self._entries: dict[str, tuple[float, dict]] = {}
+
+    def get(self, channel_id: str) -> dict:
+        """``{"current", "upcoming"}`` for a channel, empty values if unknown"""
+        entry = self._entries.get(channel_id)
+        return entry[1] if entry else {"current": {}, "upcoming": []}
+
+    def fresh(self, channel_id: str) -> bool:
+        entry = self._entries.get(channel_id)
+        return entry is not None and entry[0] > time.time()
+
+    def put(self, channel_id: str, guide: dict):
+        expires = time.time() + self.ttl
+        end = (guide.get("current") or {}).get("end_time")
+        if end:
+            try:
+                # Guide times are naive UTC
+                ends = datetime.fromisoformat(end).replace(tzinfo=timezone.utc).timestamp()
+                expires = min(expires, ends)
+            except ValueError:
+                pass
+        if len(self._entries) >= self.max_channels:
+            now = time.time()
+            self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+        self._entries[channel_id] = (expires, guide)
+
+
+catalogue = ChannelCatalogue()
+guide = ProgrammeGuide()
@@ -3,11 +3,33 @@
 # API Configuration
 API_BASE_URL = "http://localhost:8001"
 STREAM_BASE_URL = "http://localhost:8002"
+# Backend requests from event handlers: seconds per attempt, retries after
+# the first attempt, base of the jittered retry delay, pooled connections
+API_TIMEOUT = 10.0
+API_CONNECT_TIMEOUT = 3.0
+API_RETRIES = 2
+API_RETRY_BACKOFF = 0.2
+API_MAX_CONNECTIONS = 100
 
 # UI Configuration
 SIDEBAR_WIDTH = "300px"
 VIDEO_HEIGHT = "60vh"
+# Delay after the last keystroke before the search box queries the API
+SEARCH_DEBOUNCE_MS = 300
+# The channel list holds the pages on screen plus this many either side,
+# and loads further pages as it scrolls
+CHANNEL_PAGE_SIZE = 50
+CHANNEL_WINDOW_BUFFER_PAGES = 1
+CHANNEL_ROW_HEIGHT_PX = 61
+CHANNEL_SCROLL_THROTTLE_MS = 150
+# Channel fields the list shows
+CHANNEL_LIST_FIELDS = ["id", "name", "category", "logo"]
 
 # Cache TTL (seconds)
 CHANNEL_CACHE_TTL = 300
 EPG_CACHE_TTL = 600
+# List and search pages the shared catalogue keeps, least recently used first out
+CATALOGUE_MAX_PAGES = 2000
+# Channel rows it keeps that no kept page lists, e.g. a favourite being
+# watched or rows of pages since dropped, least recently shown first out
+CATALOGUE_MAX_LOOSE_ROWS = 5000
@@ -0,0 +1,122 @@
+"""Benchmark: one ladder transcode vs a separate ffmpeg process per rendition
+
+Encodes an H.264 test clip, serves it over a local HTTP server, and
+transcodes it to every rung of a bitrate ladder twice: once as a single
+ladder process that decodes the source once, and once as one process per
+rung, each decoding it again. The clip is read as fast as ffmpeg takes
+it, and the CPU time each approach needs for the whole clip is reported
+as cores per live channel, so the result holds on a machine with few
+cores. No network access is needed.
+
+Usage: python scripts/bench_abr.py [--ladder 720:2800,480:1400,360:800] [--seconds 20]
+"""
+import argparse
+import asyncio
+import functools
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import settings  # noqa: E402
+from stream_relay.transcoder import TRANSCODE, Plan, Transcoder  # noqa: E402
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def encode_clip(ffmpeg: str, path: str, size: str, seconds: float):
+    subprocess.run([
+        ffmpeg, '-v', 'error', '-y',
+        '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate=25',
+        '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000',
+        '-t', str(seconds),
+        '-c:v', 'libx264', '-preset', 'veryfast', '-g', '50', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-b:a', '128k',
+        '-f', 'matroska', path,
+    ], check=True)
+
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def measure(transcoder, url: str, plans, output_dir: str) -> float:
+    """CPU seconds for running one process per plan over the whole clip"""
+    before = children_cpu()
+    processes = [
+        await transcoder.transcode_to_hls(url, os.path.join(output_dir, str(i)), plan)
+        for i, plan in enumerate(plans)
+    ]
+    errors = await asyncio.gather(*(process.stderr.read() for process in processes))
+    await asyncio.gather(*(process.wait() for process in processes))
+    for process, error in zip(processes, errors):
+        if process.returncode != 0:
+            sys.exit(f"ffmpeg failed: {error.decode('utf-8', 'replace').strip()}")
+    return children_cpu() - before
+
+
+async def run(args, url: str, output_dir: str):
+    transcoder = Transcoder(ladder=args.ladder)
+    probe = await transcoder.probe(url)
+    renditions = tuple(transcoder.renditions(probe))
+    if not renditions:
+        sys.exit(f"the ladder needs at least two rungs no taller than the {args.size} source")
+    names = ', '.join(rendition.name for rendition in renditions)
+    print(f"{args.size} H.264 source to {names}, {args.seconds:.0f}s clip")
+
+    ladder = await measure(
+        transcoder, url, [Plan(TRANSCODE, renditions)], os.path.join(output_dir, 'ladder')
+    )
+    separate = await measure(
+        transcoder, url, [Plan(TRANSCODE, (rendition,)) for rendition in renditions],
+        os.path.join(output_dir, 'separate'),
+    )
+    for label, used in (("one ladder process", ladder),
+                        (f"{len(renditions)} processes, one per rung", separate)):
+        print(f"{label:>26}: {used:6.1f} CPU s, {used / args.seconds:5.2f} cores per channel")
+    print(f"the ladder process saves {(1 - ladder / separate) * 100:.0f}% of the CPU")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ladder', default='720:2800,480:1400,360:800')
+    parser.add_argument('--size', default='1280x720')
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--ffmpeg-path', default=settings.ffmpeg_path)
+    parser.add_argument('--ffprobe-path', default=settings.ffprobe_path)
+    args = parser.parse_args()
+
+    settings.ffmpeg_path = args.ffmpeg_path
+    settings.ffprobe_path = args.ffprobe_path
+    workdir = tempfile.mkdtemp(prefix='abr-bench-')
+    try:
+        media = os.path.join(workdir, 'media')
+        os.makedirs(media)
+        print("encoding test clip...")
+        encode_clip(args.ffmpeg_path, os.path.join(media, 'source.mkv'), args.size, args.seconds)
+
+        server = ThreadingHTTPServer(
+            ('127.0.0.1', 0), functools.partial(QuietHandler, directory=media)
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}/source.mkv'
+            asyncio.run(run(args, url, os.path.join(workdir, 'hls')))
+        finally:
+            server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Benchmark: concurrent channel reads through the sync and async database paths
+
+Serves the same single-channel lookup three ways from an in-process ASGI
+app and drives each with N concurrent clients:
+
+  blocking   async handler calling a sync Session (blocks the event loop)
+  threadpool sync handler on a sync Session (FastAPI's threadpool)
+  async      async handler on an AsyncSession (asyncpg / aiosqlite)
+
+The response cache is bypassed so every request reaches the database.
+Runs against a SQLite file unless --database-url is given; point it at a
+scratch Postgres database (postgresql://...) to measure the asyncpg path.
+
+Usage: python scripts/bench_db_paths.py [--channels 5000] [--requests 5000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy import create_engine, insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from backend.database import Base, async_database_url  # noqa: E402
+from backend.models.channel import Channel  # noqa: E402
+
+TABLES = [Channel.__table__]
+
+
+def populate(engine, channels: int):
+    with engine.begin() as conn:
+        conn.execute(insert(Channel), [
+            {
+                'id': f'ch{c}',
+                'name': f'Channel {c}',
+                'category': 'News',
+                'stream_url': f'http://example.com/{c}.m3u8',
+                'is_active': True,
+            }
+            for c in range(channels)
+        ])
+
+
+def create_app(engine, async_engine) -> FastAPI:
+    app = FastAPI()
+    SyncSession = sessionmaker(bind=engine)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    def get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    def lookup(channel_id):
+        return select(Channel.id, Channel.name, Channel.is_active).where(Channel.id == channel_id)
+
+    @app.get('/blocking/{channel_id}')
+    async def blocking(channel_id: str, db=Depends(get_db)):
+        row = db.execute(lookup(channel_id)).first()
+        return dict(row._mapping)
+
+    @app.get('/threadpool/{channel_id}')
+    def threadpool(channel_id: str, db=Depends(get_db)):
+        row = db.execute(lookup(channel_id)).first()
+        return dict(row._mapping)
+
+    @app.get('/async/{channel_id}')
+    async def async_(channel_id: str, db=Depends(get_async_db)):
+        row = (await db.execute(lookup(channel_id))).first()
+        return dict(row._mapping)
+
+    return app
+
+
+async def drive(app, route: str, ids: list, concurrency: int):
+    """Issue one request per id from ``concurrency`` workers; latencies and wall time"""
+    transport = httpx.ASGITransport(app=app)
+    samples = []
+    queue = iter(ids)
+
+    async def worker(client):
+        for channel_id in queue:
+            t0 = time.perf_counter()
+            response = await client.get(f'/{route}/{channel_id}')
+            samples.append(time.perf_counter() - t0)
+            response.raise_for_status()
+
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        return samples, time.perf_counter() - started
+
+
+def percentiles(samples: list) -> str:
+    cuts = statistics.quantiles(samples, n=100)
+    return f"p50 {cuts[49] * 1e3:7.2f}ms   p99 {cuts[98] * 1e3:7.2f}ms"
+
+
+async def run(args, app):
+    rng = random.Random(42)
+    ids = [f'ch{rng.randrange(args.channels)}' for _ in range(args.requests)]
+    # Warm both pools and the import caches before timing
+    for route in ('blocking', 'threadpool', 'async'):
+        await drive(app, route, ids[:args.concurrency], args.concurrency)
+    for route in ('blocking', 'threadpool', 'async'):
+        samples, elapsed = await drive(app, route, ids, args.concurrency)
+        print(f"{route:>10}: {len(samples) / elapsed:8.0f} req/s   {percentiles(samples)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    scratch = None
+    database_url = args.database_url
+    if database_url is None:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        database_url = f'sqlite:///{scratch.name}'
+
+    # Enough connections for every client: with fewer, a blocking handler
+    # waiting on the pool stalls the event loop that would release the
+    # connections it is waiting for, until the pool timeout
+    pool = {
+        'pool_size': args.pool_size,
+        'max_overflow': max(0, args.concurrency - args.pool_size),
+    }
+    engine = create_engine(database_url, **pool)
+    async_engine = create_async_engine(async_database_url(database_url), **pool)
+    Base.metadata.drop_all(engine, tables=TABLES)
+    Base.metadata.create_all(engine, tables=TABLES)
+    populate(engine, args.channels)
+    print(f"{args.requests} lookups over {args.channels} channels, "
+          f"{args.concurrency} concurrent clients")
+
+    asyncio.run(run(args, create_app(engine, async_engine)))
+
+    asyncio.run(async_engine.dispose())
+    Base.metadata.drop_all(engine, tables=TABLES)
+    engine.dispose()
+    if scratch is not None:
+        os.unlink(scratch.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark: now/next EPG lookup latency, database range query vs in-memory index
+
+Fills epg_programs with a synthetic guide, then times random now/next
+lookups both ways and reports p50/p99. Runs against a SQLite file unless
+--database-url is given (point it at a scratch Postgres database to include
+network round trips).
+
+Usage: python scripts/bench_epg_lookup.py [--channels 2000] [--hours 192] [--lookups 20000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from backend.database import Base  # noqa: E402
+from backend.models.channel import Channel  # noqa: E402
+from backend.models.epg import EPGProgram  # noqa: E402
+from backend.services.epg_index import EPGIndex  # noqa: E402
+
+# The index also reads channels for catalogue -> guide id aliases
+TABLES = [Channel.__table__, EPGProgram.__table__]
+
+
+def populate(db, channels: int, hours: int, origin: datetime):
+    """Half-hour programmes back to back on every channel"""
+    slots = hours * 2
+    for c in range(channels):
+        db.execute(insert(EPGProgram), [
+            {
+                'channel_id': f'channel{c}.example',
+                'title': f'Programme {c}-{s}',
+                'description': 'Synthetic programme',
+                'category': 'News',
+                'start_time': origin + timedelta(minutes=30 * s),
+                'end_time': origin + timedelta(minutes=30 * (s + 1)),
+            }
+            for s in range(slots)
+        ])
+    db.commit()
+
+
+def db_now_next(db, channel_id: str, at: datetime, upcoming: int):
+    """The range queries the endpoint would otherwise run per request"""
+    current = db.query(EPGProgram).filter(
+        EPGProgram.channel_id == channel_id,
+        EPGProgram.start_time <= at,
+        EPGProgram.end_time > at,
+    ).first()
+    following = db.query(EPGProgram).filter(
+        EPGProgram.channel_id == channel_id,
+        EPGProgram.start_time > at,
+    ).order_by(EPGProgram.start_time).limit(upcoming).all()
+    return current, following
+
+
+def percentiles(samples: list) -> str:
+    cuts = statistics.quantiles(samples, n=100)
+    return f"p50 {cuts[49] * 1e6:9.1f}us   p99 {cuts[98] * 1e6:9.1f}us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=2000)
+    parser.add_argument('--hours', type=int, default=192)
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--upcoming', type=int, default=5)
+    parser.add_argument('--database-url')
+    args = parser.parse_args()
+
+    scratch = None
+    database_url = args.database_url
+    if database_url is None:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        database_url = f'sqlite:///{scratch.name}'
+
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine, tables=TABLES)
+    Base.metadata.create_all(engine, tables=TABLES)
+    db = sessionmaker(bind=engine)()
+
+    origin = datetime(2024, 1, 1)
+    started = time.perf_counter()
+    populate(db, args.channels, args.hours, origin)
+    print(f"{args.channels * args.hours * 2} programmes loaded "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    index = EPGIndex()
+    started = time.perf_counter()
+    index.load(db)
+    print(f"index built in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(42)
+    span = args.hours * 3600
+    probes = [
+        (f'channel{rng.randrange(args.channels)}.example',
+         origin + timedelta(seconds=rng.randrange(span)))
+        for _ in range(args.lookups)
+    ]
+
+    for name, lookup in (
+        ('database', lambda c, at: db_now_next(db, c, at, args.upcoming)),
+        ('memory', lambda c, at: index.now_next(c, at, args.upcoming)),
+    ):
+        samples = []
+        for channel_id, at in probes:
+            t0 = time.perf_counter()
+            lookup(channel_id, at)
+            samples.append(time.perf_counter() - t0)
+        print(f"{name:>9}: {percentiles(samples)}")
+
+    db.close()
+    Base.metadata.drop_all(engine, tables=TABLES)
+    if scratch is not None:
+        os.unlink(scratch.name)
+
+
+if __name__ == '__main__':
+    main()
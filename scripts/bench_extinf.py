@@ -0,0 +1,110 @@
+"""Micro-benchmark: EXTINF attribute extraction, legacy vs single-pass tokenizer
+
+Usage: python scripts/bench_extinf.py [--lines 100000] [--repeat 5]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.playlist_service import M3U8Parser  # noqa: E402
+
+
+def legacy_parse_extinf(line: str) -> dict:
+    """The previous implementation: one re.search per attribute"""
+    metadata = {}
+    tvg_id_match = re.search(r'tvg-id="([^"]*)"', line)
+    if tvg_id_match:
+        metadata['tvg_id'] = tvg_id_match.group(1)
+    tvg_name_match = re.search(r'tvg-name="([^"]*)"', line)
+    if tvg_name_match:
+        metadata['tvg_name'] = tvg_name_match.group(1)
+    tvg_logo_match = re.search(r'tvg-logo="([^"]*)"', line)
+    if tvg_logo_match:
+        metadata['logo'] = tvg_logo_match.group(1)
+    group_match = re.search(r'group-title="([^"]*)"', line)
+    if group_match:
+        metadata['category'] = group_match.group(1)
+    name_match = re.search(r',(.+)$', line)
+    if name_match:
+        metadata['name'] = name_match.group(1).strip()
+    return metadata
+
+
+LEGACY_ALL_ATTRIBUTES = (
+    'tvg-id', 'tvg-name', 'tvg-logo', 'tvg-chno', 'tvg-shift',
+    'catchup', 'catchup-days', 'group-title',
+)
+
+
+def legacy_parse_extinf_all(line: str) -> dict:
+    """The previous approach extended to keep every attribute in the playlist"""
+    metadata = {}
+    for attribute in LEGACY_ALL_ATTRIBUTES:
+        match = re.search(attribute + r'="([^"]*)"', line)
+        if match:
+            metadata[attribute] = match.group(1)
+    name_match = re.search(r',(.+)$', line)
+    if name_match:
+        metadata['name'] = name_match.group(1).strip()
+    return metadata
+
+
+def synthetic_playlist(lines: int) -> list:
+    """Build a playlist of ``lines`` lines (one EXTINF + one URL per channel)"""
+    playlist = ['#EXTM3U']
+    for i in range(lines // 2):
+        playlist.append(
+            f'#EXTINF:-1 tvg-id="channel{i}.example" tvg-name="Channel {i}" '
+            f'tvg-logo="http://logos.example/{i}.png" tvg-chno="{i}" tvg-shift="0" '
+            f'catchup="default" catchup-days="7" group-title="Group {i % 40}",Channel {i} HD'
+        )
+        playlist.append(f'http://streams.example/live/{i}/index.m3u8')
+    return playlist
+
+
+def best_of(fn, extinf_lines, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in extinf_lines:
+            fn(line)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--lines', type=int, default=100_000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    playlist = synthetic_playlist(args.lines)
+    extinf_lines = [line for line in playlist if line.startswith('#EXTINF')]
+    parser = M3U8Parser(None)
+
+    legacy = best_of(legacy_parse_extinf, extinf_lines, args.repeat)
+    legacy_all = best_of(legacy_parse_extinf_all, extinf_lines, args.repeat)
+    tokenizer = best_of(parser._parse_extinf, extinf_lines, args.repeat)
+
+    start = time.perf_counter()
+    parsed = sum(1 for _ in parser.iter_playlist(playlist))
+    full_parse = time.perf_counter() - start
+
+    print(f"playlist lines:         {len(playlist):>10,}")
+    print(f"EXTINF lines:           {len(extinf_lines):>10,}")
+    print(f"legacy (5x re.search):  {legacy * 1000:>10.1f} ms  (4 attributes kept)")
+    print(f"legacy, all attributes: {legacy_all * 1000:>10.1f} ms  "
+          f"({len(LEGACY_ALL_ATTRIBUTES)} attributes kept)")
+    print(f"single-pass tokenizer:  {tokenizer * 1000:>10.1f} ms  "
+          f"({len(parser._parse_extinf(extinf_lines[0])['attributes'])} attributes kept)")
+    print(f"speedup vs legacy:      {legacy / tokenizer:>10.2f}x")
+    print(f"speedup vs legacy, all: {legacy_all / tokenizer:>10.2f}x")
+    print(f"full iter_playlist:     {full_parse * 1000:>10.1f} ms  ({parsed:,} channels)")
+
+
+if __name__ == '__main__':
+    main()
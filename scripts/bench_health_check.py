@@ -0,0 +1,134 @@
+"""Benchmark: stream health checks against a local fake HLS origin
+
+Starts scripts/fake_hls_server.py in a child process and fills a
+scratch SQLite database with channels that point at it, spread over many
+loopback hosts and mixing live, master, raw, dead, broken, empty and slow
+streams. A share of the channels point at a host nothing listens on, to
+exercise the host backoff. The checker then runs several passes, and
+the script reports each pass's outcome and rate, plus the time the last
+rate implies for 50,000 channels. No network access is needed.
+
+Usage: python scripts/bench_health_check.py [--channels 5000] [--passes 3] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_hls_server import channel_urls  # noqa: E402
+from sqlalchemy import create_engine, func, insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from backend.config import settings  # noqa: E402
+from backend.database import Base, async_database_url  # noqa: E402
+from backend.models.catalogue import CatalogueVersion  # noqa: E402
+from backend.models.channel import Channel  # noqa: E402
+from backend.services.stream_health import StreamHealthChecker  # noqa: E402
+
+TABLES = [Channel.__table__, CatalogueVersion.__table__]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, latency_ms: float, slow_seconds: float) -> subprocess.Popen:
+    """The fake origin in its own process, so it does not share the checker's GIL"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_hls_server.py')
+    server = subprocess.Popen([
+        sys.executable, script,
+        '--port', str(port), '--latency-ms', str(latency_ms), '--slow-seconds', str(slow_seconds),
+    ])
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    sys.exit("fake HLS server did not start")
+
+
+def populate(engine, urls, unreachable: int):
+    # Port 9 (discard) on a loopback address: connections are refused
+    dead_host = [f'http://127.0.0.1:9/live/{n}.m3u8' for n in range(unreachable)]
+    with engine.begin() as conn:
+        conn.execute(insert(CatalogueVersion), [{'id': 1, 'version': 1}])
+        conn.execute(insert(Channel), [
+            {'id': f'ch{n}', 'name': f'Channel {n}', 'stream_url': url, 'is_active': True}
+            for n, url in enumerate(urls + dead_host)
+        ])
+
+
+async def run(args, database_url: str, port: int):
+    engine = create_async_engine(async_database_url(database_url))
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        rate = 0.0
+        for number in range(1, args.passes + 1):
+            checker = StreamHealthChecker(
+                concurrency=args.concurrency, per_host=args.per_host,
+                timeout=args.timeout, session_factory=sessions,
+            )
+            result = await checker.run()
+            rate = result['checked'] / result['seconds'] if result['seconds'] else 0.0
+            print(f"pass {number}: {result['checked']} checked in {result['seconds']:.1f}s "
+                  f"({rate:.0f}/s): {result['passed']} passed, {result['failed']} failed, "
+                  f"{result['disabled']} disabled, {result['enabled']} enabled, "
+                  f"{result['hosts_down']} hosts down")
+        async with sessions() as db:
+            active = (await db.execute(
+                select(func.count()).select_from(Channel).where(Channel.is_active.is_(True))
+            )).scalar_one()
+            latency = (await db.execute(select(func.avg(Channel.latency_ms)))).scalar_one()
+        print(f"active channels after {args.passes} passes: {active}, "
+              f"mean latency {latency or 0:.0f}ms")
+        if rate:
+            print(f"50,000 channels at the last pass's rate: {50000 / rate / 60:.1f} minutes")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=5000)
+    parser.add_argument('--hosts', type=int, default=50)
+    parser.add_argument('--unreachable', type=int, default=200)
+    parser.add_argument('--passes', type=int, default=3)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--concurrency', type=int, default=settings.health_check_concurrency)
+    parser.add_argument('--per-host', type=int, default=settings.health_check_per_host)
+    parser.add_argument('--timeout', type=float, default=5.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port, args.latency_ms, slow_seconds=args.timeout * 2)
+    workdir = tempfile.mkdtemp(prefix='health-bench-')
+    database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    try:
+        engine = create_engine(database_url)
+        Base.metadata.create_all(engine, tables=TABLES)
+        populate(engine, channel_urls(port, args.channels, args.hosts), args.unreachable)
+        engine.dispose()
+        print(f"{args.channels} channels on {args.hosts} hosts plus {args.unreachable} "
+              f"on an unreachable host, {args.latency_ms:.0f}ms origin latency")
+        asyncio.run(run(args, database_url, port))
+    finally:
+        server.terminate()
+        server.wait()
+        for name in os.listdir(workdir):
+            os.unlink(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
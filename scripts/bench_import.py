@@ -0,0 +1,113 @@
+"""Benchmark: channel import time against channel count
+
+Compares the legacy per-row existence check with the bulk import path.
+Runs against an in-memory SQLite database unless --database-url is given
+(point it at a scratch Postgres database to measure real round trips).
+
+Usage: python scripts/bench_import.py [--counts 1000,10000,100000] [--legacy-max 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from backend.database import Base  # noqa: E402
+from backend.models.channel import Channel  # noqa: E402
+from backend.services.playlist_service import M3U8Parser  # noqa: E402
+
+
+def synthetic_channels(count: int, offset: int = 0) -> list:
+    return [
+        {
+            'tvg_id': f'channel{i}.example',
+            'name': f'Channel {i}',
+            'category': f'Group {i % 40}',
+            'logo': f'http://logos.example/{i}.png',
+            'stream_url': f'http://streams.example/live/{i}/index.m3u8',
+            'attributes': {'tvg-id': f'channel{i}.example', 'tvg-chno': str(i)},
+        }
+        for i in range(offset, offset + count)
+    ]
+
+
+def legacy_import(db, channels: list) -> int:
+    """The previous import: one SELECT per channel, one ORM add per row"""
+    imported = 0
+    for channel_data in channels:
+        existing = db.query(Channel).filter(
+            Channel.stream_url == channel_data.get('stream_url')
+        ).first()
+        if not existing:
+            db.add(Channel(
+                id=channel_data.get('tvg_id') or f"ch-{imported}",
+                name=channel_data.get('name', 'Unknown'),
+                category=channel_data.get('category', 'Uncategorized'),
+                logo=channel_data.get('logo'),
+                stream_url=channel_data['stream_url'],
+                epg_id=channel_data.get('tvg_id'),
+                is_active=True,
+            ))
+            imported += 1
+    db.commit()
+    return imported
+
+
+def timed(database_url: str, fn) -> float:
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        start = time.perf_counter()
+        fn(db)
+        return time.perf_counter() - start
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--database-url', default='sqlite://')
+    arg_parser.add_argument('--counts', default='1000,10000,50000,100000')
+    arg_parser.add_argument('--legacy-max', type=int, default=10000,
+                            help='skip the legacy path above this many channels')
+    arg_parser.add_argument('--batch-size', type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    print(f"{'channels':>10} {'legacy':>12} {'bulk (new)':>12} {'bulk (re-sync)':>15}")
+    for count in (int(c) for c in args.counts.split(',')):
+        channels = synthetic_channels(count)
+
+        legacy = None
+        if count <= args.legacy_max:
+            legacy = timed(args.database_url, lambda db: legacy_import(db, channels))
+
+        bulk = timed(
+            args.database_url,
+            lambda db: M3U8Parser(db).bulk_import_channels(channels, args.batch_size),
+        )
+
+        # Second import over a populated table: 90% unchanged, 10% new
+        def resync(db):
+            parser = M3U8Parser(db)
+            parser.bulk_import_channels(channels, args.batch_size)
+            start = time.perf_counter()
+            parser.bulk_import_channels(
+                channels[count // 10:] + synthetic_channels(count // 10, offset=count),
+                args.batch_size,
+            )
+            resync.elapsed = time.perf_counter() - start
+        timed(args.database_url, resync)
+
+        legacy_text = f"{legacy:>11.2f}s" if legacy is not None else f"{'-':>12}"
+        print(f"{count:>10,} {legacy_text} {bulk:>11.2f}s {resync.elapsed:>14.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark: ffmpeg CPU per channel for passthrough, audio-only and full transcode
+
+Encodes short H.264 test clips (one with AAC audio, one with MP2), serves
+them over a local HTTP server paced at real time, as a live source would
+be, and runs each through the relay supervisor. The probe picks the mode
+for each clip; the AAC clip is then also forced through a full transcode.
+Reports each ffmpeg process's CPU use and the channels one core could
+carry at that rate. No network access is needed.
+
+Usage: python scripts/bench_passthrough.py [--size 1280x720] [--seconds 15]
+"""
+import argparse
+import asyncio
+import functools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import settings  # noqa: E402
+from stream_relay.supervisor import TranscodeSupervisor  # noqa: E402
+
+CLIP_SECONDS = 90
+
+
+class PacedHandler(SimpleHTTPRequestHandler):
+    """Serves files at their playback rate instead of as fast as possible"""
+
+    def log_message(self, *args):
+        pass
+
+    def copyfile(self, source, outputfile):
+        data = source.read()
+        rate = len(data) / CLIP_SECONDS
+        started = time.monotonic()
+        sent = 0
+        chunk = 64 * 1024
+        try:
+            while sent < len(data):
+                outputfile.write(data[sent:sent + chunk])
+                sent += chunk
+                # One second of lead, as a live origin's buffer would give
+                ahead = sent / rate - (time.monotonic() - started) - 1.0
+                if ahead > 0:
+                    time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def encode_clip(ffmpeg: str, path: str, size: str, audio_codec: str):
+    subprocess.run([
+        ffmpeg, '-v', 'error', '-y',
+        '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate=25',
+        '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000',
+        '-t', str(CLIP_SECONDS),
+        '-c:v', 'libx264', '-preset', 'veryfast', '-g', '50', '-pix_fmt', 'yuv420p',
+        '-c:a', audio_codec, '-b:a', '128k',
+        '-f', 'matroska', path,
+    ], check=True)
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f'/proc/{pid}/stat') as stat:
+        fields = stat.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+async def measure(supervisor, channel_id: str, url: str, seconds: float):
+    async def resolve():
+        return url
+
+    session = await supervisor.acquire(channel_id, resolve)
+    pid = session.process.pid
+    before, started = cpu_seconds(pid), time.monotonic()
+    await asyncio.sleep(seconds)
+    share = (cpu_seconds(pid) - before) / (time.monotonic() - started)
+    mode = session.mode
+    await supervisor.stop(session)
+    return mode, share
+
+
+async def run(args, port: int, output_dir: str):
+    supervisor = TranscodeSupervisor(output_dir=output_dir, max_concurrent=4, max_remux=4)
+    runs = [
+        ('aac', f'http://127.0.0.1:{port}/aac.mkv', True),
+        ('mp2', f'http://127.0.0.1:{port}/mp2.mkv', True),
+        ('aac, forced', f'http://127.0.0.1:{port}/aac.mkv', False),
+    ]
+    print(f"{args.size} H.264 source, {args.seconds:.0f}s per run")
+    for label, url, passthrough in runs:
+        settings.transcode_passthrough = passthrough
+        mode, share = await measure(supervisor, label, url, args.seconds)
+        per_core = f"{1 / share:6.1f}" if share > 0 else "   n/a"
+        print(f"{label:>12}: {mode:>11}  {share * 100:6.1f}% of a core  "
+              f"-> {per_core} channels per core")
+    await supervisor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='1280x720')
+    parser.add_argument('--seconds', type=float, default=15.0)
+    parser.add_argument('--ffmpeg-path', default=settings.ffmpeg_path)
+    parser.add_argument('--ffprobe-path', default=settings.ffprobe_path)
+    args = parser.parse_args()
+
+    settings.ffmpeg_path = args.ffmpeg_path
+    settings.ffprobe_path = args.ffprobe_path
+    workdir = tempfile.mkdtemp(prefix='passthrough-bench-')
+    try:
+        media = os.path.join(workdir, 'media')
+        os.makedirs(media)
+        print("encoding test clips...")
+        encode_clip(args.ffmpeg_path, os.path.join(media, 'aac.mkv'), args.size, 'aac')
+        encode_clip(args.ffmpeg_path, os.path.join(media, 'mp2.mkv'), args.size, 'mp2')
+
+        server = ThreadingHTTPServer(
+            ('127.0.0.1', 0), functools.partial(PacedHandler, directory=media)
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            asyncio.run(run(args, server.server_address[1], os.path.join(workdir, 'hls')))
+        finally:
+            server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark: serving live HLS segments from files vs from the in-memory buffer
+
+Fills a segment buffer with synthetic segments and writes the same bytes
+to disk, then has many concurrent viewers fetch the newest segments from
+two routes of an in-process ASGI app: one reading files as the relay
+used to (FileResponse), one returning the buffered bytes. Reports
+requests per second and latency percentiles for each. No ffmpeg, network
+or database is needed.
+
+Usage: python scripts/bench_segment_serving.py [--viewers 200] [--requests 4000] [--segment-kb 1500]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, Response
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_relay.hls_generator import SegmentStore  # noqa: E402
+
+
+def build_app(buffer, directory: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/disk/{segment}")
+    async def from_disk(segment: str):
+        path = os.path.join(directory, segment)
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404)
+        return FileResponse(path, media_type="video/mp2t")
+
+    @app.get("/memory/{segment}")
+    async def from_memory(segment: str):
+        found = buffer.get(segment)
+        if found is None:
+            raise HTTPException(status_code=404)
+        return Response(found.data, media_type="video/mp2t")
+
+    return app
+
+
+async def fetch_all(client, route: str, uris, viewers: int, requests: int):
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(uris[i % len(uris)])
+
+    async def viewer():
+        while True:
+            try:
+                uri = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            response = await client.get(f"/{route}/{uri}")
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200 and response.content
+
+    started = time.perf_counter()
+    await asyncio.gather(*(viewer() for _ in range(viewers)))
+    return time.perf_counter() - started, sorted(latencies)
+
+
+async def run(args, directory: str):
+    store = SegmentStore(1 << 40)
+    buffer = store.buffer('bench', window=5, retain=3)
+    for _ in range(8):
+        data = os.urandom(args.segment_kb * 1024)
+        segment = buffer.add(data, 6.0)
+        with open(os.path.join(directory, buffer.segment_uri(segment.sequence)), 'wb') as f:
+            f.write(data)
+    # Viewers of a live channel all want the newest few segments
+    uris = [buffer.segment_uri(segment.sequence) for segment in list(buffer.segments)[-3:]]
+
+    transport = httpx.ASGITransport(app=build_app(buffer, directory))
+    async with httpx.AsyncClient(transport=transport, base_url="http://relay") as client:
+        print(f"{args.viewers} viewers, {args.requests} requests of "
+              f"{args.segment_kb} KB segments")
+        for route in ("disk", "memory"):
+            await fetch_all(client, route, uris, args.viewers, min(args.requests, 200))
+            elapsed, latencies = await fetch_all(client, route, uris, args.viewers, args.requests)
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(f"{route:>7}: {args.requests / elapsed:8.0f} req/s  "
+                  f"p50 {statistics.median(latencies) * 1000:7.1f}ms  p99 {p99 * 1000:7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--viewers', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--segment-kb', type=int, default=1500)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='segment-bench-')
+    try:
+        asyncio.run(run(args, directory))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
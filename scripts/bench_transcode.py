@@ -0,0 +1,118 @@
+"""Benchmark: transcode startup, sharing, queueing and idle teardown on test patterns
+
+Runs the relay's transcode supervisor against generated lavfi test patterns
+(no network, no database) and reports:
+
+  - time from first request to a playable playlist, per channel
+  - that concurrent viewers of one channel share a single ffmpeg process
+  - that channels beyond the concurrency cap queue, and beyond the queue
+    are refused
+  - that processes stop once their channel has been idle
+
+Usage: python scripts/bench_transcode.py [--channels 4] [--viewers 20] [--max-concurrent 2]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import settings  # noqa: E402
+from stream_relay.supervisor import CapacityError, TranscodeSupervisor  # noqa: E402
+from stream_relay.transcoder import TEST_PATTERN_PREFIX  # noqa: E402
+
+PATTERN = 'testsrc2=size=640x360:rate=25[out0];sine=frequency={hz}[out1]'
+
+
+def pattern_url(channel: int) -> str:
+    return TEST_PATTERN_PREFIX + PATTERN.format(hz=220 + 110 * channel)
+
+
+async def watch(supervisor, channel: int):
+    """Time until the channel's playlist is ready, and its ffmpeg pid"""
+    started = time.perf_counter()
+
+    async def resolve():
+        return pattern_url(channel)
+
+    session = await supervisor.acquire(f'test{channel}', resolve)
+    return time.perf_counter() - started, session.process.pid
+
+
+async def run(args, output_dir: str):
+    supervisor = TranscodeSupervisor(
+        max_concurrent=args.max_concurrent,
+        queue_size=args.queue_size,
+        queue_timeout=args.queue_timeout,
+        idle_timeout=args.idle_timeout,
+        output_dir=output_dir,
+    )
+    supervisor.start()
+    try:
+        # Many viewers of one channel at once: one process between them
+        results = await asyncio.gather(*(watch(supervisor, 0) for _ in range(args.viewers)))
+        pids = {pid for _, pid in results}
+        startup = [elapsed for elapsed, _ in results]
+        print(f"{args.viewers} viewers of one channel: {len(pids)} ffmpeg process(es), "
+              f"ready after {max(startup):.2f}s")
+
+        # More channels than slots plus queue
+        outcomes = await asyncio.gather(
+            *(watch(supervisor, c) for c in range(1, args.channels + 1)),
+            return_exceptions=True,
+        )
+        ready = [o[0] for o in outcomes if isinstance(o, tuple)]
+        refused = sum(isinstance(o, CapacityError) for o in outcomes)
+        failed = [
+            o for o in outcomes if isinstance(o, Exception) and not isinstance(o, CapacityError)
+        ]
+        print(f"{args.channels} more channels with {args.max_concurrent} slots, "
+              f"queue {args.queue_size}: {len(ready)} started, {refused} refused")
+        for error in failed:
+            print(f"  failed: {error}")
+        if ready:
+            print(f"time to first playlist: median {statistics.median(ready):.2f}s, "
+                  f"max {max(ready):.2f}s")
+        print(f"running after start: {supervisor.stats()['transcoding']}")
+
+        # Nobody touches the sessions any more
+        started = time.perf_counter()
+        while supervisor.sessions:
+            await asyncio.sleep(0.5)
+            if time.perf_counter() - started > args.idle_timeout * 4 + args.queue_timeout + 30:
+                print("sessions still running after the idle timeout")
+                break
+        print(f"all processes stopped {time.perf_counter() - started:.1f}s after the last request "
+              f"(idle timeout {args.idle_timeout:.0f}s)")
+    finally:
+        await supervisor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=4)
+    parser.add_argument('--viewers', type=int, default=20)
+    parser.add_argument('--max-concurrent', type=int, default=2)
+    parser.add_argument('--queue-size', type=int, default=1)
+    parser.add_argument('--queue-timeout', type=float, default=30.0)
+    parser.add_argument('--idle-timeout', type=float, default=5.0)
+    parser.add_argument('--ffmpeg-path', default=settings.ffmpeg_path)
+    args = parser.parse_args()
+
+    settings.transcode_allow_test_pattern = True
+    settings.ffmpeg_path = args.ffmpeg_path
+    settings.hls_segment_duration = 2
+    output_dir = tempfile.mkdtemp(prefix='hls-bench-')
+    try:
+        asyncio.run(run(args, output_dir))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
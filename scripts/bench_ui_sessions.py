@@ -0,0 +1,207 @@
+"""Benchmark: UI session memory, with channel rows per session and in the shared catalogue
+
+Simulates ``--sessions`` viewers of the Reflex app against a stubbed
+backend of ``--channels`` channels. Each opens the channel list, scrolls
+to a random place in it and tunes in to a channel there. Two layouts are
+compared:
+
+  before   every session holds its own copy of the rows in its window,
+           of the current channel and of its guide, as the state did
+           before the shared catalogue
+  after    LadybugTVState: sessions hold channel ids, and the rows and
+           guides live once per process in ladybug_tv.utils.catalogue
+
+Reported per 1,000 sessions: Python memory retained by the sessions
+(tracemalloc) and the pickled state that StateManagerRedis would store.
+The shared catalogue is filled, and its memory reported, beforehand.
+Handlers run without Reflex's per-session lock, which needs a running
+app. No backend or network access is needed.
+
+Usage: python scripts/bench_ui_sessions.py [--sessions 1000] [--channels 5000]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import pickle
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import reflex as rx  # noqa: E402
+
+from ladybug_tv import ladybug_tv as ui  # noqa: E402
+from ladybug_tv.utils import catalogue as shared  # noqa: E402
+from ladybug_tv.utils.api_client import async_api_client  # noqa: E402
+from ladybug_tv.utils.constants import (  # noqa: E402
+    CHANNEL_LIST_FIELDS,
+    CHANNEL_PAGE_SIZE,
+    CHANNEL_ROW_HEIGHT_PX,
+)
+
+CATEGORIES = ['News', 'Sports', 'Movies', 'Kids', 'Music', 'Documentary', 'Entertainment']
+
+
+def backend(channels: int) -> httpx.MockTransport:
+    """The channel list, search and stream lookups of the API, with an ETag per page"""
+    rows = [
+        {
+            'id': f'ch{n:05d}', 'name': f'{CATEGORIES[n % 7]} Channel {n:05d} HD',
+            'category': CATEGORIES[n % 7], 'logo': f'https://logos.example.com/channels/ch{n:05d}.png',
+        }
+        for n in range(channels)
+    ]
+    guide = {
+        'current': {
+            'title': 'The Evening Programme', 'description': 'A programme about things. ' * 4,
+            'start_time': '2026-10-18T19:00:00', 'end_time': '2099-01-01T00:00:00',
+        },
+        'upcoming': [
+            {
+                'title': f'Programme {n}', 'description': 'Another programme about things. ' * 4,
+                'start_time': f'2026-10-18T{20 + n}:00:00',
+                'end_time': f'2026-10-18T{21 + n}:00:00',
+            }
+            for n in range(3)
+        ],
+    }
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if request.url.path == '/api/v1/channels/':
+            start, limit = int(params.get('cursor', 0)), int(params['limit'])
+            etag = f'"v1-{start:016x}"'
+            if request.headers.get('if-none-match') == etag:
+                return httpx.Response(304, headers={'etag': etag})
+            end = start + limit
+            return httpx.Response(200, headers={'etag': etag}, json={
+                'items': rows[start:end], 'next_cursor': str(end) if end < channels else None,
+            })
+        if request.url.path.startswith('/api/v1/stream/'):
+            return httpx.Response(
+                200, json={'stream_url': 'http://relay/hls/x/master.m3u8', 'epg': guide}
+            )
+        return httpx.Response(404)
+
+    return httpx.MockTransport(handle)
+
+
+class PerSessionRowsState(rx.State):
+    """The state's channel and guide data as laid out before the shared catalogue"""
+
+    current_stream_url: str = ''
+    current_channel: dict = {}
+    channel_window: list[dict] = []
+    window_first_page: int = 0
+    current_program: dict = {}
+    upcoming_programs: list[dict] = []
+    _page_keys: list = [None]
+    _pages: dict[int, list[dict]] = {}
+
+
+async def simulate_before(state: PerSessionRowsState, position: list, pick: random.Random):
+    """What the previous handlers left in a session: rows and guide parsed from its own responses"""
+    first, last = ui.pages_in_view(position)
+    for number in range(first, last + 1):
+        page = await async_api_client.get_channels(
+            cursor=str(number * CHANNEL_PAGE_SIZE) if number else None,
+            limit=CHANNEL_PAGE_SIZE, fields=CHANNEL_LIST_FIELDS,
+        )
+        state._pages[number] = page['items']
+    # Keys of every page up to the window, as the handlers walk the list in order
+    state._page_keys = [None] + [str(n * CHANNEL_PAGE_SIZE) for n in range(1, last + 2)]
+    state.window_first_page = first
+    state.channel_window = [row for number in sorted(state._pages) for row in state._pages[number]]
+    channel = pick.choice(state.channel_window)
+    stream = await async_api_client.get_stream_url(channel['id'], include_epg=True)
+    state.current_stream_url = stream['stream_url']
+    state.current_channel = channel
+    state.current_program = stream['epg']['current']
+    state.upcoming_programs = stream['epg']['upcoming']
+
+
+async def simulate_after(state: ui.LadybugTVState, position: list, pick: random.Random):
+    """The current handlers, then the views a delta to the browser reads"""
+    handlers = ui.LadybugTVState.event_handlers
+    await handlers['load_channels'].fn(state)
+    await handlers['channel_list_scrolled'].fn(state, position)
+    await handlers['play_channel'].fn(state, pick.choice(state.channel_window)['id'])
+    state.channel_window, state.current_channel, state.current_program, state.upcoming_programs
+
+
+async def retained(coroutine) -> tuple[int, object]:
+    """Bytes still allocated after ``coroutine`` has run, and its result"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = await coroutine
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before, result
+    finally:
+        tracemalloc.stop()
+
+
+async def load_catalogue():
+    """Every page of the list into the shared catalogue, as sessions would bring them in"""
+    key = None
+    while True:
+        _, key = await shared.catalogue.page('', key)
+        if key is None:
+            return
+
+
+async def measure(label: str, state_cls, simulate, args) -> int:
+    pick = random.Random(args.seed)
+    # The same scroll positions for both layouts
+    positions = [
+        [pick.randrange(args.channels - 20) * CHANNEL_ROW_HEIGHT_PX, 800, 0]
+        for _ in range(args.sessions)
+    ]
+
+    async def open_sessions():
+        sessions = []
+        for position in positions:
+            state = state_cls(_reflex_internal_init=True)
+            await simulate(state, position, pick)
+            sessions.append(state)
+        return sessions
+
+    size, sessions = await retained(open_sessions())
+    pickled = sum(len(pickle.dumps(state)) for state in sessions)
+    per_1000 = 1000 / args.sessions
+    print(f"{label:>7}: {size * per_1000 / 2**20:6.2f}MB in memory, "
+          f"{pickled * per_1000 / 2**20:6.2f}MB pickled, per 1,000 sessions")
+    return size
+
+
+async def run(args):
+    async_api_client._client = httpx.AsyncClient(
+        base_url='http://api', transport=backend(args.channels)
+    )
+    # Background handlers lock their session with ``async with self``
+    ui.LadybugTVState.__aenter__ = lambda self: asyncio.sleep(0, self)
+    ui.LadybugTVState.__aexit__ = lambda self, *exc: asyncio.sleep(0)
+    print(f"{args.sessions} sessions, {args.channels} channels, each on its own screenful")
+    before = await measure('before', PerSessionRowsState, simulate_before, args)
+    size, _ = await retained(load_catalogue())
+    print(f"{'shared':>7}: {size / 2**20:6.2f}MB for the catalogue "
+          f"of {args.channels} channels, once per process")
+    after = await measure('after', ui.LadybugTVState, simulate_after, args)
+    print(f"memory per session {before / args.sessions / 1024:.1f}KB "
+          f"-> {after / args.sessions / 1024:.1f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--channels', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Benchmark: channel zap latency, before and after single-call lookups and warm channels
+
+Fills a scratch SQLite database with test-pattern channels and a guide
+for each, then zaps up the channel list one channel at a time, staying
+``--dwell`` seconds on each, against the backend API and the stream relay
+running in-process. A zap is timed from the request for the channel to
+the arrival of the first media segment, which is when a player can
+start. While on a channel the benchmark polls it like a player, and a
+channel it has left stops after ``--idle-timeout`` seconds. Two flows
+are compared:
+
+  before   GET /api/v1/stream/{id}, then GET /api/v1/epg/{id}, then the
+           relay playlist, which starts the channel's ffmpeg cold
+  after    GET /api/v1/stream/{id}?include=epg, then the relay playlist,
+           with the relay keeping the neighbours of the watched channel
+           (and the most-watched channels) running warm
+
+Needs ffmpeg with the lavfi filters; no network access is needed.
+
+Usage: python scripts/bench_zap.py [--channels 10] [--dwell 5] [--segment-seconds 2]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The backend and the relay open their database engines on import
+WORKDIR = tempfile.mkdtemp(prefix='zap-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+os.environ.pop('ASYNC_DATABASE_URL', None)
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from backend.config import settings  # noqa: E402
+from backend.database import Base, engine  # noqa: E402
+from backend.main import app as api_app  # noqa: E402
+from backend.models.channel import Channel  # noqa: E402
+from backend.models.epg import EPGProgram  # noqa: E402
+from backend.services.response_cache import PROBES, invalidate_catalogue, response_cache  # noqa: E402
+from stream_relay import server as relay  # noqa: E402
+from stream_relay.hls_generator import parse_media_playlist  # noqa: E402
+from stream_relay.supervisor import TranscodeSupervisor  # noqa: E402
+from stream_relay.transcoder import Transcoder  # noqa: E402
+from stream_relay.warmup import ChannelWarmer  # noqa: E402
+
+
+def populate(channels: int):
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    with engine.begin() as conn:
+        conn.execute(insert(Channel), [
+            {
+                'id': f'zap{n:02d}', 'name': f'Channel {n:02d}', 'is_active': True,
+                'stream_url': f'lavfi:testsrc2=size=320x240:rate=25[out0];'
+                              f'sine=frequency={220 + 20 * n}[out1]',
+            }
+            for n in range(channels)
+        ])
+        conn.execute(insert(EPGProgram), [
+            {
+                'channel_id': f'zap{n:02d}', 'title': f'Programme {hour}',
+                'start_time': now + timedelta(hours=hour),
+                'end_time': now + timedelta(hours=hour + 1),
+            }
+            for n in range(channels) for hour in range(-1, 6)
+        ])
+
+
+async def zap(api, stream, channel_id: str, single_call: bool):
+    """Seconds to the channel's first segment, and the share of it spent on the API"""
+    started = time.perf_counter()
+    if single_call:
+        response = await api.get(f'/api/v1/stream/{channel_id}', params={'include': 'epg'})
+        response.raise_for_status()
+        assert 'epg' in response.json()
+    else:
+        response = await api.get(f'/api/v1/stream/{channel_id}')
+        response.raise_for_status()
+        (await api.get(f'/api/v1/epg/{channel_id}')).raise_for_status()
+    looked_up = time.perf_counter()
+    playlist = await stream.get(f'/hls/{channel_id}/playlist.m3u8')
+    playlist.raise_for_status()
+    first = parse_media_playlist(playlist.text)[0]
+    (await stream.get(f'/hls/{channel_id}/{first.uri}')).raise_for_status()
+    finished = time.perf_counter()
+    return finished - started, looked_up - started
+
+
+async def watch(stream, channel_id: str, seconds: float):
+    """Poll the playlist and fetch the newest segment, as a player does"""
+    until = time.monotonic() + seconds
+    while time.monotonic() < until:
+        await asyncio.sleep(min(settings.hls_segment_duration, max(0.0, until - time.monotonic())))
+        playlist = await stream.get(f'/hls/{channel_id}/playlist.m3u8')
+        entries = parse_media_playlist(playlist.text) if playlist.status_code == 200 else []
+        if entries:
+            await stream.get(f'/hls/{channel_id}/{entries[-1].uri}')
+
+
+async def run_flow(args, api, stream, label: str, after: bool):
+    supervisor, warmer = relay.supervisor, relay.warmer
+    response_cache.invalidate(PROBES)
+    invalidate_catalogue()
+    supervisor.start()
+    if after:
+        warmer.top, warmer.adjacent = args.top, args.adjacent
+        warmer.scores.clear()
+        warmer.start()
+    try:
+        totals, lookups = [], []
+        for n in range(args.channels):
+            channel_id = f'zap{n:02d}'
+            total, lookup = await zap(api, stream, channel_id, single_call=after)
+            totals.append(total)
+            lookups.append(lookup)
+            await watch(stream, channel_id, args.dwell)
+    finally:
+        await warmer.close()
+        await supervisor.close()
+    # The first zap starts from nothing either way
+    zaps, api_time = totals[1:], lookups[1:]
+    print(f"{label:>7}: median {statistics.median(zaps) * 1000:7.0f}ms  "
+          f"max {max(zaps) * 1000:7.0f}ms  (API {statistics.median(api_time) * 1000:5.1f}ms, "
+          f"first zap {totals[0] * 1000:.0f}ms)")
+    return statistics.median(zaps)
+
+
+async def run(args):
+    api_transport = httpx.ASGITransport(app=api_app)
+    relay_transport = httpx.ASGITransport(app=relay.app)
+    async with httpx.AsyncClient(transport=api_transport, base_url='http://api') as api, \
+            httpx.AsyncClient(transport=relay_transport, base_url='http://relay',
+                              timeout=settings.transcode_start_timeout + 5) as stream:
+        # Build the guide index once; it is shared by both flows
+        (await api.get('/api/v1/epg/zap00')).raise_for_status()
+        print(f"{args.channels} channels, {args.segment_seconds}s segments, "
+              f"{args.dwell:.0f}s per channel, zapping up the list")
+        before = await run_flow(args, api, stream, 'before', after=False)
+        after = await run_flow(args, api, stream, 'after', after=True)
+    print(f"median zap {before * 1000:.0f}ms -> {after * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=10)
+    parser.add_argument('--dwell', type=float, default=5.0)
+    parser.add_argument('--segment-seconds', type=int, default=2)
+    parser.add_argument('--top', type=int, default=settings.relay_warm_top)
+    parser.add_argument('--adjacent', type=int, default=settings.relay_warm_adjacent)
+    parser.add_argument('--idle-timeout', type=float, default=10.0)
+    parser.add_argument('--slots', type=int, default=8, help="concurrent transcodes")
+    parser.add_argument('--ffmpeg-path', default=settings.ffmpeg_path)
+    parser.add_argument('--ffprobe-path', default=settings.ffprobe_path)
+    args = parser.parse_args()
+
+    settings.hls_segment_duration = args.segment_seconds
+    settings.transcode_allow_test_pattern = True
+    # The relay's routes look these up at request time
+    relay.supervisor = TranscodeSupervisor(
+        Transcoder(args.ffmpeg_path, args.ffprobe_path),
+        max_concurrent=args.slots,
+        idle_timeout=args.idle_timeout,
+        output_dir=os.path.join(WORKDIR, 'hls'),
+    )
+    relay.warmer = ChannelWarmer(relay.supervisor, relay._lookup_stream_url, relay._neighbours)
+    try:
+        populate(args.channels)
+        asyncio.run(run(args))
+    finally:
+        engine.dispose()
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
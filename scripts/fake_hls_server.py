@@ -0,0 +1,146 @@
+"""A local fake HLS origin for testing the stream health checker
+
+Serves any number of synthetic channels, each behaving one way:
+
+  live     media playlist whose segments answer (with Range support)
+  master   master playlist pointing at a live media playlist
+  raw      continuous MPEG-TS stream instead of a playlist
+  dead     404 for the playlist
+  broken   playlist whose segments 404
+  empty    playlist without segments
+  slow     live, but the playlist takes --slow-seconds to answer
+
+URLs are http://HOST:PORT/<behaviour>/<n>.m3u8 (raw: /raw/<n>.ts).
+``channel_urls`` spreads a mix of them over several loopback addresses
+(127.0.0.2, 127.0.0.3, ...), which Linux routes to this one server, so
+a checker sees them as separate hosts.
+
+Usage: python scripts/fake_hls_server.py [--port 8090] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import re
+from typing import Dict, List
+
+import uvicorn
+
+PLAYLIST_TYPE = b'application/vnd.apple.mpegurl'
+TS_TYPE = b'video/mp2t'
+TS_PACKET = b'\x47' + bytes(187)
+SEGMENT = TS_PACKET * 1000
+SEGMENTS_LISTED = 5
+
+# Default share of each behaviour in channel_urls
+DEFAULT_MIX = {'live': 0.86, 'master': 0.04, 'raw': 0.02, 'dead': 0.03, 'broken': 0.02,
+               'empty': 0.01, 'slow': 0.02}
+
+_ROUTE = re.compile(r'^/(\w+)/(\d+)(?:/(\d+))?\.(m3u8|ts)$')
+
+
+def media_playlist(segment_path: str) -> bytes:
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:6', '#EXT-X-MEDIA-SEQUENCE:100']
+    for sequence in range(100, 100 + SEGMENTS_LISTED):
+        lines += ['#EXTINF:6.000,', f'{segment_path}/{sequence}.ts']
+    return ('\n'.join(lines) + '\n').encode('ascii')
+
+
+def create_app(latency: float = 0.0, slow_seconds: float = 15.0):
+    """
+    The origin as a bare ASGI app: a web framework's per-request overhead
+    would make the fake server, not the checker, the bottleneck.
+    """
+
+    async def send_response(send, status: int, body: bytes, content_type: bytes = b'text/plain',
+                            headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type),
+                        (b'content-length', str(len(body)).encode()), *headers],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def segment(scope, send):
+        requested = dict(scope['headers']).get(b'range', b'').decode()
+        if not requested.startswith('bytes='):
+            return await send_response(send, 200, SEGMENT, TS_TYPE)
+        first, _, last = requested[6:].partition('-')
+        start = int(first or 0)
+        end = min(int(last) if last else len(SEGMENT) - 1, len(SEGMENT) - 1)
+        await send_response(
+            send, 206, SEGMENT[start:end + 1], TS_TYPE,
+            [(b'content-range', f'bytes {start}-{end}/{len(SEGMENT)}'.encode())],
+        )
+
+    async def raw(send):
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', TS_TYPE)]})
+        for _ in range(100):
+            await send({'type': 'http.response.body', 'body': SEGMENT[:188 * 100],
+                        'more_body': True})
+            await asyncio.sleep(0.1)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def app(scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        if latency:
+            await asyncio.sleep(latency)
+        match = _ROUTE.match(scope['path'])
+        if match is None:
+            return await send_response(send, 404, b'Not found')
+        kind, n, sequence, extension = match.groups()
+        if kind == 'segments' and sequence:
+            return await segment(scope, send)
+        if kind == 'raw' and extension == 'ts':
+            return await raw(send)
+        if extension != 'm3u8' or sequence:
+            return await send_response(send, 404, b'Not found')
+        if kind == 'live':
+            body = media_playlist(f'/segments/{n}')
+        elif kind == 'master':
+            body = (b'#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=2000000,RESOLUTION=1280x720\n'
+                    + f'../live/{n}.m3u8\n'.encode('ascii'))
+        elif kind == 'broken':
+            body = media_playlist(f'/missing/{n}')
+        elif kind == 'empty':
+            body = b'#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:6\n'
+        elif kind == 'slow':
+            await asyncio.sleep(slow_seconds)
+            body = media_playlist(f'/segments/{n}')
+        else:
+            return await send_response(send, 404, b'Not found')
+        await send_response(send, 200, body, PLAYLIST_TYPE)
+
+    return app
+
+
+def channel_urls(port: int, count: int, hosts: int = 50, mix: Dict[str, float] = None,
+                 seed: int = 0) -> List[str]:
+    """``count`` channel URLs with behaviours drawn from ``mix``, over ``hosts`` loopback hosts"""
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    addresses = itertools.cycle(f'127.0.{2 + i // 250}.{2 + i % 250}' for i in range(hosts))
+    urls = []
+    for n, (kind, address) in enumerate(zip(kinds, addresses)):
+        suffix = 'ts' if kind == 'raw' else 'm3u8'
+        urls.append(f'http://{address}:{port}/{kind}/{n}.{suffix}')
+    return urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--slow-seconds', type=float, default=15.0)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms / 1000, args.slow_seconds)
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning', backlog=4096)
+
+
+if __name__ == '__main__':
+    main()
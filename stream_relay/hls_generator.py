@@ -0,0 +1,210 @@
+"""In-memory HLS segment buffers and live playlist generation"""
+import math
+import re
+from collections import deque
+from typing import Deque, Iterable, List, NamedTuple, Optional, Tuple
+
+_EXTINF_RE = re.compile(r'^#EXTINF:([\d.]+)')
+_MEDIA_SEQUENCE_RE = re.compile(r'^#EXT-X-MEDIA-SEQUENCE:(\d+)')
+
+
+class PlaylistEntry(NamedTuple):
+    sequence: int
+    uri: str
+    duration: float
+    discontinuity: bool
+
+
+def parse_media_playlist(text: str) -> List[PlaylistEntry]:
+    """Segments of a media playlist (as written by ffmpeg), with absolute sequence numbers"""
+    entries = []
+    sequence = 0
+    duration = None
+    discontinuity = False
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = _MEDIA_SEQUENCE_RE.match(line)
+        if match:
+            sequence = int(match.group(1))
+            continue
+        match = _EXTINF_RE.match(line)
+        if match:
+            duration = float(match.group(1))
+        elif line == '#EXT-X-DISCONTINUITY':
+            discontinuity = True
+        elif not line.startswith('#') and duration is not None:
+            entries.append(PlaylistEntry(sequence, line, duration, discontinuity))
+            sequence += 1
+            duration = None
+            discontinuity = False
+    return entries
+
+
+class Variant(NamedTuple):
+    """One rendition as listed in a master playlist"""
+    uri: str
+    bandwidth: int
+    resolution: Optional[Tuple[int, int]] = None
+
+
+def render_master_playlist(variants: Iterable[Variant]) -> bytes:
+    """Master playlist listing each rendition's media playlist, best first"""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-INDEPENDENT-SEGMENTS']
+    for variant in variants:
+        attributes = f'BANDWIDTH={variant.bandwidth}'
+        if variant.resolution:
+            attributes += f',RESOLUTION={variant.resolution[0]}x{variant.resolution[1]}'
+        lines.append(f'#EXT-X-STREAM-INF:{attributes}')
+        lines.append(variant.uri)
+    return ('\n'.join(lines) + '\n').encode('ascii')
+
+
+class Segment(NamedTuple):
+    sequence: int
+    duration: float
+    data: bytes
+    discontinuity: bool
+
+
+class SegmentBuffer:
+    """
+    The most recent segments of one channel, and its live playlist.
+
+    The playlist lists the newest ``window`` segments; ``retain`` older
+    ones are kept so a viewer a little behind can still fetch them. The
+    playlist is rendered once per new segment, so serving it costs
+    nothing. Segment URIs carry the buffer's ``epoch``: a channel that is
+    stopped and started again never reuses a URI for different content,
+    which keeps segments safe to cache as immutable.
+    """
+
+    def __init__(self, store: "SegmentStore", epoch: str, window: int, retain: int):
+        self.store = store
+        self.epoch = epoch
+        self.window = window
+        self.capacity = window + retain
+        self.segments: Deque[Segment] = deque()
+        self.next_sequence = 0
+        # Discontinuities that have left the buffer, for EXT-X-DISCONTINUITY-SEQUENCE
+        self.discontinuity_sequence = 0
+        self.playlist = b''
+        self.closed = False
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(segment.data) for segment in self.segments)
+
+    def segment_uri(self, sequence: int) -> str:
+        return f'{self.epoch}-{sequence}.ts'
+
+    def add(self, data: bytes, duration: float, discontinuity: bool = False) -> Segment:
+        # Nothing precedes the first segment to be discontinuous with
+        discontinuity = discontinuity and self.next_sequence > 0
+        segment = Segment(self.next_sequence, duration, data, discontinuity)
+        self.next_sequence += 1
+        self.segments.append(segment)
+        while len(self.segments) > self.capacity:
+            self.evict_oldest()
+        self.store.charge(self, segment)
+        self._render()
+        return segment
+
+    def get(self, uri: str) -> Optional[Segment]:
+        """The segment for a URI from this buffer's playlist, or None once evicted"""
+        epoch, _, rest = uri.partition('-')
+        if epoch != self.epoch or not rest.endswith('.ts') or not self.segments:
+            return None
+        try:
+            sequence = int(rest[:-3])
+        except ValueError:
+            return None
+        # Sequence numbers are contiguous, so this is an index lookup
+        index = sequence - self.segments[0].sequence
+        return self.segments[index] if 0 <= index < len(self.segments) else None
+
+    def evict_oldest(self) -> Optional[Segment]:
+        if not self.segments:
+            return None
+        segment = self.segments.popleft()
+        if segment.discontinuity:
+            self.discontinuity_sequence += 1
+        self.store.release(segment)
+        return segment
+
+    def close(self):
+        """Drop every segment; the buffer's channel has stopped"""
+        self.closed = True
+        while self.segments:
+            self.evict_oldest()
+        self.playlist = b''
+
+    def _render(self):
+        listed = list(self.segments)[-self.window:]
+        skipped = len(self.segments) - len(listed)
+        discontinuities = self.discontinuity_sequence + sum(
+            segment.discontinuity for segment in list(self.segments)[:skipped]
+        )
+        target = max(math.ceil(segment.duration) for segment in listed)
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:3',
+            f'#EXT-X-TARGETDURATION:{target}',
+            f'#EXT-X-MEDIA-SEQUENCE:{listed[0].sequence}',
+            f'#EXT-X-DISCONTINUITY-SEQUENCE:{discontinuities}',
+            '#EXT-X-INDEPENDENT-SEGMENTS',
+        ]
+        for segment in listed:
+            if segment.discontinuity:
+                lines.append('#EXT-X-DISCONTINUITY')
+            lines.append(f'#EXTINF:{segment.duration:.3f},')
+            lines.append(self.segment_uri(segment.sequence))
+        self.playlist = ('\n'.join(lines) + '\n').encode('ascii')
+
+
+class SegmentStore:
+    """
+    Byte budget shared by every channel's buffer.
+
+    When a new segment takes the total over ``max_bytes``, the oldest
+    segments across all channels are dropped first. Those are normally
+    ones that have already left their playlist.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        # Arrival order across channels, for eviction; entries for segments
+        # a buffer has already dropped are skipped when reached
+        self._arrivals: Deque[Tuple[SegmentBuffer, Segment]] = deque()
+
+    def buffer(self, epoch: str, window: int, retain: int) -> SegmentBuffer:
+        return SegmentBuffer(self, epoch, window, retain)
+
+    def charge(self, buffer: SegmentBuffer, segment: Segment):
+        self.nbytes += len(segment.data)
+        self._arrivals.append((buffer, segment))
+        while self.nbytes > self.max_bytes and self._arrivals:
+            oldest_buffer, oldest = self._arrivals.popleft()
+            if oldest is segment:
+                # A single segment over the whole budget is still served
+                self._arrivals.appendleft((oldest_buffer, oldest))
+                break
+            if oldest_buffer.segments and oldest_buffer.segments[0] is oldest:
+                oldest_buffer.evict_oldest()
+                if oldest_buffer.segments:
+                    oldest_buffer._render()
+        # Entries for segments already dropped by their buffer
+        while self._arrivals and self._stale(*self._arrivals[0]):
+            self._arrivals.popleft()
+
+    def release(self, segment: Segment):
+        self.nbytes -= len(segment.data)
+
+    @staticmethod
+    def _stale(buffer: SegmentBuffer, segment: Segment) -> bool:
+        return not buffer.segments or buffer.segments[0].sequence > segment.sequence
@@ -1,14 +1,145 @@
 """Stream relay server"""
-from fastapi import FastAPI
+from typing import List, Optional
+
 import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
+from sqlalchemy import and_, or_, select
+
+from backend.config import settings
+from backend.database import AsyncSessionLocal
+from backend.models.channel import Channel
+from stream_relay.supervisor import CapacityError, supervisor
+from stream_relay.transcoder import TranscodeError
+from stream_relay.warmup import ChannelWarmer
 
 app = FastAPI(title="Stream Relay Service")
 
+# A live playlist changes every segment; half a target duration is the
+# longest a cache may hold it without players stalling
+PLAYLIST_CACHE_CONTROL = f"public, max-age={max(1, settings.hls_segment_duration // 2)}"
+# Segment URIs are never reused for other content (see SegmentBuffer)
+SEGMENT_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+async def _lookup_stream_url(channel_id: str) -> Optional[str]:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(Channel.stream_url).where(Channel.id == channel_id)
+        )).scalar_one_or_none()
+
+async def _stream_url(channel_id: str) -> str:
+    stream_url = await _lookup_stream_url(channel_id)
+    if stream_url is None:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    return stream_url
+
+async def _neighbours(channel_id: str, count: int) -> List[str]:
+    """The ``count`` active channels either side of a channel, in channel list order"""
+    async with AsyncSessionLocal() as db:
+        name = (await db.execute(
+            select(Channel.name).where(Channel.id == channel_id)
+        )).scalar_one_or_none()
+        if name is None:
+            return []
+        active = select(Channel.id).where(Channel.is_active.is_(True))
+        after = active.where(or_(
+            Channel.name > name, and_(Channel.name == name, Channel.id > channel_id)
+        )).order_by(Channel.name, Channel.id).limit(count)
+        before = active.where(or_(
+            Channel.name < name, and_(Channel.name == name, Channel.id < channel_id)
+        )).order_by(Channel.name.desc(), Channel.id.desc()).limit(count)
+        return [
+            *(await db.execute(before)).scalars(),
+            *(await db.execute(after)).scalars(),
+        ]
+
+warmer = ChannelWarmer(supervisor, _lookup_stream_url, _neighbours)
+
+@app.on_event("startup")
+async def startup():
+    supervisor.start()
+    warmer.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await warmer.close()
+    await supervisor.close()
+
+async def _acquire(channel_id: str):
+    try:
+        return await supervisor.acquire(channel_id, lambda: _stream_url(channel_id))
+    except CapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    except TranscodeError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+def _playlist_response(playlist: bytes) -> Response:
+    if not playlist:
+        # Torn down between the lookup and the read
+        raise HTTPException(
+            status_code=503, detail="Stream restarting", headers={"Retry-After": "1"}
+        )
+    return Response(
+        playlist,
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": PLAYLIST_CACHE_CONTROL},
+    )
+
+def _segment_response(segments, segment: str) -> Response:
+    """
+    One media segment from memory. The stored bytes object is handed to
+    the server as the body: no file read and no copy per request.
+    """
+    found = segments.get(segment) if segments is not None else None
+    if found is None:
+        raise HTTPException(status_code=404, detail="Segment not found")
+    return Response(
+        found.data,
+        media_type="video/mp2t",
+        headers={"Cache-Control": SEGMENT_CACHE_CONTROL},
+    )
+
 @app.get("/hls/{channel_id}/playlist.m3u8")
 async def get_playlist(channel_id: str):
-    """Generate HLS playlist"""
-    # TODO: Implement HLS generation
-    return {"message": "HLS playlist"}
+    """
+    Live HLS playlist for a channel: a master playlist over the bitrate
+    ladder's renditions when the channel is transcoded with one, else the
+    channel's media playlist.
+
+    The first request for a channel starts its transcode and returns once
+    the first segment is ready; every viewer after that shares the same
+    process, which is stopped when nobody has asked for the channel for
+    ``transcode_idle_timeout`` seconds. Channels next to a watched one in
+    the channel list, and the most-watched ones, are kept running warm
+    (see ChannelWarmer), so switching to them answers at once.
+    """
+    session = await _acquire(channel_id)
+    return _playlist_response(session.playlist)
+
+@app.get("/hls/{channel_id}/{rendition}/playlist.m3u8")
+async def get_rendition_playlist(channel_id: str, rendition: str):
+    """Media playlist of one rendition from a channel's master playlist"""
+    session = await _acquire(channel_id)
+    segments = session.segments(rendition)
+    if segments is None:
+        raise HTTPException(status_code=404, detail="Rendition not found")
+    return _playlist_response(segments.playlist)
+
+@app.get("/hls/{channel_id}/{segment}")
+async def get_segment(channel_id: str, segment: str):
+    """One media segment of a channel without a ladder"""
+    session = supervisor.get(channel_id)
+    return _segment_response(session.segments() if session else None, segment)
+
+@app.get("/hls/{channel_id}/{rendition}/{segment}")
+async def get_rendition_segment(channel_id: str, rendition: str, segment: str):
+    """One media segment of a rendition"""
+    session = supervisor.get(channel_id)
+    return _segment_response(session.segments(rendition) if session else None, segment)
+
+@app.get("/stats")
+async def stats():
+    return supervisor.stats()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8002)
@@ -0,0 +1,522 @@
+"""Per-channel FFmpeg process supervision"""
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import shutil
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from backend.config import settings
+from stream_relay.hls_generator import (
+    SegmentBuffer,
+    SegmentStore,
+    Variant,
+    parse_media_playlist,
+    render_master_playlist,
+)
+from stream_relay.transcoder import PLAYLIST_NAME, TRANSCODE, Plan, TranscodeError, Transcoder
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of ffmpeg's playlist for completed segments
+_SEGMENT_POLL = 0.2
+# Grace period between SIGTERM and SIGKILL
+_STOP_TIMEOUT = 5.0
+# Upper bound on the delay before restarting a crashed process
+_MAX_BACKOFF = 10.0
+
+
+class CapacityError(TranscodeError):
+    """Every transcode slot is taken and the wait queue is full or timed out"""
+
+
+class RenditionOutput:
+    """ffmpeg's scratch playlist for one rendition, and the buffer viewers are served from"""
+
+    def __init__(self, name: str, scratch_dir: str, segments: SegmentBuffer):
+        self.name = name
+        self.scratch_dir = scratch_dir
+        self.segments = segments
+        # Last ffmpeg media sequence number moved into ``segments``
+        self.ingested = -1
+        self.discontinuity = False
+        # Playlist mtime at the last ingest
+        self.modified: Optional[int] = None
+
+    @property
+    def playlist_path(self) -> str:
+        return os.path.join(self.scratch_dir, PLAYLIST_NAME)
+
+
+class TranscodeSession:
+    """One channel's FFmpeg process and segment buffers, shared by all of its viewers"""
+
+    def __init__(self, channel_id: str, input_url: str, output_dir: str, epoch: str):
+        self.channel_id = channel_id
+        self.input_url = input_url
+        self.output_dir = output_dir
+        # Shared by the URIs of every segment this session serves
+        self.epoch = epoch
+        self.plan: Optional[Plan] = None
+        # One output named '' without a ladder, else one per rendition, best first
+        self.outputs: Dict[str, RenditionOutput] = {}
+        self.master = b''
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.last_access = time.monotonic()
+        self.restarts = 0
+        self.stopping = False
+        self.stderr = deque(maxlen=20)
+        self.task: Optional[asyncio.Task] = None
+        self.slot: Optional[asyncio.Semaphore] = None
+        # Running ahead of viewers; gives its slot up to a channel being watched
+        self.warm = False
+
+    @property
+    def mode(self) -> Optional[str]:
+        return self.plan.mode if self.plan else None
+
+    @property
+    def playlist(self) -> bytes:
+        """What viewers get first: the master playlist of a ladder, else the media playlist"""
+        if self.master:
+            return self.master
+        output = self.outputs.get('')
+        return output.segments.playlist if output else b''
+
+    def segments(self, rendition: str = '') -> Optional[SegmentBuffer]:
+        """A rendition's buffer ('' without a ladder), or None"""
+        output = self.outputs.get(rendition)
+        return output.segments if output else None
+
+    def close_outputs(self):
+        for output in self.outputs.values():
+            output.segments.close()
+
+    @property
+    def idle(self) -> float:
+        """Seconds since a viewer last asked for this channel"""
+        return time.monotonic() - self.last_access
+
+    def touch(self):
+        """A viewer asked for the channel"""
+        self.last_access = time.monotonic()
+        self.warm = False
+
+    def fail(self, error: Exception):
+        if not self.ready.done():
+            self.ready.set_exception(error)
+            # Retrieve it here so a failure nobody awaited is not logged as lost
+            self.ready.exception()
+
+
+class TranscodeSupervisor:
+    """
+    Runs one FFmpeg process per watched channel and stops it once idle.
+
+    The first viewer of a channel starts its process; later viewers share
+    it and keep it alive by touching the session on every playlist or
+    segment request.
+
+    Each channel is probed first. Full transcodes are capped at
+    ``max_concurrent`` processes (one per core by default). Remuxes and
+    audio-only transcodes cost a fraction of that, so they have their own
+    larger cap, ``max_remux``. When a channel's pool is full, up to
+    ``queue_size`` channels wait up to ``queue_timeout`` seconds for a
+    slot; beyond that, new channels are refused with ``CapacityError``.
+
+    With a bitrate ladder configured, a full transcode encodes every rung
+    in the one process and the session serves a master playlist over one
+    media playlist per rendition.
+
+    Completed segments are moved from ffmpeg's scratch directory into each
+    rendition's in-memory ``SegmentBuffer``, which viewers are served from.
+    Every buffer draws on one ``SegmentStore`` byte budget.
+
+    A process that exits on its own after producing a playlist is
+    restarted with backoff, up to ``transcode_max_restarts`` times. A copy
+    mode that fails before any output falls back to a full transcode.
+
+    Channels can also be started ``warm``, before anyone watches them, so
+    switching to them needs no startup. A warm channel only takes a free
+    slot and is stopped when a watched channel needs its slot. Idle
+    channels in ``keep_warm`` turn warm instead of being stopped.
+    ``on_tune_in`` is called with the channel id whenever a viewer
+    starts a channel or takes over a warm one.
+    """
+
+    def __init__(
+        self,
+        transcoder: Optional[Transcoder] = None,
+        max_concurrent: Optional[int] = None,
+        max_remux: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        output_dir: Optional[str] = None,
+        store: Optional[SegmentStore] = None,
+    ):
+        self.transcoder = transcoder or Transcoder()
+        cores = os.cpu_count() or 1
+        self.max_concurrent = max_concurrent or settings.transcode_max_concurrent or cores
+        self.max_remux = max_remux or settings.remux_max_concurrent or 10 * cores
+        self.queue_size = settings.transcode_queue_size if queue_size is None else queue_size
+        self.queue_timeout = queue_timeout or settings.transcode_queue_timeout
+        self.idle_timeout = idle_timeout or settings.transcode_idle_timeout
+        self.output_dir = output_dir or settings.hls_output_dir
+        self.store = store or SegmentStore(settings.hls_memory_limit_mb * 1024 * 1024)
+        self.sessions: Dict[str, TranscodeSession] = {}
+        self._transcode_slots = asyncio.Semaphore(self.max_concurrent)
+        self._remux_slots = asyncio.Semaphore(self.max_remux)
+        self._queued = 0
+        # Inputs whose copy modes failed; they are always transcoded
+        self._no_copy = set()
+        self._reaper: Optional[asyncio.Task] = None
+        self.keep_warm: Set[str] = set()
+        self.on_tune_in: Optional[Callable[[str], None]] = None
+
+    def start(self):
+        """Start the idle reaper; call from the running event loop"""
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def close(self):
+        """Stop the reaper and every process"""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        await asyncio.gather(*(self.stop(s) for s in list(self.sessions.values())))
+
+    def get(self, channel_id: str) -> Optional[TranscodeSession]:
+        """The channel's live session, touched, or None"""
+        session = self.sessions.get(channel_id)
+        if session is not None:
+            session.touch()
+        return session
+
+    async def acquire(
+        self, channel_id: str, resolve_url: Callable[[], Awaitable[str]]
+    ) -> TranscodeSession:
+        """
+        The channel's session once its playlist exists, starting a process
+        if the channel has none. ``resolve_url`` returns the input URL and is
+        only called when a process has to be started.
+        """
+        session = self.sessions.get(channel_id)
+        if session is None:
+            input_url = await resolve_url()
+            # Another viewer may have started the channel in the meantime
+            session = self.sessions.get(channel_id)
+        tuned_in = session is None or session.warm
+        if session is None:
+            session = self._start(channel_id, input_url)
+        session.touch()
+        if tuned_in and self.on_tune_in is not None:
+            self.on_tune_in(channel_id)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(session.ready), settings.transcode_start_timeout)
+        except asyncio.TimeoutError:
+            raise TranscodeError(
+                f"Channel {channel_id} did not start within {settings.transcode_start_timeout:.0f}s"
+            )
+        return session
+
+    def warm(self, channel_id: str, input_url: str) -> TranscodeSession:
+        """
+        Start a channel nobody is watching yet, without waiting for it. It
+        runs only if a slot is free once it has been probed, and never queues.
+        """
+        session = self.sessions.get(channel_id)
+        if session is None:
+            session = self._start(channel_id, input_url, warm=True)
+        return session
+
+    def _start(self, channel_id: str, input_url: str, warm: bool = False) -> TranscodeSession:
+        # Refuse unusable inputs before they take a place in the queue
+        self.transcoder.input_args(input_url)
+        digest = hashlib.sha1(channel_id.encode('utf-8')).hexdigest()[:16]
+        session = TranscodeSession(
+            channel_id, input_url, os.path.join(self.output_dir, digest), secrets.token_hex(4)
+        )
+        session.warm = warm
+        self.sessions[channel_id] = session
+        session.task = asyncio.create_task(self._run(session))
+        return session
+
+    async def stop(self, session: TranscodeSession, graceful: bool = True):
+        """
+        Terminate a session's process, giving it a grace period before
+        SIGKILL unless it is not ``graceful``.
+        """
+        session.stopping = True
+        process = session.process
+        if process is not None and process.returncode is None:
+            if graceful:
+                process.terminate()
+            else:
+                process.kill()
+            await asyncio.wait({session.task}, timeout=_STOP_TIMEOUT)
+        if session.task is not None and not session.task.done():
+            # Still queued for a slot, in restart backoff, or ignoring SIGTERM
+            session.task.cancel()
+            await asyncio.gather(session.task, return_exceptions=True)
+
+    async def _run(self, session: TranscodeSession):
+        try:
+            session.plan = await self.transcoder.plan(
+                session.input_url, allow_copy=session.input_url not in self._no_copy
+            )
+            self._prepare(session)
+            await self._take_slot(session)
+            await self._supervise(session)
+        except TranscodeError as e:
+            if session.warm and isinstance(e, CapacityError):
+                logger.debug("Not warming %s: %s", session.channel_id, e)
+            else:
+                logger.warning("Transcode for %s failed: %s", session.channel_id, e)
+            session.fail(e)
+        finally:
+            process = session.process
+            if process is not None and process.returncode is None:
+                process.kill()
+                await process.wait()
+            session.fail(TranscodeError("Stopped"))
+            self._release_slot(session)
+            self._forget(session)
+            session.close_outputs()
+            await asyncio.to_thread(shutil.rmtree, session.output_dir, True)
+            logger.info("Transcode for %s stopped", session.channel_id)
+
+    async def _take_slot(self, session: TranscodeSession):
+        """
+        Wait for a slot in the pool for the session's mode, within the queue
+        limits. A warm session only takes a free slot; a watched one stops
+        a warm session to free one.
+        """
+        slots = self._transcode_slots if session.mode == TRANSCODE else self._remux_slots
+        if session.warm and slots.locked():
+            raise CapacityError("No free slot to warm the channel in")
+        if slots.locked():
+            victim = next((
+                s for s in self.sessions.values()
+                if s.warm and s.slot is slots and not s.stopping
+            ), None)
+            if victim is not None:
+                logger.info("Stopping warm %s for %s", victim.channel_id, session.channel_id)
+                # Nobody is watching it: no need to let ffmpeg finish a segment
+                await self.stop(victim, graceful=False)
+        if slots.locked() and self._queued >= self.queue_size:
+            raise CapacityError("All transcode slots are busy and the queue is full")
+        self._queued += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise CapacityError(f"No transcode slot became free within {self.queue_timeout:.0f}s")
+        finally:
+            self._queued -= 1
+        session.slot = slots
+
+    def _release_slot(self, session: TranscodeSession):
+        if session.slot is not None:
+            session.slot.release()
+            session.slot = None
+
+    def _prepare(self, session: TranscodeSession):
+        """Fresh buffers for the renditions of the session's plan"""
+        session.close_outputs()
+        window, retain = settings.hls_playlist_size, settings.hls_segment_retain
+        renditions = session.plan.renditions
+        if not renditions:
+            buffer = self.store.buffer(session.epoch, window, retain)
+            session.outputs = {'': RenditionOutput('', session.output_dir, buffer)}
+            session.master = b''
+            return
+        session.outputs = {
+            rendition.name: RenditionOutput(
+                rendition.name,
+                os.path.join(session.output_dir, rendition.name),
+                self.store.buffer(session.epoch, window, retain),
+            )
+            for rendition in renditions
+        }
+        session.master = render_master_playlist(
+            Variant(
+                f'{rendition.name}/{PLAYLIST_NAME}',
+                rendition.bandwidth,
+                (rendition.width, rendition.height) if rendition.width else None,
+            )
+            for rendition in renditions
+        )
+
+    async def _supervise(self, session: TranscodeSession):
+        """Run, and after a crash restart, the channel's process until it is stopped"""
+        while True:
+            process = await self.transcoder.transcode_to_hls(
+                session.input_url, session.output_dir, session.plan
+            )
+            session.process = process
+            logger.info(
+                "Transcode for %s started (%s, pid %d)",
+                session.channel_id, session.mode, process.pid,
+            )
+            drain = asyncio.create_task(self._drain(session, process))
+            collect = asyncio.create_task(self._collect_segments(session, process))
+            try:
+                code = await process.wait()
+                await drain
+                await collect
+            finally:
+                drain.cancel()
+                collect.cancel()
+
+            if session.stopping:
+                return
+            detail = ' | '.join(session.stderr) or 'no error output'
+            if not session.ready.done() and session.mode != TRANSCODE:
+                logger.warning(
+                    "%s of %s exited with status %s (%s); transcoding instead",
+                    session.mode, session.channel_id, code, detail,
+                )
+                self._no_copy.add(session.input_url)
+                self._release_slot(session)
+                session.plan = await self.transcoder.plan(session.input_url, allow_copy=False)
+                await asyncio.to_thread(shutil.rmtree, session.output_dir, True)
+                self._prepare(session)
+                await self._take_slot(session)
+                continue
+            if not session.ready.done():
+                raise TranscodeError(
+                    f"ffmpeg exited with status {code} before any output: {detail}"
+                )
+            if session.restarts >= settings.transcode_max_restarts:
+                raise TranscodeError(
+                    f"ffmpeg exited with status {code} after {session.restarts} restarts: {detail}"
+                )
+            session.restarts += 1
+            for output in session.outputs.values():
+                output.discontinuity = True
+            delay = min(2.0 ** session.restarts, _MAX_BACKOFF)
+            logger.warning(
+                "ffmpeg for %s exited with status %s (%s); restarting in %.0fs",
+                session.channel_id, code, detail, delay,
+            )
+            await asyncio.sleep(delay)
+
+    async def _drain(self, session: TranscodeSession, process: asyncio.subprocess.Process):
+        """Keep the last lines of stderr; an unread pipe would eventually block ffmpeg"""
+        async for line in process.stderr:
+            text = line.decode('utf-8', 'replace').strip()
+            if text:
+                session.stderr.append(text)
+                logger.debug("ffmpeg %s: %s", session.channel_id, text)
+
+    async def _collect_segments(
+        self, session: TranscodeSession, process: asyncio.subprocess.Process
+    ):
+        """Ingest new segments whenever ffmpeg rewrites a playlist, until it exits"""
+        while process.returncode is None:
+            for output in list(session.outputs.values()):
+                try:
+                    modified = os.stat(output.playlist_path).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                if modified != output.modified:
+                    output.modified = modified
+                    await self._ingest(session, output)
+            await asyncio.sleep(_SEGMENT_POLL)
+        # The segments ffmpeg finished while exiting
+        for output in list(session.outputs.values()):
+            await self._ingest(session, output)
+
+    async def _ingest(self, session: TranscodeSession, output: RenditionOutput):
+        """
+        Move segments ffmpeg has completed into a rendition's buffer.
+
+        ffmpeg only lists a segment once it is fully written. The file is
+        read once and deleted, so the scratch directory holds at most the
+        segment being written per rendition. The session is ready once
+        every rendition has a segment.
+        """
+        try:
+            with open(output.playlist_path, encoding='utf-8') as playlist:
+                entries = parse_media_playlist(playlist.read())
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.sequence <= output.ingested:
+                continue
+            data = await asyncio.to_thread(_take_file, os.path.join(output.scratch_dir, entry.uri))
+            output.ingested = entry.sequence
+            if data is None or output.segments.closed:
+                continue
+            output.segments.add(data, entry.duration, entry.discontinuity or output.discontinuity)
+            output.discontinuity = False
+        if not session.ready.done() and all(len(o.segments) for o in session.outputs.values()):
+            session.ready.set_result(session)
+
+    def _forget(self, session: TranscodeSession):
+        if self.sessions.get(session.channel_id) is session:
+            del self.sessions[session.channel_id]
+
+    async def _reap(self):
+        interval = max(1.0, min(self.idle_timeout / 4, 10.0))
+        while True:
+            await asyncio.sleep(interval)
+            idle = []
+            for session in self.sessions.values():
+                if session.stopping or session.idle <= self.idle_timeout:
+                    continue
+                if session.channel_id in self.keep_warm:
+                    session.warm = True
+                else:
+                    idle.append(session)
+            for session in idle:
+                logger.info("Stopping idle transcode for %s", session.channel_id)
+            if idle:
+                await asyncio.gather(*(self.stop(session) for session in idle))
+
+    def stats(self):
+        """Running and queued transcodes, per channel"""
+        running = [s for s in self.sessions.values() if s.slot is not None]
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_remux': self.max_remux,
+            'transcoding': sum(s.slot is self._transcode_slots for s in running),
+            'remuxing': sum(s.slot is self._remux_slots for s in running),
+            'queued': self._queued,
+            'queue_size': self.queue_size,
+            'warm': sum(s.warm for s in self.sessions.values()),
+            'segment_bytes': self.store.nbytes,
+            'segment_budget': self.store.max_bytes,
+            'channels': {
+                session.channel_id: {
+                    'mode': session.mode,
+                    'renditions': [name for name in session.outputs if name],
+                    'segments': sum(len(o.segments) for o in session.outputs.values()),
+                    'bytes': sum(o.segments.nbytes for o in session.outputs.values()),
+                    'pid': session.process.pid if session.process else None,
+                    'ready': session.ready.done() and not session.ready.exception(),
+                    'idle': round(session.idle, 1),
+                    'warm': session.warm,
+                    'restarts': session.restarts,
+                }
+                for session in self.sessions.values()
+            },
+        }
+
+
+def _take_file(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as segment:
+            data = segment.read()
+        os.unlink(path)
+        return data
+    except FileNotFoundError:
+        return None
+
+
+supervisor = TranscodeSupervisor()
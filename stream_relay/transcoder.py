@@ -1,13 +1,319 @@
 """FFmpeg transcoding wrapper"""
-import subprocess
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from backend.config import settings
+from backend.services.response_cache import PROBES, response_cache
+
+logger = logging.getLogger(__name__)
+
+# Channel stream URLs come from third-party playlists: only network inputs
+# are accepted, and ffmpeg may not follow them into other protocols (file:,
+# concat:, subfile:, ...) from inside a manifest
+_INPUT_SCHEMES = ('http://', 'https://')
+_PROTOCOL_WHITELIST = 'http,https,tcp,tls,crypto'
+
+# "lavfi:<filtergraph>" reads a generated test pattern instead of a URL, e.g.
+# "lavfi:testsrc2=size=1280x720:rate=25[out0];sine=frequency=440[out1]"
+TEST_PATTERN_PREFIX = 'lavfi:'
+
+PLAYLIST_NAME = 'playlist.m3u8'
+SEGMENT_PATTERN = 'segment_%05d.ts'
+# Per-rendition scratch subdirectory in a ladder transcode; ffmpeg fills in the name
+RENDITION_DIR = '%v'
+
+# How a source gets into HLS, cheapest first
+PASSTHROUGH = 'passthrough'  # remux only
+AUDIO = 'audio'  # copy video, re-encode audio to AAC
+TRANSCODE = 'transcode'  # re-encode both
+
+# What players accept in MPEG-TS HLS as-is. 10-bit and 4:2:2 H.264 decode
+# in almost no browser, so those are re-encoded too.
+_COPY_VIDEO_CODECS = {'h264'}
+_COPY_PIXEL_FORMATS = {'yuv420p', 'yuvj420p', None}
+_COPY_AUDIO_CODECS = {'aac', 'mp3'}
+
+AUDIO_KBPS = 128
+# MPEG-TS packetization on top of the encoded bitrates, for advertised bandwidth
+_MUX_OVERHEAD = 1.1
+
+
+class TranscodeError(Exception):
+    """A stream could not be transcoded"""
+
+
+class Rendition(NamedTuple):
+    """One rung of the bitrate ladder"""
+    name: str
+    height: int
+    video_kbps: int
+    width: Optional[int] = None  # known once the source has been probed
+
+    @property
+    def bandwidth(self) -> int:
+        """Peak bits per second, as advertised in the master playlist"""
+        return int((self.video_kbps + AUDIO_KBPS) * 1000 * _MUX_OVERHEAD)
+
+
+class Plan(NamedTuple):
+    """How one stream is converted: the mode, and for a ladder its renditions"""
+    mode: str
+    renditions: Tuple[Rendition, ...] = ()
+    audio: bool = True
+
+
+def parse_ladder(spec: str) -> List[Rendition]:
+    """
+    Renditions from a ``"height:kbps,..."`` spec, tallest first, e.g.
+    ``"1080:5000,720:2800,480:1400"``. An empty spec is no ladder.
+    """
+    ladder = []
+    for rung in filter(None, (part.strip() for part in spec.split(','))):
+        try:
+            height, kbps = (int(value) for value in rung.split(':'))
+        except ValueError:
+            raise ValueError(f"Invalid ladder rung {rung!r}, expected height:kbps")
+        if height <= 0 or height % 2 or kbps <= 0:
+            raise ValueError(f"Invalid ladder rung {rung!r}: height must be even and positive")
+        ladder.append(Rendition(f'{height}p', height, kbps))
+    if len({rendition.height for rendition in ladder}) != len(ladder):
+        raise ValueError(f"Duplicate heights in ladder {spec!r}")
+    return sorted(ladder, key=lambda rendition: rendition.height, reverse=True)
+
+
+def choose_mode(probe: Dict) -> str:
+    """Cheapest mode that yields HLS players can decode, for a probe summary"""
+    video, audio = probe.get('video'), probe.get('audio')
+    if video is None and audio is None:
+        return TRANSCODE
+    if video is not None and (
+        video['codec'] not in _COPY_VIDEO_CODECS
+        or video.get('pix_fmt') not in _COPY_PIXEL_FORMATS
+    ):
+        return TRANSCODE
+    if audio is None or audio['codec'] in _COPY_AUDIO_CODECS:
+        return PASSTHROUGH
+    return AUDIO
+
+
+def _summarize(info: Dict) -> Dict:
+    """The first video and audio stream of ffprobe's JSON output"""
+    video = audio = None
+    for stream in info.get('streams', []):
+        kind = stream.get('codec_type')
+        cover_art = stream.get('disposition', {}).get('attached_pic')
+        if kind == 'video' and video is None and not cover_art:
+            video = {
+                'codec': stream.get('codec_name'),
+                'profile': stream.get('profile'),
+                'pix_fmt': stream.get('pix_fmt'),
+                'width': stream.get('width'),
+                'height': stream.get('height'),
+            }
+        elif kind == 'audio' and audio is None:
+            audio = {'codec': stream.get('codec_name'), 'channels': stream.get('channels')}
+    return {'video': video, 'audio': audio}
+
 
 class Transcoder:
     """FFmpeg wrapper for stream transcoding"""
-    
-    def __init__(self, ffmpeg_path: str = "/usr/bin/ffmpeg"):
-        self.ffmpeg_path = ffmpeg_path
-    
-    def transcode_to_hls(self, input_url: str, output_path: str):
-        """Transcode stream to HLS format"""
-        # TODO: Implement FFmpeg transcoding
-        pass
+
+    def __init__(
+        self,
+        ffmpeg_path: Optional[str] = None,
+        ffprobe_path: Optional[str] = None,
+        ladder: Optional[str] = None,
+    ):
+        self.ffmpeg_path = ffmpeg_path or settings.ffmpeg_path
+        self.ffprobe_path = ffprobe_path or settings.ffprobe_path
+        self.ladder = parse_ladder(settings.abr_ladder if ladder is None else ladder)
+
+    def input_args(self, input_url: str, realtime: bool = True) -> List[str]:
+        if input_url.startswith(TEST_PATTERN_PREFIX):
+            if not settings.transcode_allow_test_pattern:
+                raise TranscodeError("Test pattern inputs are disabled")
+            # -re paces the generator at real time, as a live source would be
+            pace = ['-re'] if realtime else []
+            return [*pace, '-f', 'lavfi', '-i', input_url[len(TEST_PATTERN_PREFIX):]]
+        if not input_url.startswith(_INPUT_SCHEMES):
+            raise TranscodeError(f"Unsupported stream URL: {input_url}")
+        return [
+            '-protocol_whitelist', _PROTOCOL_WHITELIST,
+            '-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5',
+            '-i', input_url,
+        ]
+
+    def output_args(self, output_path: str, plan: Plan = Plan(TRANSCODE)) -> List[str]:
+        segment = settings.hls_segment_duration
+        # A keyframe at every segment boundary, so segments cut on time, and
+        # at the same instants in every rendition of a ladder
+        keyframes = ['-force_key_frames', f'expr:gte(t,n_forced*{segment})']
+        encode = ['-c:v', 'libx264', '-preset', settings.transcode_preset,
+                  '-crf', str(settings.transcode_crf), *keyframes]
+        audio_encode = ['-c:a', 'aac', '-b:a', f'{AUDIO_KBPS}k']
+        maps = ['-map', '0:v:0?', '-map', '0:a:0?']
+        output_dir = output_path
+        if plan.renditions:
+            streams = [*self._ladder_args(plan), *encode]
+            audio = audio_encode if plan.audio else []
+            output_dir = os.path.join(output_path, RENDITION_DIR)
+        elif plan.mode == TRANSCODE:
+            streams = [*maps, *encode]
+            audio = audio_encode
+        else:
+            # Copied video can only be cut at the source's own keyframes, so
+            # segment lengths follow its GOP rather than hls_time exactly
+            streams = [*maps, '-c:v', 'copy']
+            audio = ['-c:a', 'copy'] if plan.mode == PASSTHROUGH else audio_encode
+        return [
+            *streams,
+            *audio,
+            '-f', 'hls',
+            '-hls_time', str(segment),
+            '-hls_list_size', str(settings.hls_playlist_size),
+            # append_list: a restarted process carries on the existing
+            # playlist's numbering instead of resetting it under the players
+            '-hls_flags', 'delete_segments+independent_segments+omit_endlist+append_list',
+            '-hls_segment_filename', os.path.join(output_dir, SEGMENT_PATTERN),
+            os.path.join(output_dir, PLAYLIST_NAME),
+        ]
+
+    def _ladder_args(self, plan: Plan) -> List[str]:
+        """
+        Every rendition from one decode: the video is split once and scaled
+        per rung, each rung encoded with its bitrate capped at the ladder's.
+        """
+        count = len(plan.renditions)
+        graph = f"[0:v:0]split={count}{''.join(f'[s{i}]' for i in range(count))}"
+        args = []
+        variants = []
+        for i, rendition in enumerate(plan.renditions):
+            graph += f';[s{i}]scale=-2:{rendition.height}[v{i}]'
+            args += ['-map', f'[v{i}]']
+            if plan.audio:
+                args += ['-map', '0:a:0']
+            args += [
+                f'-maxrate:v:{i}', f'{rendition.video_kbps}k',
+                f'-bufsize:v:{i}', f'{2 * rendition.video_kbps}k',
+            ]
+            variants.append(f'v:{i},a:{i},name:{rendition.name}' if plan.audio
+                            else f'v:{i},name:{rendition.name}')
+        return ['-filter_complex', graph, *args, '-var_stream_map', ' '.join(variants)]
+
+    def command(self, input_url: str, output_path: str, plan: Plan = Plan(TRANSCODE)) -> List[str]:
+        """Full ffmpeg argument list for one channel"""
+        return [
+            self.ffmpeg_path, '-nostdin', '-hide_banner', '-loglevel', 'error',
+            *self.input_args(input_url),
+            *self.output_args(output_path, plan),
+        ]
+
+    async def probe(self, input_url: str) -> Dict:
+        """
+        Codec summary of a stream, ``{"video": {...}, "audio": {...}}``.
+
+        Results are cached per URL for ``probe_cache_ttl`` seconds, shared
+        with other relay processes when Redis is configured; failures are
+        not cached.
+        """
+        async def load():
+            return _summarize(await self._run_ffprobe(input_url))
+
+        return await response_cache.get_or_load(PROBES, input_url, settings.probe_cache_ttl, load)
+
+    async def _run_ffprobe(self, input_url: str) -> Dict:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.ffprobe_path, '-v', 'error',
+                '-probesize', '2M', '-analyzeduration', '3M',
+                '-show_entries',
+                'stream=codec_type,codec_name,profile,pix_fmt,width,height,channels'
+                ':stream_disposition=attached_pic',
+                '-of', 'json',
+                *self.input_args(input_url, realtime=False),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except OSError as e:
+            raise TranscodeError(f"Could not start ffprobe: {e}") from e
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), settings.probe_timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise TranscodeError(f"ffprobe timed out after {settings.probe_timeout:.0f}s")
+        if process.returncode != 0:
+            raise TranscodeError(f"ffprobe failed: {stderr.decode('utf-8', 'replace').strip()}")
+        return json.loads(stdout)
+
+    async def plan(self, input_url: str, allow_copy: bool = True) -> Plan:
+        """
+        Passthrough, audio-only or full transcode for a stream, and for a
+        full transcode the ladder renditions to encode.
+
+        Test patterns are raw video and always transcoded. A stream that
+        cannot be probed is transcoded to a single rendition, which plays
+        whatever the source is.
+        """
+        test_pattern = input_url.startswith(TEST_PATTERN_PREFIX)
+        copy = allow_copy and settings.transcode_passthrough and not test_pattern
+        if not copy and len(self.ladder) < 2:
+            return Plan(TRANSCODE)
+        try:
+            probe = await self.probe(input_url)
+        except (ValueError, TranscodeError) as e:
+            logger.warning("Could not probe %s, transcoding: %s", input_url, e)
+            return Plan(TRANSCODE)
+        mode = choose_mode(probe) if copy else TRANSCODE
+        if mode != TRANSCODE:
+            return Plan(mode)
+        return Plan(mode, tuple(self.renditions(probe)), probe.get('audio') is not None)
+
+    def renditions(self, probe: Dict) -> List[Rendition]:
+        """
+        The ladder's rungs for a probed source: none taller than the source,
+        since upscaling spends bits on nothing. A ladder of one rung is no
+        ladder, and the source is transcoded at its own size.
+        """
+        video = probe.get('video')
+        if video is None or len(self.ladder) < 2:
+            return []
+        width, height = video.get('width'), video.get('height')
+        rungs = [r for r in self.ladder if not height or r.height <= height] or self.ladder[-1:]
+        if len(rungs) < 2:
+            return []
+        if width and height:
+            # As ffmpeg's scale=-2 computes it: the source aspect, rounded to even
+            rungs = [r._replace(width=2 * round(width * r.height / height / 2)) for r in rungs]
+        return rungs
+
+    async def transcode_to_hls(
+        self, input_url: str, output_path: str, plan: Plan = Plan(TRANSCODE)
+    ) -> asyncio.subprocess.Process:
+        """
+        Start converting a stream to a live HLS playlist in ``output_path``,
+        or for a ladder one playlist per rendition in a subdirectory named
+        after it.
+
+        Returns the running process; its stderr is a pipe the caller must
+        drain. The process runs in its own session, so signals sent to the
+        relay's process group do not reach it before the supervisor does.
+        """
+        command = self.command(input_url, output_path, plan)
+        os.makedirs(output_path, exist_ok=True)
+        for rendition in plan.renditions:
+            os.makedirs(os.path.join(output_path, rendition.name), exist_ok=True)
+        try:
+            return await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+        except OSError as e:
+            raise TranscodeError(f"Could not start ffmpeg: {e}") from e
@@ -0,0 +1,146 @@
+"""Keeping channels running ahead of viewers, for instant channel switches"""
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from backend.config import settings
+from stream_relay.supervisor import TranscodeSupervisor
+from stream_relay.transcoder import TranscodeError
+
+logger = logging.getLogger(__name__)
+
+# Seconds between re-planning the warm channels without a tune-in
+_REFRESH_INTERVAL = 15.0
+# Seconds a channel's neighbours are reused before they are looked up again
+_NEIGHBOURS_TTL = 300.0
+# Tune-in weights are rescaled before they grow past this
+_MAX_WEIGHT = 1e12
+
+
+class ChannelWarmer:
+    """
+    Decides which channels the supervisor keeps warm, and starts them.
+
+    A channel is warm-worthy when it is among the ``top`` most-watched
+    channels, counting tune-ins with a ``half_life`` decay, or within
+    ``adjacent`` places either side of a watched channel in the channel
+    list (where a viewer zapping up or down lands next).
+
+    ``resolve_url(channel_id)`` returns a channel's input URL or None, and
+    ``neighbours(channel_id, n)`` the ids of the ``n`` channels before and
+    after it in list order. The plan is redone on every tune-in and every
+    ``_REFRESH_INTERVAL`` seconds.
+    """
+
+    def __init__(
+        self,
+        supervisor: TranscodeSupervisor,
+        resolve_url: Callable[[str], Awaitable[Optional[str]]],
+        neighbours: Callable[[str, int], Awaitable[List[str]]],
+        top: Optional[int] = None,
+        adjacent: Optional[int] = None,
+        half_life: Optional[float] = None,
+    ):
+        self.supervisor = supervisor
+        self.resolve_url = resolve_url
+        self.neighbours = neighbours
+        self.top = settings.relay_warm_top if top is None else top
+        self.adjacent = settings.relay_warm_adjacent if adjacent is None else adjacent
+        self.half_life = half_life or settings.relay_warm_half_life
+        # Decayed tune-in counts, all scaled by 2 ** (elapsed / half_life)
+        self.scores: Dict[str, float] = {}
+        self._epoch = time.monotonic()
+        self._neighbours: Dict[str, Tuple[float, List[str]]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.top > 0 or self.adjacent > 0
+
+    def start(self):
+        """Hook into the supervisor's tune-ins and start the periodic refresh"""
+        if not self.enabled or self._task is not None:
+            return
+        self.supervisor.on_tune_in = self.tuned_in
+        self._task = asyncio.create_task(self._refresh_forever())
+
+    async def close(self):
+        if self.supervisor.on_tune_in == self.tuned_in:
+            self.supervisor.on_tune_in = None
+        for task in [self._task, *self._pending]:
+            if task is not None:
+                task.cancel()
+        self._task = None
+
+    def tuned_in(self, channel_id: str):
+        """Count a tune-in and re-plan in the background"""
+        self.record(channel_id)
+        task = asyncio.create_task(self.refresh())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def record(self, channel_id: str):
+        """
+        Exponential decay without touching every score: each tune-in adds a
+        weight that doubles every half-life, so older ones count for less.
+        """
+        weight = 2.0 ** ((time.monotonic() - self._epoch) / self.half_life)
+        if weight > _MAX_WEIGHT:
+            self.scores = {key: score / weight for key, score in self.scores.items()}
+            self._epoch = time.monotonic()
+            weight = 1.0
+        self.scores[channel_id] = self.scores.get(channel_id, 0.0) + weight
+
+    def most_watched(self) -> List[str]:
+        return heapq.nlargest(self.top, self.scores, key=self.scores.__getitem__)
+
+    async def plan(self) -> Set[str]:
+        """Channels that should be running warm now"""
+        wanted = set(self.most_watched())
+        if self.adjacent:
+            watched = [s.channel_id for s in list(self.supervisor.sessions.values()) if not s.warm]
+            for channel_id in watched:
+                wanted.update(await self._adjacent(channel_id))
+        return wanted
+
+    async def refresh(self):
+        """Hand the supervisor the current plan and start the planned channels not running"""
+        async with self._lock:
+            try:
+                wanted = await self.plan()
+            except Exception:
+                logger.exception("Planning warm channels failed")
+                return
+            self.supervisor.keep_warm = wanted
+            for channel_id in wanted - set(self.supervisor.sessions):
+                try:
+                    input_url = await self.resolve_url(channel_id)
+                    if input_url is None or channel_id in self.supervisor.sessions:
+                        continue
+                    self.supervisor.warm(channel_id, input_url)
+                except TranscodeError as e:
+                    logger.debug("Not warming %s: %s", channel_id, e)
+                except Exception:
+                    logger.exception("Warming %s failed", channel_id)
+
+    async def _adjacent(self, channel_id: str) -> List[str]:
+        cached = self._neighbours.get(channel_id)
+        if cached is not None and time.monotonic() - cached[0] < _NEIGHBOURS_TTL:
+            return cached[1]
+        found = await self.neighbours(channel_id, self.adjacent)
+        if len(self._neighbours) > 10000:
+            self._neighbours.clear()
+        self._neighbours[channel_id] = (time.monotonic(), found)
+        return found
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(_REFRESH_INTERVAL)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Refreshing warm channels failed")
@@ -0,0 +1,35 @@
+"""Shared test setup"""
+import os
+
+import pytest
+
+# backend.config reads these at import time; tests bring their own databases and caches
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/15")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("API_HOST", "127.0.0.1")
+
+
+class FakeRedis:
+    """The few commands the Redis cache backend sends, on one store shared by every process"""
+
+    def __init__(self):
+        self.data = {}
+        self.reads = 0
+        self.writes = 0
+
+    async def get(self, key):
+        self.reads += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.writes += 1
+        self.data[key] = value.encode()
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
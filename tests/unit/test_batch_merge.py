@@ -0,0 +1,82 @@
+"""Multi-playlist merge: duplicate detection and priority rules"""
+import pytest
+
+from backend.services.batch_import import DEFAULT_PRIORITY_RULES, merge_channels
+
+
+def ch(name: str, url: str, tvg_id=None, logo=None, attributes=None) -> dict:
+    return {'name': name, 'stream_url': url, 'tvg_id': tvg_id, 'logo': logo,
+            'attributes': attributes or {}}
+
+
+def merge(sources, *channel_lists, rules=DEFAULT_PRIORITY_RULES):
+    results = [{'url': s['url'], 'channels': list(c), 'error': None}
+               for s, c in zip(sources, channel_lists)]
+    return merge_channels(sources, results, rules)
+
+
+def names(merged):
+    return [channel['name'] for channel in merged]
+
+
+A = {'url': 'http://a/list.m3u8'}
+B = {'url': 'http://b/list.m3u8'}
+
+
+def test_higher_priority_source_wins_a_shared_stream():
+    merged, removed = merge(
+        [A, {**B, 'priority': 5}],
+        [ch('A copy', 'http://s/1', tvg_id='one', logo='a.png')],
+        [ch('B copy', 'http://s/1')],
+    )
+    assert (names(merged), removed) == (['B copy'], 1)
+
+
+@pytest.mark.parametrize("a_entry, b_entry, winner", [
+    # Equal priority: a tvg-id beats none, then a logo beats none
+    (ch('A', 'http://s/1'), ch('B', 'http://s/1', tvg_id='one'), 'B'),
+    (ch('A', 'http://s/1', logo='a.png'), ch('B', 'http://s/1'), 'A'),
+    (ch('A', 'http://s/1', logo='a.png'), ch('B', 'http://s/1', tvg_id='one'), 'B'),
+    # All equal: the source listed first
+    (ch('A', 'http://s/1'), ch('B', 'http://s/1'), 'A'),
+])
+def test_default_rules_break_ties_in_order(a_entry, b_entry, winner):
+    merged, _ = merge([A, B], [a_entry], [b_entry])
+    assert names(merged) == [winner]
+
+
+def test_rules_apply_in_the_order_given():
+    sources = [{**A, 'priority': 1}, B]
+    lists = ([ch('A', 'http://s/1')], [ch('B', 'http://s/1', logo='b.png')])
+    assert names(merge(sources, *lists)[0]) == ['A']
+    assert names(merge(sources, *lists, rules=('logo', 'priority'))[0]) == ['B']
+    assert names(merge([A, B], [ch('A', 'http://s/1', attributes={'x': 1})],
+                       [ch('B', 'http://s/1')], rules=('attributes',))[0]) == ['A']
+
+
+def test_repeated_stream_within_a_source_keeps_the_first():
+    merged, removed = merge([A], [ch('First', 'http://s/1'), ch('Second', 'http://s/1')])
+    assert (names(merged), removed) == (['First'], 1)
+
+
+def test_shared_tvg_id_keeps_every_entry_of_the_winning_source():
+    merged, removed = merge(
+        [A, {**B, 'priority': 1}],
+        [ch('A HD', 'http://a/hd', tvg_id='one'), ch('A News', 'http://a/news')],
+        [ch('B SD', 'http://b/sd', tvg_id='one'), ch('B HD', 'http://b/hd', tvg_id='one')],
+    )
+    assert (names(merged), removed) == (['A News', 'B SD', 'B HD'], 1)
+
+
+def test_merged_channels_keep_playlist_order():
+    merged, removed = merge(
+        [A, {**B, 'priority': 1}],
+        [ch('a1', 'http://s/1'), ch('a2', 'http://s/2'), ch('a3', 'http://s/3')],
+        [ch('b2', 'http://s/2'), ch('b4', 'http://s/4')],
+    )
+    assert (names(merged), removed) == (['a1', 'a3', 'b2', 'b4'], 1)
+
+
+def test_unknown_rule_is_rejected():
+    with pytest.raises(ValueError, match="popularity"):
+        merge([A], [], rules=('priority', 'popularity'))
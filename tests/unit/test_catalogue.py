@@ -0,0 +1,97 @@
+"""UI channel catalogue: rows kept for cached pages, loose rows bounded"""
+import pytest
+
+from ladybug_tv.utils.catalogue import ChannelCatalogue
+
+pytestmark = pytest.mark.asyncio
+
+
+def row(channel_id: str) -> dict:
+    return {"id": channel_id, "name": channel_id.upper(), "category": None, "logo": None}
+
+
+class FakeAPI:
+    """Serves ``pages``: list page key -> (ids, catalogue version)"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    async def get_channels_if_changed(self, etag, cursor, limit, fields):
+        ids, version = self.pages[cursor]
+        return {"items": [row(i) for i in ids], "next_cursor": None}, f'"v{version}-0"'
+
+
+def kept(catalogue, *ids):
+    return [channel_id for channel_id in ids if catalogue.channel(channel_id) is not None]
+
+
+async def test_rows_of_dropped_pages_go_with_them():
+    api = FakeAPI({"a": (["a1", "a2"], 1), "b": (["b1"], 1), "c": (["c1"], 1)})
+    catalogue = ChannelCatalogue(api, max_pages=2, max_loose_rows=0)
+    for key in "abc":
+        await catalogue.page("", key)
+    assert kept(catalogue, "a1", "a2", "b1", "c1") == ["b1", "c1"]
+
+
+async def test_a_row_stays_while_any_kept_page_lists_it():
+    api = FakeAPI({"a": (["x", "a1"], 1), "b": (["x", "b1"], 1), "c": (["c1"], 1)})
+    catalogue = ChannelCatalogue(api, max_pages=2, max_loose_rows=0)
+    for key in "abc":
+        await catalogue.page("", key)
+    assert kept(catalogue, "x", "a1", "b1", "c1") == ["x", "b1", "c1"]
+
+
+async def test_loose_rows_go_least_recently_looked_up_first():
+    api = FakeAPI({"a": (["a1", "a2"], 1), "b": (["b1", "b2"], 1), "c": (["c1"], 1)})
+    catalogue = ChannelCatalogue(api, max_pages=1, max_loose_rows=3)
+    await catalogue.page("", "a")
+    await catalogue.page("", "b")
+    # Still shown by some session
+    catalogue.channel("a1")
+    await catalogue.page("", "c")
+    assert kept(catalogue, "a1", "a2", "b1", "b2", "c1") == ["a1", "b1", "b2", "c1"]
+
+
+async def test_remembered_row_is_loose_until_a_page_lists_it():
+    api = FakeAPI({"a": (["fav", "a1"], 1), "b": (["b1"], 1)})
+    catalogue = ChannelCatalogue(api, max_pages=1, max_loose_rows=2)
+    catalogue.remember([row("fav")])
+    await catalogue.page("", "a")
+    catalogue.remember([row("other")])
+    assert kept(catalogue, "fav", "a1", "other") == ["fav", "a1", "other"]
+    await catalogue.page("", "b")
+    assert kept(catalogue, "fav", "a1", "other", "b1") == ["fav", "a1", "b1"]
+
+
+async def test_new_catalogue_version_releases_every_page():
+    api = FakeAPI({"a": (["a1"], 1), "b": (["b1"], 1)})
+    catalogue = ChannelCatalogue(api, max_pages=10, max_loose_rows=0)
+    await catalogue.page("", "a")
+    await catalogue.page("", "b")
+    api.pages["b"] = (["b1", "b2"], 2)
+    catalogue.ttl = 0
+    await catalogue.page("", "b")
+    assert catalogue.version == 2
+    assert kept(catalogue, "a1", "b1", "b2") == ["b1", "b2"]
+
+
+async def test_revalidated_page_whose_rows_were_dropped_is_fetched_whole():
+    api = FakeAPI({"a": (["a1"], 1), "b": (["b1"], 1)})
+    etags = []
+    fetch = api.get_channels_if_changed
+
+    async def conditional(etag, cursor, limit, fields):
+        etags.append(etag)
+        if etag is not None:
+            return None, etag
+        return await fetch(etag, cursor, limit, fields)
+
+    api.get_channels_if_changed = conditional
+    catalogue = ChannelCatalogue(api, ttl=0, max_pages=1, max_loose_rows=0)
+    await catalogue.page("", "a")
+    cached = catalogue._pages[("", "a")]
+    await catalogue.page("", "b")
+    assert kept(catalogue, "a1") == []
+    await catalogue._fetch("", "a", cached)
+    assert etags[-2:] == ['"v1-0"', None]
+    assert kept(catalogue, "a1") == ["a1"]
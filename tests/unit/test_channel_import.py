@@ -0,0 +1,104 @@
+"""Bulk channel import: one lookup query, batched writes, insert/update/skip"""
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models import catalogue, channel, epg, playlist, user  # noqa: F401
+from backend.models.channel import Channel
+from backend.services.playlist_service import M3U8Parser
+
+
+def entry(n: int, name=None, tvg_id=None) -> dict:
+    return {
+        'name': name or f'Channel {n}', 'category': 'News', 'logo': None,
+        'stream_url': f'http://s/{n}', 'tvg_id': tvg_id, 'attributes': {},
+    }
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    with sessionmaker(bind=engine)() as db:
+        yield db
+
+
+@pytest.fixture
+def statements(engine):
+    """First words of the channel statements executed, one per round trip"""
+    seen = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if ' channels' in statement:
+            seen.append(' '.join(statement.split()[:2]))
+
+    return seen
+
+
+def channels(db):
+    return {
+        row.stream_url: (row.id, row.name, bool(row.is_active))
+        for row in db.execute(select(Channel.id, Channel.name, Channel.stream_url,
+                                     Channel.is_active))
+    }
+
+
+def test_new_channels_are_inserted_in_batches(db, statements):
+    result = M3U8Parser(db).bulk_import_channels(
+        [entry(n) for n in range(5)], batch_size=2
+    )
+    assert result == {'inserted': 5, 'updated': 0, 'skipped': 0, 'deactivated': 0}
+    # One lookup, then one INSERT per batch of 2 + 2 + 1 rows
+    assert statements == ['SELECT channels.id,', 'INSERT INTO', 'INSERT INTO', 'INSERT INTO']
+    assert len(channels(db)) == 5
+
+
+def test_repeated_stream_url_is_skipped(db):
+    result = M3U8Parser(db).bulk_import_channels([entry(1), entry(1, name='Again')])
+    assert (result['inserted'], result['skipped']) == (1, 1)
+    assert channels(db)['http://s/1'][1] == 'Channel 1'
+
+
+def test_reimport_updates_changed_rows_and_skips_the_rest(db, statements):
+    parser = M3U8Parser(db)
+    parser.bulk_import_channels([entry(n) for n in range(3)])
+    statements.clear()
+
+    result = parser.bulk_import_channels([entry(0), entry(1, name='Renamed'), entry(2)])
+    assert result == {'inserted': 0, 'updated': 1, 'skipped': 2, 'deactivated': 0}
+    assert channels(db)['http://s/1'][1] == 'Renamed'
+    assert sum(s.startswith('UPDATE channels') for s in statements) == 1
+    assert not any(s.startswith('INSERT') for s in statements)
+
+
+def test_update_existing_false_leaves_changed_rows(db):
+    parser = M3U8Parser(db)
+    parser.bulk_import_channels([entry(1)])
+    result = parser.bulk_import_channels([entry(1, name='Renamed')], update_existing=False)
+    assert (result['updated'], result['skipped']) == (0, 1)
+    assert channels(db)['http://s/1'][1] == 'Channel 1'
+
+
+def test_ids_come_from_tvg_id_with_a_stable_fallback(db, engine):
+    M3U8Parser(db).bulk_import_channels([
+        entry(1, tvg_id='bbc1.uk'), entry(2, tvg_id='bbc1.uk'), entry(3),
+    ])
+    ids = {url: row[0] for url, row in channels(db).items()}
+    assert ids['http://s/1'] == 'bbc1.uk'
+    assert ids['http://s/2'].startswith('ch-')
+
+    # The same playlist in a fresh database picks the same fallback ids
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    M3U8Parser(db).bulk_import_channels([
+        entry(1, tvg_id='bbc1.uk'), entry(2, tvg_id='bbc1.uk'), entry(3),
+    ])
+    assert {url: row[0] for url, row in channels(db).items()} == ids
@@ -0,0 +1,89 @@
+"""Channel search: token prefix matching, ranking and trigram fallback"""
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from backend.database import Base
+from backend.models.catalogue import CatalogueVersion
+from backend.models.channel import Channel
+from backend.services.catalogue import bump_catalogue_version
+from backend.services.channel_search import ChannelSearchIndex
+
+ROWS = [
+    ("bbc1", "BBC One", "General", None, True),
+    ("bbc1hd", "BBC One HD", "General", None, True),
+    ("bbc2", "BBC Two", "General", None, True),
+    ("news", "BBC News", "News", None, False),
+    ("onefm", "One FM", "Radio", None, True),
+    ("sky", "Sky Sports Main Event", "Sports", None, True),
+]
+
+
+@pytest.fixture
+def index():
+    index = ChannelSearchIndex()
+    index.build(ROWS)
+    return index
+
+
+def ids(results):
+    return [doc.id for doc, _ in results]
+
+
+def test_every_word_must_prefix_a_name_token(index):
+    assert ids(index.search("bbc on")) == ["bbc1", "bbc1hd"]
+    assert ids(index.search("main sp")) == ["sky"]
+
+
+def test_ranking_exact_then_leading_then_anywhere(index):
+    results = index.search("one")
+    # "One FM" starts with the query; the BBC names only contain it,
+    # shorter name first
+    assert ids(results) == ["onefm", "bbc1", "bbc1hd"]
+    assert ids(index.search("bbc one"))[0] == "bbc1"
+    assert results[0][1] > results[1][1] > results[2][1]
+
+
+def test_typo_falls_back_to_trigrams(index):
+    results = index.search("bbc nwes")
+    # Most similar first; fuzzy scores stay below every prefix hit's
+    assert ids(results) == ["news", "bbc1", "bbc2"]
+    assert results[0][1] < 1.0
+
+
+def test_no_fuzzy_hits_when_a_prefix_matches(index):
+    assert ids(index.search("bbc tw")) == ["bbc2"]
+
+
+def test_unrelated_query_finds_nothing(index):
+    assert index.search("weather") == []
+    assert index.search("  ,. ") == []
+
+
+def test_filters(index):
+    assert ids(index.search("bbc", category="News")) == ["news"]
+    assert "news" not in ids(index.search("bbc", active=True))
+    assert ids(index.search("bbc", active=False)) == ["news"]
+
+
+def test_refresh_rebuilds_when_the_catalogue_version_changes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(engine, tables=[Channel.__table__, CatalogueVersion.__table__])
+    index = ChannelSearchIndex()
+    with Session(engine) as db:
+        db.execute(insert(Channel).values(id="bbc1", name="BBC One", stream_url="http://s/1"))
+        bump_catalogue_version(db)
+        db.commit()
+        index.refresh(db)
+        assert ids(index.search("bbc")) == ["bbc1"]
+
+        db.execute(insert(Channel).values(id="bbc2", name="BBC Two", stream_url="http://s/2"))
+        db.commit()
+        index.refresh(db)
+        assert ids(index.search("bbc")) == ["bbc1"]
+
+        bump_catalogue_version(db)
+        db.commit()
+        index.refresh(db)
+        assert ids(index.search("bbc")) == ["bbc1", "bbc2"]
+    engine.dispose()
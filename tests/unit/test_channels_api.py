@@ -0,0 +1,143 @@
+"""Channel listing: keyset cursors and conditional requests"""
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from backend.api.v1 import channels as channels_api
+from backend.database import Base, get_async_db
+from backend.models.catalogue import CatalogueVersion
+from backend.models.channel import Channel
+from backend.services.catalogue import bump_catalogue_version
+from backend.services.response_cache import CHANNELS, MemoryCacheBackend, ResponseCache
+
+# Two channels share each of these names, so pages also split on the id
+NAMES = ["BBC One", "BBC Two", "Sky News", "Sky, Sports"]
+
+
+@pytest.fixture
+def sync_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'channels.db'}")
+    Base.metadata.create_all(engine, tables=[Channel.__table__, CatalogueVersion.__table__])
+    with Session(engine) as db:
+        db.execute(insert(Channel), [
+            {"id": f"ch{i}-{n}", "name": name, "stream_url": f"http://s/{i}/{n}"}
+            for i, name in enumerate(NAMES)
+            for n in (2, 1)
+        ])
+        bump_catalogue_version(db)
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache(MemoryCacheBackend(100))
+    monkeypatch.setattr(channels_api, "response_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def async_engine(sync_engine):
+    return create_async_engine(sync_engine.url.set(drivername="sqlite+aiosqlite"))
+
+
+@pytest.fixture
+def client(async_engine, cache):
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def db():
+        async with sessions() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(channels_api.router)
+    app.dependency_overrides[get_async_db] = db
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("name, channel_id", [
+    ("BBC One", "bbc-1"),
+    ("Sky, Sports \"HD\" ünïcode", "id/with+chars="),
+    ("", ""),
+])
+def test_cursor_round_trip(name, channel_id):
+    cursor = channels_api._encode_cursor(name, channel_id)
+    assert "=" not in cursor
+    assert channels_api._decode_cursor(cursor) == (name, channel_id)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "e30", "WyJhIl0"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        channels_api._decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_pages_walk_every_channel_once_in_order(client):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, "fields": "id,name"}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/api/v1/channels/", params=params).json()
+        assert len(body["items"]) <= 3
+        seen += [(item["name"], item["id"]) for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(seen)
+    assert len(set(seen)) == len(seen) == 2 * len(NAMES)
+
+
+def test_bad_cursor_is_a_400(client):
+    assert client.get("/api/v1/channels/", params={"cursor": "e30"}).status_code == 400
+
+
+def test_matching_etag_gets_a_304(client):
+    first = client.get("/api/v1/channels/", params={"limit": 2})
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert etag.startswith('"v1-')
+
+    again = client.get("/api/v1/channels/", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    other = client.get("/api/v1/channels/", params={"limit": 3}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["etag"] != etag
+
+
+def test_catalogue_change_replaces_the_etag(client, sync_engine, cache):
+    etag = client.get("/api/v1/channels/").headers["etag"]
+    with Session(sync_engine) as db:
+        bump_catalogue_version(db)
+        db.commit()
+    cache.invalidate(CHANNELS)
+
+    response = client.get("/api/v1/channels/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('"v2-')
+
+
+def test_revalidation_after_expiry_skips_the_page_query(client, async_engine, cache):
+    etag = client.get("/api/v1/channels/", params={"limit": 2}).headers["etag"]
+    # The entry is gone but the catalogue has not changed
+    cache.invalidate(CHANNELS)
+    statements = []
+    event.listen(
+        async_engine.sync_engine, "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    response = client.get("/api/v1/channels/", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert len(statements) == 1
+    assert "catalogue_version" in statements[0]
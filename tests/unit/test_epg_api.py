@@ -0,0 +1,99 @@
+"""EPG endpoints: index lookups with descriptions read from the database"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from backend.api.v1 import epg as epg_api
+from backend.database import Base, get_async_db
+from backend.models.channel import Channel
+from backend.models.epg import EPGProgram
+from backend.services.epg_index import EPGIndex
+
+NOW = datetime.utcnow().replace(second=0, microsecond=0)
+
+
+def slot(title: str, start: int, end: int, description=None, category=None) -> dict:
+    return {
+        "channel_id": "news.example", "title": title, "description": description,
+        "category": category, "start_time": NOW + timedelta(minutes=start),
+        "end_time": NOW + timedelta(minutes=end),
+    }
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'epg.db'}")
+    Base.metadata.create_all(engine, tables=[Channel.__table__, EPGProgram.__table__])
+    with Session(engine) as db:
+        db.execute(insert(EPGProgram), [
+            slot("Headlines", -10, 20, "Today's stories", "News"),
+            slot("Weather", 20, 30),
+            slot("Film", 30, 150, "A long film", "Movie"),
+        ])
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def index(engine, monkeypatch):
+    index = EPGIndex()
+    with Session(engine) as db:
+        index.load(db)
+    monkeypatch.setattr(epg_api, "epg_index", index)
+    return index
+
+
+@pytest.fixture
+def client(engine, index):
+    async_engine = create_async_engine(engine.url.set(drivername="sqlite+aiosqlite"))
+    sessions = async_sessionmaker(async_engine)
+
+    async def db():
+        async with sessions() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(epg_api.router)
+    app.dependency_overrides[get_async_db] = db
+    with TestClient(app) as client:
+        yield client
+
+
+def test_index_holds_no_descriptions(index):
+    current, _ = index.now_next("news.example", NOW)
+    assert current.title == "Headlines"
+    assert not hasattr(current, "description")
+
+
+def test_guide_reads_descriptions_of_the_programmes_returned(client):
+    guide = client.get("/api/v1/epg/news.example", params={"upcoming": 2}).json()
+    assert guide["current"]["description"] == "Today's stories"
+    assert guide["current"]["category"] == "News"
+    assert [(p["title"], p["description"], p["category"]) for p in guide["upcoming"]] == [
+        ("Weather", None, None),
+        ("Film", "A long film", "Movie"),
+    ]
+
+
+def test_batch_reads_descriptions_once_for_every_channel(client):
+    body = client.post("/api/v1/epg/batch", json={
+        "channel_ids": ["news.example", "unknown"], "limit": 1,
+    }).json()
+    news = body["channels"]["news.example"]
+    assert news["current"]["description"] == "Today's stories"
+    assert [p["title"] for p in news["upcoming"]] == ["Weather"]
+    assert body["channels"]["unknown"] == {"current": {}, "upcoming": []}
+
+
+def test_programme_purged_since_the_build_keeps_its_title(engine, client):
+    with Session(engine) as db:
+        db.execute(delete(EPGProgram).where(EPGProgram.title == "Headlines"))
+        db.commit()
+    current = client.get("/api/v1/epg/news.example").json()["current"]
+    assert (current["title"], current["description"]) == ("Headlines", None)
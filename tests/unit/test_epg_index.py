@@ -0,0 +1,70 @@
+"""Now/next and window lookups over a channel schedule"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.services.epg_index import ChannelSchedule, Programme
+
+BASE = datetime(2024, 5, 1, 18, 0)
+
+
+def at(minutes: int) -> datetime:
+    return BASE + timedelta(minutes=minutes)
+
+
+def programme(title: str, start: int, end: int) -> Programme:
+    return Programme(start, title, at(start), at(end))
+
+
+@pytest.fixture
+def schedule():
+    # 18:00-18:30 News, 18:30-19:00 Quiz, gap, 19:30-20:00 Film, 20:00-21:00 Drama
+    # (given out of order: the schedule sorts its programmes)
+    return ChannelSchedule([
+        programme("Film", 90, 120),
+        programme("News", 0, 30),
+        programme("Drama", 120, 180),
+        programme("Quiz", 30, 60),
+    ])
+
+
+def titles(programmes):
+    return [p.title for p in programmes]
+
+
+@pytest.mark.parametrize("minute, current, upcoming", [
+    (-10, None, ["News", "Quiz"]),
+    (0, "News", ["Quiz", "Film"]),
+    (29, "News", ["Quiz", "Film"]),
+    (30, "Quiz", ["Film", "Drama"]),
+    (60, None, ["Film", "Drama"]),
+    (75, None, ["Film", "Drama"]),
+    (120, "Drama", []),
+    (179, "Drama", []),
+    (180, None, []),
+    (500, None, []),
+])
+def test_now_next(schedule, minute, current, upcoming):
+    now, following = schedule.now_next(at(minute), 2)
+    assert (now and now.title) == current
+    assert titles(following) == upcoming
+
+
+@pytest.mark.parametrize("count, expected", [
+    (0, []),
+    (1, ["Quiz"]),
+    (3, ["Quiz", "Film", "Drama"]),
+    (10, ["Quiz", "Film", "Drama"]),
+])
+def test_upcoming_count_is_a_limit(schedule, count, expected):
+    assert titles(schedule.now_next(at(10), count)[1]) == expected
+
+
+def test_empty_schedule():
+    assert ChannelSchedule([]).now_next(at(0), 3) == (None, [])
+
+
+def test_window_takes_programmes_starting_before_its_end(schedule):
+    now, following = schedule.window(at(45), at(120))
+    assert now.title == "Quiz"
+    assert titles(following) == ["Film"]
@@ -0,0 +1,97 @@
+"""XMLTV ingest: programme end times and upserts"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models import catalogue, channel, epg, playlist, user  # noqa: F401
+from backend.models.epg import EPGProgram
+from epg_service import tasks
+
+# A whole hour close to now, inside the retention window
+BASE = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+
+def stamp(minutes: int) -> str:
+    return (BASE + timedelta(minutes=minutes)).strftime("%Y%m%d%H%M%S +0000")
+
+
+def programme(channel_id: str, title: str, start: int, stop=None) -> str:
+    stop_attr = f' stop="{stamp(stop)}"' if stop is not None else ''
+    return (
+        f'<programme channel="{channel_id}" start="{stamp(start)}"{stop_attr}>'
+        f'<title>{title}</title></programme>'
+    )
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'epg.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(tasks, 'SessionLocal', factory)
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def ingest(tmp_path, sessions):
+    def run(*programmes: str):
+        path = tmp_path / 'guide.xml'
+        path.write_text(f'<?xml version="1.0"?><tv>{"".join(programmes)}</tv>')
+        stats = tasks.ingest_programmes(str(path))
+        with sessions() as db:
+            rows = db.execute(
+                select(EPGProgram.channel_id, EPGProgram.title,
+                       EPGProgram.start_time, EPGProgram.end_time)
+                .order_by(EPGProgram.channel_id, EPGProgram.start_time)
+            ).all()
+        guide = [
+            (row.channel_id, row.title, int((row.start_time - BASE).total_seconds() // 60),
+             int((row.end_time - BASE).total_seconds() // 60))
+            for row in rows
+        ]
+        return stats, guide
+
+    return run
+
+
+def test_programmes_without_stop_end_at_the_next_start(ingest):
+    stats, guide = ingest(
+        programme("a", "News", 0),
+        programme("b", "Film", 0),
+        programme("a", "Quiz", 30),
+        programme("b", "Drama", 90, 150),
+        programme("a", "Late", 60),
+    )
+    assert guide == [
+        ("a", "News", 0, 30),
+        ("a", "Quiz", 30, 60),
+        ("b", "Film", 0, 90),
+        ("b", "Drama", 90, 150),
+    ]
+    # "Late" has no successor and no stop
+    assert stats['invalid'] == 1
+    assert stats['upserted'] == 4
+
+
+def test_programme_read_after_its_successor(ingest):
+    _, guide = ingest(
+        programme("a", "Second", 30),
+        programme("a", "First", 0),
+        programme("a", "Third", 60, 90),
+    )
+    assert guide == [("a", "First", 0, 30), ("a", "Second", 30, 60), ("a", "Third", 60, 90)]
+
+
+def test_stop_before_start_is_invalid(ingest):
+    stats, guide = ingest(programme("a", "Backwards", 60, 30), programme("a", "Fine", 90, 120))
+    assert guide == [("a", "Fine", 90, 120)]
+    assert stats['invalid'] == 1
+
+
+def test_repeated_programme_keeps_the_last_one_read(ingest):
+    _, guide = ingest(programme("a", "Old", 0, 30), programme("a", "New", 0, 45))
+    assert guide == [("a", "New", 0, 45)]
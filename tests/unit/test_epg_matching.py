@@ -0,0 +1,58 @@
+"""Playlist channel to XMLTV channel matching"""
+import pytest
+
+from backend.services.epg_matching import EPGMatcher, digit_tokens, normalize_name
+
+GUIDE = [
+    ("SkySports1.uk", ["Sky Sports 1"]),
+    ("SkySportsNews.uk", ["Sky Sports News"]),
+    ("ESPN.us", ["ESPN"]),
+    ("CNN.us", ["CNN International"]),
+    ("BBCOne.uk", ["BBC One"]),
+]
+
+
+@pytest.fixture
+def matcher():
+    return EPGMatcher(GUIDE)
+
+
+def test_normalize_strips_country_prefix_and_quality():
+    assert normalize_name("UK: BBC One HD") == "bbcone"
+    assert normalize_name("DE | Sky Sports 1 FHD") == "skysports1"
+    assert normalize_name("[US] ESPN") == "espn"
+
+
+def test_normalize_keeps_prefix_that_is_not_a_country_code():
+    assert normalize_name("CNN: Breaking News") == "cnnbreakingnews"
+    assert normalize_name("[VIP] ESPN") == "vipespn"
+
+
+def test_digit_tokens():
+    assert digit_tokens("skysports10") == (10,)
+    assert digit_tokens("espn") == ()
+    assert digit_tokens("channel01plus1") == (1, 1)
+
+
+def test_exact_and_tvg_id_matches(matcher):
+    assert matcher.match("UK: BBC One HD") == ("BBCOne.uk", 1.0, "exact")
+    assert matcher.match("Anything", "espn.US") == ("ESPN.us", 1.0, "tvg_id")
+
+
+def test_fuzzy_match_tolerates_spelling(matcher):
+    match = matcher.match("Sky Sport 1")
+    assert match.epg_id == "SkySports1.uk"
+    assert match.method == "trigram"
+
+
+@pytest.mark.parametrize("name", ["Sky Sports 3", "Sky Sports 10", "ESPN 2", "ESPN 2 HD"])
+def test_fuzzy_match_rejects_other_numbers(matcher, name):
+    assert matcher.match(name).epg_id is None
+
+
+def test_name_prefix_that_is_not_a_country_is_kept(matcher):
+    assert matcher.match("CNN: Breaking News").epg_id is None
+
+
+def test_short_names_are_not_matched_fuzzily(matcher):
+    assert matcher.match("Sk").epg_id is None
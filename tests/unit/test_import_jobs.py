@@ -0,0 +1,126 @@
+"""Background import jobs: lifecycle, progress and in-memory expiry"""
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.config import settings
+from backend.database import Base
+from backend.models import catalogue, channel, epg, playlist, user  # noqa: F401
+from backend.models.channel import Channel
+from backend.services import import_jobs
+from backend.services.import_jobs import ImportJobQueue, MemoryJobStore
+
+PLAYLIST = (
+    '#EXTM3U\n'
+    '#EXTINF:-1 group-title="News",One\nhttp://s/1\n'
+    '#EXTINF:-1 group-title="News",Two\nhttp://s/2\n'
+    '#EXTINF:-1 group-title="News",One again\nhttp://s/1\n'
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(import_jobs, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    monkeypatch.setattr(settings, 'import_job_ttl', 60)
+    return clock
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(import_jobs, 'SessionLocal', factory)
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def upload(tmp_path):
+    path = tmp_path / 'upload.m3u8'
+    path.write_text(PLAYLIST)
+    return path
+
+
+def test_job_expires_ttl_after_its_last_save(clock):
+    store = MemoryJobStore()
+    store.save({'id': 'a', 'status': 'queued'})
+    clock.now += 50
+    store.save({'id': 'a', 'status': 'running'})
+    clock.now += 50
+    assert store.get('a') == {'id': 'a', 'status': 'running'}
+    clock.now += 11
+    assert store.get('a') is None
+
+
+def test_expired_jobs_are_dropped_on_save(clock):
+    store = MemoryJobStore()
+    store.save({'id': 'old'})
+    clock.now += 61
+    store.save({'id': 'new'})
+    assert list(store._jobs) == ['new']
+
+
+def test_stored_job_is_a_copy(clock):
+    store = MemoryJobStore()
+    job = {'id': 'a', 'progress': {'channels_parsed': 0}}
+    store.save(job)
+    job['progress']['channels_parsed'] = 5
+    store.get('a')['progress']['channels_parsed'] = 7
+    assert store.get('a')['progress'] == {'channels_parsed': 0}
+
+
+def test_submit_queues_the_job():
+    jobs = ImportJobQueue(MemoryJobStore())
+    job = jobs.submit('url', url='http://example.com/list.m3u8')
+    assert jobs.store.pop(timeout=0) == job['id']
+    assert jobs.get(job['id'])['status'] == 'queued'
+    with pytest.raises(ValueError):
+        jobs.submit('ftp', url='ftp://example.com')
+
+
+def test_file_import_runs_to_completion(sessions, upload):
+    jobs = ImportJobQueue(MemoryJobStore())
+    job = jobs.submit('file', path=str(upload))
+    jobs._run(jobs.get(job['id']))
+
+    done = jobs.get(job['id'])
+    assert done['status'] == 'completed'
+    assert done['started_at'] and done['finished_at']
+    assert done['result'] == {'total_parsed': 3, 'inserted': 2, 'updated': 0,
+                              'skipped': 1, 'deactivated': 0}
+    assert done['progress'] == {'bytes_read': len(PLAYLIST), 'channels_parsed': 3,
+                                'channels_written': 2}
+    # The upload is removed once imported
+    assert not upload.exists()
+    with sessions() as db:
+        assert db.scalar(select(func.count()).select_from(Channel)) == 2
+
+
+def test_failed_job_records_the_error(sessions, tmp_path):
+    jobs = ImportJobQueue(MemoryJobStore())
+    job = jobs.submit('file', path=str(tmp_path / 'missing.m3u8'))
+    jobs._run(jobs.get(job['id']))
+
+    failed = jobs.get(job['id'])
+    assert failed['status'] == 'failed'
+    assert 'missing.m3u8' in failed['error']
+    assert failed['result'] is None and failed['finished_at']
+
+
+def test_workers_pick_up_submitted_jobs(sessions, upload):
+    jobs = ImportJobQueue(MemoryJobStore(), workers=2)
+    jobs.start()
+    try:
+        job = jobs.submit('file', path=str(upload))
+        deadline = time.monotonic() + 5
+        while jobs.get(job['id'])['status'] in ('queued', 'running'):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        jobs.stop()
+    assert jobs.get(job['id'])['status'] == 'completed'
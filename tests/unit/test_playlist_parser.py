@@ -0,0 +1,74 @@
+"""M3U8 EXTINF tokenizing and streamed playlist parsing"""
+import pytest
+
+from backend.services.playlist_service import M3U8Parser, iter_text_lines
+
+
+@pytest.fixture
+def parser():
+    return M3U8Parser(None)
+
+
+def test_attributes_are_kept_and_promoted(parser):
+    metadata = parser._parse_extinf(
+        '#EXTINF:-1 tvg-id="bbc1.uk" tvg-name="BBC One" tvg-logo="http://l/1.png" '
+        'tvg-chno="101" group-title="News",BBC One HD'
+    )
+    assert metadata == {
+        'name': 'BBC One HD',
+        'tvg_id': 'bbc1.uk',
+        'tvg_name': 'BBC One',
+        'logo': 'http://l/1.png',
+        'category': 'News',
+        'attributes': {
+            'tvg-id': 'bbc1.uk',
+            'tvg-name': 'BBC One',
+            'tvg-logo': 'http://l/1.png',
+            'tvg-chno': '101',
+            'group-title': 'News',
+        },
+    }
+
+
+def test_quoted_commas_are_not_the_name_separator(parser):
+    metadata = parser._parse_extinf(
+        '#EXTINF:-1 tvg-name="Sky, Sports" group-title="News, UK",Sky Sports, Main Event'
+    )
+    assert metadata['category'] == 'News, UK'
+    assert metadata['tvg_name'] == 'Sky, Sports'
+    assert metadata['name'] == 'Sky Sports, Main Event'
+
+
+def test_quotes_in_the_name_are_kept(parser):
+    metadata = parser._parse_extinf('#EXTINF:-1 tvg-id="a",The "Best" Channel')
+    assert metadata['name'] == 'The "Best" Channel'
+    assert metadata['attributes'] == {'tvg-id': 'a'}
+
+
+@pytest.mark.parametrize("line", ['#EXTINF:-1 tvg-name="Film4",', '#EXTINF:-1 tvg-name="Film4",  '])
+def test_empty_title_falls_back_to_tvg_name(parser, line):
+    assert parser._parse_extinf(line)['name'] == 'Film4'
+
+
+def test_empty_title_without_tvg_name_has_no_name(parser):
+    metadata = parser._parse_extinf('#EXTINF:-1,')
+    assert 'name' not in metadata
+    assert metadata['attributes'] == {}
+
+
+def test_playlist_split_across_chunks(parser):
+    body = (
+        '\ufeff#EXTM3U\n'
+        '#EXTINF:-1 group-title="News, UK",Café TV\n'
+        '#EXTVLCOPT:http-user-agent=x\n'
+        'http://streams/1.m3u8\r\n'
+        '#EXTINF:-1,\n'
+        'http://streams/2.m3u8'
+    ).encode('utf-8')
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+    channels = list(parser.iter_playlist(iter_text_lines(chunks)))
+    assert [(c.get('name'), c.get('category'), c['stream_url']) for c in channels] == [
+        ('Café TV', 'News, UK', 'http://streams/1.m3u8'),
+        (None, None, 'http://streams/2.m3u8'),
+    ]
+    assert parser.total_parsed == 2
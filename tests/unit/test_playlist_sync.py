@@ -0,0 +1,103 @@
+"""Incremental playlist re-sync: whole-playlist and per-channel content hashes"""
+import io
+
+import pytest
+from sqlalchemy import create_engine, event, select, update
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models import catalogue, channel, epg, playlist, user  # noqa: F401
+from backend.models.channel import Channel
+from backend.services.playlist_service import M3U8Parser
+
+SOURCE = 'http://example.com/list.m3u8'
+
+
+def m3u(*entries) -> io.BytesIO:
+    lines = ['#EXTM3U']
+    for n, name in entries:
+        lines += [f'#EXTINF:-1 group-title="News",{name}', f'http://s/{n}']
+    return io.BytesIO('\n'.join(lines).encode())
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sync.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    with sessionmaker(bind=engine)() as db:
+        yield db
+
+
+@pytest.fixture
+def channel_writes(engine):
+    """INSERT and UPDATE statements sent for the channels table"""
+    seen = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(('INSERT INTO channels', 'UPDATE channels')):
+            seen.append(statement.split()[0])
+
+    return seen
+
+
+def sync(db, *entries):
+    return M3U8Parser(db).sync_from_stream(SOURCE, m3u(*entries))
+
+
+def states(db):
+    return {
+        row.stream_url: (row.name, bool(row.is_active))
+        for row in db.execute(select(Channel.name, Channel.stream_url, Channel.is_active))
+    }
+
+
+def test_identical_playlist_writes_no_channels(db, channel_writes):
+    first = sync(db, (1, 'One'), (2, 'Two'))
+    assert (first['unchanged'], first['inserted']) == (False, 2)
+    channel_writes.clear()
+
+    again = sync(db, (1, 'One'), (2, 'Two'))
+    assert again == {'unchanged': True, 'total_parsed': 2,
+                     'inserted': 0, 'updated': 0, 'skipped': 0, 'deactivated': 0}
+    assert channel_writes == []
+
+
+def test_changed_playlist_applies_only_the_diff(db, channel_writes):
+    sync(db, (1, 'One'), (2, 'Two'), (3, 'Three'))
+    channel_writes.clear()
+
+    result = sync(db, (1, 'One'), (2, 'Two HD'), (4, 'Four'))
+    assert result == {'unchanged': False, 'total_parsed': 3,
+                      'inserted': 1, 'updated': 1, 'skipped': 1, 'deactivated': 1}
+    assert states(db) == {
+        'http://s/1': ('One', True),
+        'http://s/2': ('Two HD', True),
+        'http://s/3': ('Three', False),
+        'http://s/4': ('Four', True),
+    }
+    # One INSERT for the new channel, one UPDATE each for the rename and
+    # the deactivation
+    assert channel_writes == ['INSERT', 'UPDATE', 'UPDATE']
+
+
+def test_channel_back_in_the_playlist_is_reactivated(db):
+    sync(db, (1, 'One'), (2, 'Two'))
+    sync(db, (1, 'One'))
+    result = sync(db, (1, 'One'), (2, 'Two'))
+    assert result['updated'] == 1
+    assert states(db)['http://s/2'] == ('Two', True)
+
+
+def test_channel_disabled_by_the_health_checker_stays_off(db):
+    sync(db, (1, 'One'))
+    db.execute(update(Channel).values(is_active=False, check_failures=99))
+    db.commit()
+    sync(db, (1, 'One renamed'))
+    assert states(db)['http://s/1'] == ('One renamed', False)
@@ -0,0 +1,132 @@
+"""Response cache: request coalescing and generation invalidation"""
+import asyncio
+
+import pytest
+
+from backend.config import settings
+from backend.services.response_cache import (
+    CHANNELS,
+    PROBES,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    ResponseCache,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+class Loader:
+    """Counts calls; each call waits for ``release`` when one is given"""
+
+    def __init__(self, release=None):
+        self.calls = 0
+        self.release = release
+
+    async def __call__(self):
+        self.calls += 1
+        value = self.calls
+        if self.release is not None:
+            await self.release.wait()
+        return {'value': value}
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def cache(request, redis):
+    if request.param == 'memory':
+        return ResponseCache(MemoryCacheBackend(100))
+    return ResponseCache(RedisCacheBackend(redis, redis))
+
+
+async def test_concurrent_misses_run_one_load(cache):
+    release = asyncio.Event()
+    load = Loader(release)
+    calls = [asyncio.create_task(cache.get_or_load(CHANNELS, 'k', 60, load)) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    release.set()
+    assert await asyncio.gather(*calls) == [{'value': 1}] * 5
+    assert await cache.get_or_load(CHANNELS, 'k', 60, load) == {'value': 1}
+    assert load.calls == 1
+    assert cache.stats()['namespaces'][CHANNELS] == {'hits': 1, 'misses': 1, 'coalesced': 4}
+
+
+async def test_failed_load_reaches_every_caller_and_is_not_stored(cache):
+    release = asyncio.Event()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        raise RuntimeError("database down")
+
+    pending = [asyncio.create_task(cache.get_or_load(CHANNELS, 'k', 60, load)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    release.set()
+    results = await asyncio.gather(*pending, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert calls == 1
+    assert await cache.get_or_load(CHANNELS, 'k', 60, Loader()) == {'value': 1}
+
+
+async def test_invalidate_drops_only_its_namespaces(cache):
+    channels, probes = Loader(), Loader()
+    await cache.get_or_load(CHANNELS, 'k', 60, channels)
+    await cache.get_or_load(PROBES, 'k', 60, probes)
+    cache.invalidate(CHANNELS)
+    assert await cache.get_or_load(CHANNELS, 'k', 60, channels) == {'value': 2}
+    assert await cache.get_or_load(PROBES, 'k', 60, probes) == {'value': 1}
+
+
+async def test_value_loaded_across_an_invalidation_is_not_served(cache):
+    release = asyncio.Event()
+    load = Loader(release)
+    stale = asyncio.create_task(cache.get_or_load(CHANNELS, 'k', 60, load))
+    await asyncio.sleep(0.01)
+    cache.invalidate(CHANNELS)
+    release.set()
+    assert await stale == {'value': 1}
+    assert await cache.get_or_load(CHANNELS, 'k', 60, load) == {'value': 2}
+
+
+async def test_load_after_an_invalidation_does_not_join_an_earlier_one(cache):
+    release = asyncio.Event()
+    load = Loader(release)
+    before = asyncio.create_task(cache.get_or_load(CHANNELS, 'k', 60, load))
+    await asyncio.sleep(0.01)
+    cache.invalidate(CHANNELS)
+    after = asyncio.create_task(cache.get_or_load(CHANNELS, 'k', 60, load))
+    await asyncio.sleep(0.01)
+    release.set()
+    assert await before == {'value': 1}
+    assert await after == {'value': 2}
+
+
+async def test_invalidation_from_another_process_during_a_load(redis):
+    api = ResponseCache(RedisCacheBackend(redis, redis))
+    worker = ResponseCache(RedisCacheBackend(redis, redis))
+    release = asyncio.Event()
+    load = Loader(release)
+
+    stale = asyncio.create_task(api.get_or_load(CHANNELS, 'k', 60, load))
+    await asyncio.sleep(0.01)
+    worker.invalidate(CHANNELS)
+    release.set()
+    assert await stale == {'value': 1}
+    assert await api.get_or_load(CHANNELS, 'k', 60, load) == {'value': 2}
+    assert await worker.get_or_load(CHANNELS, 'k', 60, load) == {'value': 2}
+
+
+async def test_a_miss_reads_the_generation_once(redis):
+    cache = ResponseCache(RedisCacheBackend(redis, redis))
+    await cache.get_or_load(CHANNELS, 'k', 60, Loader())
+    assert (redis.reads, redis.writes) == (2, 1)
+
+
+async def test_local_lru_caps_shared_namespaces(monkeypatch):
+    monkeypatch.setattr(settings, 'cache_local_ttl', 0)
+    cache = ResponseCache(MemoryCacheBackend(100))
+    channels, probes = Loader(), Loader()
+    for _ in range(2):
+        await cache.get_or_load(CHANNELS, 'k', 60, channels)
+        await cache.get_or_load(PROBES, 'k', 60, probes)
+    assert (channels.calls, probes.calls) == (2, 1)
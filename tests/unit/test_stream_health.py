@@ -0,0 +1,109 @@
+"""Stream health results: the bulk CASE update and cache invalidation"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.config import settings
+from backend.database import Base
+from backend.models.catalogue import CatalogueVersion
+from backend.models.channel import Channel
+from backend.services import response_cache as response_cache_module
+from backend.services import stream_health
+from backend.services.response_cache import CHANNELS, RedisCacheBackend, ResponseCache
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'health_check_failures', 3)
+    path = tmp_path / 'health.db'
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[Channel.__table__, CatalogueVersion.__table__])
+    engine.dispose()
+    return async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}"))
+
+
+@pytest.fixture
+def worker_cache(redis, monkeypatch):
+    """The health checker's process: its invalidations go through the shared Redis"""
+    cache = ResponseCache(RedisCacheBackend(redis, redis))
+    monkeypatch.setattr(response_cache_module, 'response_cache', cache)
+    return cache
+
+
+async def add_channel(sessions, is_active, failures):
+    async with sessions() as db:
+        await db.execute(insert(Channel).values(
+            id='c1', name='One', stream_url='http://s/1', is_active=is_active,
+            check_failures=failures,
+        ))
+        await db.commit()
+
+
+async def channel_state(sessions):
+    async with sessions() as db:
+        row = (await db.execute(
+            select(Channel.is_active, Channel.check_failures).where(Channel.id == 'c1')
+        )).one()
+    return bool(row.is_active), row.check_failures
+
+
+async def record(sessions, passed, row=None):
+    """Record one result for c1, as read at the start of the pass, and flush it"""
+    if row is None:
+        is_active, failures = await channel_state(sessions)
+        row = SimpleNamespace(
+            id='c1', stream_url='http://s/1', is_active=is_active, check_failures=failures,
+        )
+    checker = stream_health.StreamHealthChecker(session_factory=sessions)
+    await checker._record(row, 120 if passed else None, None if passed else "HTTP 404")
+    await checker._flush()
+    return checker.result
+
+
+@pytest.mark.parametrize("is_active, failures, passed, expected", [
+    (True, 0, False, (True, 1)),
+    (True, 2, False, (False, 3)),
+    (True, 2, True, (True, 0)),
+    (False, 3, True, (True, 0)),
+    (False, 3, False, (False, 4)),
+    # Deactivated by a playlist sync, which resets the failures: stays off
+    (False, 0, True, (False, 0)),
+])
+async def test_result_update(sessions, worker_cache, is_active, failures, passed, expected):
+    await add_channel(sessions, is_active, failures)
+    await record(sessions, passed)
+    assert await channel_state(sessions) == expected
+
+
+async def test_sync_during_the_pass_is_not_undone(sessions, worker_cache):
+    await add_channel(sessions, True, 0)
+    row = SimpleNamespace(id='c1', stream_url='http://s/1', is_active=False, check_failures=3)
+    # The pass read a checker-disabled channel; a sync has since re-activated it
+    await record(sessions, passed=False, row=row)
+    assert await channel_state(sessions) == (True, 1)
+
+
+async def test_flush_reaches_a_listing_loaded_concurrently(sessions, redis, worker_cache):
+    api_cache = ResponseCache(RedisCacheBackend(redis, redis))
+    await add_channel(sessions, True, 2)
+    read, release = asyncio.Event(), asyncio.Event()
+
+    async def load():
+        active = (await channel_state(sessions))[0]
+        read.set()
+        await release.wait()
+        return {'active': active}
+
+    listing = asyncio.create_task(api_cache.get_or_load(CHANNELS, 'list', 300, load))
+    await read.wait()
+    result = await record(sessions, passed=False)
+    release.set()
+
+    assert result['disabled'] == 1
+    assert await listing == {'active': True}
+    assert await api_cache.get_or_load(CHANNELS, 'list', 300, load) == {'active': False}
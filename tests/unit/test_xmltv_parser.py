@@ -0,0 +1,38 @@
+"""XMLTV time parsing and streaming"""
+import io
+from datetime import datetime
+
+import pytest
+
+from epg_service.parser import XMLTVParser, XMLTVProgramme, parse_xmltv_time
+
+
+def test_parse_time_converts_offset_to_utc():
+    assert parse_xmltv_time("20240101120000 +0100") == datetime(2024, 1, 1, 11, 0)
+    assert parse_xmltv_time("20240101120000") == datetime(2024, 1, 1, 12, 0)
+    assert parse_xmltv_time("202401011200 -0030") == datetime(2024, 1, 1, 12, 30)
+
+
+@pytest.mark.parametrize(
+    "value", ["", None, "garbage", "20241301120000 +0000", "20240230120000", "2024013199"]
+)
+def test_parse_time_rejects_invalid_values(value):
+    assert parse_xmltv_time(value) is None
+
+
+def test_invalid_programme_is_skipped_and_counted():
+    document = b"""<?xml version="1.0"?>
+<tv>
+  <channel id="one.uk"><display-name>One</display-name></channel>
+  <programme channel="one.uk" start="20241301120000 +0000" stop="20240101130000 +0000">
+    <title>Bad month</title>
+  </programme>
+  <programme channel="one.uk" start="20240101130000 +0000" stop="20240101140000 +0000">
+    <title>Good</title>
+  </programme>
+</tv>"""
+    parser = XMLTVParser()
+    records = list(parser.iterparse(io.BytesIO(document)))
+    programmes = [r for r in records if isinstance(r, XMLTVProgramme)]
+    assert [p.title for p in programmes] == ["Good"]
+    assert parser.skipped == 1